@@ -1,15 +1,17 @@
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from routes import routes
-from models import create_table
-from database import get_connection
+from migracoes import migrar, verificar_banco
+from fila_feedback import fila_feedback
+from metricas import instrumentar_app
 import os
 app = Flask(__name__)
 CORS(app)
+instrumentar_app(app)
 print("🔧 Inicializando banco de dados...")
-conn = get_connection()
-create_table(conn)
-conn.close()
+migrar()
+verificar_banco()
+fila_feedback.retomar_pendentes()
 print("✅ Banco de dados inicializado")
 app.register_blueprint(routes)
 @app.route('/imagens/<filename>')
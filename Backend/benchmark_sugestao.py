@@ -0,0 +1,412 @@
+# =============================================================================
+# BENCHMARK DO MOTOR DE SUGESTÕES - GUARDA-ROUPA SINTÉTICO DETERMINÍSTICO
+# =============================================================================
+
+import argparse
+import contextlib
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import database
+from database import definir_observador_consultas, get_connection
+from migracoes import migrar
+from tags_roupa import NOMES_COLUNAS_TAGS, valores_tags
+from guarda_roupa_snapshot import snapshot_guarda_roupa
+from preferencias_snapshot import snapshot_preferencias
+from feedback_learning import obter_feedback_system
+from style_ai_avancado import obter_style_ai
+from fila_feedback import fila_feedback
+from metricas import metricas
+
+TAMANHOS_PADRAO = (100, 1000, 10000, 100000)
+ITERACOES_PADRAO = 30
+AQUECIMENTO = 2
+# Chamadas extras, fora da medição de latência, com tracemalloc ligado (ele deixa tudo mais lento)
+CHAMADAS_MEMORIA = 3
+SEMENTE_PADRAO = 42
+FEEDBACKS_HISTORICO = 200
+USOS_HISTORICO = 100
+LOTE_INSERCAO = 5000
+
+# (tipo, peso, faixa sorteada de temperatura_min, faixa sorteada de temperatura_max).
+# Metade dos pesos usa os nomes de categoria, como no guarda-roupa real; o resto, tipos descritivos
+TIPOS_SINTETICOS = (
+    ('superior', 14, (12, 18), (30, 38)),
+    ('inferior', 8, (5, 12), (28, 35)),
+    ('calçado', 6, (0, 10), (30, 38)),
+    ('casaco', 6, (0, 8), (20, 25)),
+    ('camiseta', 7, (16, 20), (32, 40)),
+    ('camisa', 3, (10, 16), (28, 35)),
+    ('regata', 2, (20, 24), (35, 40)),
+    ('calça jeans', 4, (0, 10), (26, 32)),
+    ('shorts', 3, (20, 24), (35, 40)),
+    ('bermuda', 2, (18, 22), (33, 40)),
+    ('tênis', 4, (0, 10), (30, 38)),
+    ('sandália', 1, (20, 24), (35, 40)),
+    ('bota', 1, (0, 5), (18, 24)),
+    ('jaqueta impermeável', 1, (0, 10), (20, 26)),
+    ('moletom', 2, (0, 8), (18, 24)),
+    ('blazer', 1, (8, 14), (24, 28)),
+)
+
+CORES_SINTETICAS = (
+    ('branco', 20), ('preto', 16), ('azul', 8), ('cinza', 6), ('bege', 4), ('marrom', 4),
+    ('verde escuro', 3), ('jeans claro', 4), ('jeans preto', 3), ('cinza claro', 3),
+    ('azul claro', 2), ('vermelho', 2), ('verde', 2), ('rosa', 1), ('amarelo', 1),
+)
+
+ESTILOS_SINTETICOS = (('casual', 70), ('formal', 15), ('esportivo', 15))
+
+CLIMAS_BENCHMARK = (
+    {'cidade': 'Curitiba', 'temperatura': 8, 'sensacao_termica': 6, 'umidade': 88, 'vento': 18, 'condicao': 'chuva leve'},
+    {'cidade': 'São Paulo', 'temperatura': 17, 'sensacao_termica': 16, 'umidade': 75, 'vento': 12, 'condicao': 'nublado'},
+    {'cidade': 'Juiz de Fora', 'temperatura': 23, 'sensacao_termica': 24, 'umidade': 60, 'vento': 8, 'condicao': 'poucas nuvens'},
+    {'cidade': 'Rio de Janeiro', 'temperatura': 33, 'sensacao_termica': 36, 'umidade': 55, 'vento': 10, 'condicao': 'céu limpo'},
+)
+
+CATEGORIAS_COMBINACAO = ('superior', 'inferior', 'calçado', 'casaco')
+
+
+# =============================================================================
+# GERAÇÃO DO GUARDA-ROUPA E DO HISTÓRICO
+# =============================================================================
+
+def _sortear(rng: random.Random, opcoes: Tuple[Tuple[Any, ...], ...]) -> Tuple[Any, ...]:
+    return rng.choices(opcoes, weights=[opcao[1] for opcao in opcoes])[0]
+
+
+def gerar_roupas(tamanho: int, semente: int) -> List[Dict[str, Any]]:
+    """Guarda-roupa sintético; a mesma (semente, tamanho) sempre gera as mesmas peças"""
+    rng = random.Random(f"{semente}-{tamanho}")
+    roupas = []
+    for roupa_id in range(1, tamanho + 1):
+        tipo, _, faixa_min, faixa_max = _sortear(rng, TIPOS_SINTETICOS)
+        cor = _sortear(rng, CORES_SINTETICAS)[0]
+        roupas.append({
+            'id': roupa_id,
+            'nome': f"{tipo.capitalize()} {cor} {roupa_id}",
+            'tipo': tipo,
+            'cor': cor,
+            'estilo': _sortear(rng, ESTILOS_SINTETICOS)[0],
+            'temperatura_min': rng.randint(*faixa_min),
+            'temperatura_max': rng.randint(*faixa_max),
+        })
+    return roupas
+
+
+def _por_categoria(roupas: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    grupos: Dict[str, List[Dict[str, Any]]] = {}
+    for roupa in roupas:
+        grupos.setdefault(valores_tags(roupa['tipo'])[0], []).append(roupa)
+    return grupos
+
+
+def sortear_combinacao(rng: random.Random, grupos: Dict[str, List[Dict[str, Any]]], com_casaco: bool) -> List[Dict[str, Any]]:
+    """Uma peça de cada categoria principal (e um casaco, se pedido)"""
+    categorias = CATEGORIAS_COMBINACAO if com_casaco else CATEGORIAS_COMBINACAO[:3]
+    return [rng.choice(grupos[categoria]) for categoria in categorias if grupos.get(categoria)]
+
+
+def gerar_feedback(rng: random.Random, grupos: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Feedback sintético no formato de FeedbackLearningSystem.registrar_feedback"""
+    clima = rng.choice(CLIMAS_BENCHMARK)
+    combinacao = sortear_combinacao(rng, grupos, com_casaco=clima['temperatura'] < 15)
+    return {
+        'rating': rng.choices((1, 2, 3, 4, 5), weights=(5, 10, 20, 35, 30))[0],
+        'usado': rng.random() < 0.6,
+        'clima_data': clima,
+        'combinacao': [{chave: roupa.get(chave) for chave in ('id', 'nome', 'tipo', 'cor', 'estilo')} for roupa in combinacao],
+        'score_original': round(rng.uniform(40, 95), 1),
+    }
+
+
+def preparar_banco(caminho: str, tamanho: int, semente: int) -> Dict[str, Any]:
+    """
+    Cria um banco novo em caminho com o guarda-roupa sintético e um
+    histórico de feedback e de uso gerado pelo próprio sistema de
+    aprendizado, e aponta o pool de conexões para ele
+    """
+    inicio = time.perf_counter()
+    for arquivo in (caminho, caminho + '-wal', caminho + '-shm'):
+        if os.path.exists(arquivo):
+            os.remove(arquivo)
+    database.DB_PATH = caminho
+
+    roupas = gerar_roupas(tamanho, semente)
+    grupos = _por_categoria(roupas)
+    rng = random.Random(f"{semente}-{tamanho}-historico")
+    feedback_system = obter_feedback_system()
+
+    conn = get_connection()
+    try:
+        migrar(conn)
+        cursor = conn.cursor()
+        colunas = ('id', 'nome', 'tipo', 'cor', 'estilo', 'temperatura_min', 'temperatura_max') + NOMES_COLUNAS_TAGS
+        sql = f"INSERT INTO roupas ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})"
+        for inicio_lote in range(0, len(roupas), LOTE_INSERCAO):
+            cursor.executemany(sql, [
+                (roupa['id'], roupa['nome'], roupa['tipo'], roupa['cor'], roupa['estilo'],
+                 roupa['temperatura_min'], roupa['temperatura_max'], *valores_tags(roupa['tipo']))
+                for roupa in roupas[inicio_lote:inicio_lote + LOTE_INSERCAO]
+            ])
+
+        deltas = {}
+        for _ in range(FEEDBACKS_HISTORICO):
+            feedback_system.aplicar_feedback(cursor, gerar_feedback(rng, grupos), deltas)
+        feedback_system.gravar_preferencias(cursor, deltas)
+
+        usos, itens = [], []
+        for combinacao_id in range(1, USOS_HISTORICO + 1):
+            clima = rng.choice(CLIMAS_BENCHMARK)
+            ids = [roupa['id'] for roupa in sortear_combinacao(rng, grupos, com_casaco=clima['temperatura'] < 15)]
+            usos.append((combinacao_id, json.dumps(ids), obter_style_ai().classificar_clima_simples(clima),
+                         clima['temperatura'], rng.randint(1, 5)))
+            itens.extend((combinacao_id, roupa_id) for roupa_id in ids)
+        cursor.executemany(
+            "INSERT INTO combinacoes_usadas (id, roupa_ids, clima_tipo, temperatura, satisfacao) VALUES (?, ?, ?, ?, ?)", usos
+        )
+        cursor.executemany("INSERT OR IGNORE INTO combinacao_itens (combinacao_id, roupa_id) VALUES (?, ?)", itens)
+        conn.commit()
+    finally:
+        conn.close()
+
+    snapshot_guarda_roupa.invalidar()
+    snapshot_preferencias.invalidar()
+    return {
+        'preparo_s': round(time.perf_counter() - inicio, 3),
+        'banco_mb': round(sum(os.path.getsize(arquivo) for arquivo in (caminho, caminho + '-wal')
+                              if os.path.exists(arquivo)) / 1024 / 1024, 2),
+        'feedbacks_historico': FEEDBACKS_HISTORICO,
+        'usos_historico': USOS_HISTORICO,
+    }
+
+
+# =============================================================================
+# MEDIÇÃO
+# =============================================================================
+
+class ContadorConsultas:
+    """Observador de consultas que conta só as instruções da thread do benchmark"""
+
+    def __init__(self):
+        self.total = 0
+        self._thread = threading.get_ident()
+
+    def __call__(self):
+        metricas.contar_consulta()
+        if threading.get_ident() == self._thread:
+            self.total += 1
+
+
+def percentil(valores: List[float], fracao: float) -> float:
+    """Percentil por posição mais próxima (nearest-rank)"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(fracao * len(ordenados)) - 1)]
+
+
+def medir_operacao(funcao: Callable[[int], Any], iteracoes: int, contador: ContadorConsultas) -> Dict[str, Any]:
+    """Latência (p50/p95), consultas por chamada e pico de memória de uma operação"""
+    for i in range(AQUECIMENTO):
+        funcao(i)
+
+    duracoes, consultas = [], []
+    for i in range(iteracoes):
+        antes = contador.total
+        inicio = time.perf_counter()
+        funcao(AQUECIMENTO + i)
+        duracoes.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(contador.total - antes)
+
+    gc.collect()
+    tracemalloc.start()
+    pico = 0
+    try:
+        for i in range(CHAMADAS_MEMORIA):
+            atual, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            funcao(AQUECIMENTO + iteracoes + i)
+            pico = max(pico, tracemalloc.get_traced_memory()[1] - atual)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'chamadas': iteracoes,
+        'p50_ms': round(percentil(duracoes, 0.5), 3),
+        'p95_ms': round(percentil(duracoes, 0.95), 3),
+        'media_ms': round(sum(duracoes) / len(duracoes), 3),
+        'max_ms': round(max(duracoes), 3),
+        'consultas_por_chamada': round(sum(consultas) / len(consultas), 2),
+        'pico_memoria_kb': round(pico / 1024, 1),
+    }
+
+
+def criar_app():
+    """App Flask com as mesmas rotas e instrumentação de app.py, sem o boot do banco real"""
+    from flask import Flask
+    from routes import routes
+    from metricas import instrumentar_app
+
+    app = Flask("benchmark_sugestao")
+    instrumentar_app(app)
+    app.register_blueprint(routes)
+    return app
+
+
+def _verificar(resposta, esperado: int):
+    if resposta.status_code != esperado:
+        raise RuntimeError(f"{resposta.request.method} {resposta.request.path}: status {resposta.status_code}")
+    return resposta
+
+
+def operacoes(tamanho: int, semente: int, cliente) -> Dict[str, Callable[[int], Any]]:
+    """Operações medidas; cada uma recebe o número da chamada para variar a entrada"""
+    from ia_sugestao_nova import gerar_sugestao_inteligente
+
+    roupas = snapshot_guarda_roupa.roupas()
+    grupos: Dict[str, List[Dict[str, Any]]] = {}
+    for roupa in roupas:
+        grupos.setdefault(roupa['tags']['categoria'], []).append(roupa)
+    rng = random.Random(f"{semente}-{tamanho}-operacoes")
+    combinacoes = [sortear_combinacao(rng, grupos, com_casaco=i % 2 == 0) for i in range(64)]
+    feedbacks = [gerar_feedback(rng, _por_categoria(roupas)) for _ in range(64)]
+    style_ai = obter_style_ai()
+    feedback_system = obter_feedback_system()
+
+    def clima(i):
+        return CLIMAS_BENCHMARK[i % len(CLIMAS_BENCHMARK)]
+
+    def feedback_rota(i):
+        feedback = feedbacks[i % len(feedbacks)]
+        return {
+            'cidade': feedback['clima_data']['cidade'],
+            'temperatura': feedback['clima_data']['temperatura'],
+            'score': feedback['rating'],
+            'combinacao': feedback['combinacao'],
+        }
+
+    return {
+        'gerar_sugestao_inteligente': lambda i: gerar_sugestao_inteligente(clima(i)),
+        'StyleAI.calcular_score_combinacao': lambda i: style_ai.calcular_score_combinacao(
+            combinacoes[i % len(combinacoes)], clima(i), snapshot_preferencias.atual()),
+        'FeedbackLearningSystem.registrar_feedback': lambda i: feedback_system.registrar_feedback(
+            f"benchmark-{i}", feedbacks[i % len(feedbacks)]),
+        'POST /api/sugestao': lambda i: _verificar(cliente.post('/api/sugestao', json=clima(i)), 200),
+        'GET /roupas': lambda i: _verificar(cliente.get(f'/roupas?limit=50&after_id={(i * 50) % max(tamanho, 1)}'), 200),
+        'POST /api/feedback': lambda i: _verificar(cliente.post('/api/feedback', json=feedback_rota(i)), 202),
+        'GET /api/estatisticas-ia': lambda i: _verificar(cliente.get('/api/estatisticas-ia'), 200),
+        # Por último: recarregar descarta os arrays cacheados usados pelas operações acima
+        'snapshot.recarregar': lambda i: snapshot_guarda_roupa.recarregar(),
+    }
+
+
+def executar(tamanhos: List[int], iteracoes: int, semente: int, pasta: str,
+             filtro: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Roda o benchmark para cada tamanho e retorna o relatório completo"""
+    contador = ContadorConsultas()
+    definir_observador_consultas(contador)
+    cliente = criar_app().test_client()
+    resultados = []
+    for tamanho in tamanhos:
+        print(f"📦 Preparando guarda-roupa sintético com {tamanho} peças...", file=sys.stderr)
+        preparo = preparar_banco(os.path.join(pasta, f"benchmark_{tamanho}.db"), tamanho, semente)
+        medidas = {}
+        for nome, funcao in operacoes(tamanho, semente, cliente).items():
+            if filtro and not any(parte in nome for parte in filtro):
+                continue
+            medidas[nome] = medir_operacao(funcao, iteracoes, contador)
+            print(f"   {nome:<42} p50 {medidas[nome]['p50_ms']:>9.2f} ms  p95 {medidas[nome]['p95_ms']:>9.2f} ms  "
+                  f"{medidas[nome]['consultas_por_chamada']:>6.1f} consultas  {medidas[nome]['pico_memoria_kb']:>9.1f} KB",
+                  file=sys.stderr)
+        fila_feedback.drenar()
+        resultados.append({'tamanho': tamanho, **preparo, 'operacoes': medidas})
+    database.fechar_pool()
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': _ambiente(),
+        'parametros': {'tamanhos': tamanhos, 'iteracoes': iteracoes, 'aquecimento': AQUECIMENTO,
+                       'chamadas_memoria': CHAMADAS_MEMORIA, 'semente': semente},
+        'resultados': resultados,
+    }
+
+
+def _ambiente() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def comparar(atual: Dict[str, Any], base: Dict[str, Any]) -> List[str]:
+    """Linhas com a variação de p50/p95 de cada operação em relação a um relatório anterior"""
+    anteriores = {r['tamanho']: r['operacoes'] for r in base.get('resultados', [])}
+    linhas = []
+    for resultado in atual['resultados']:
+        for nome, medida in resultado['operacoes'].items():
+            anterior = anteriores.get(resultado['tamanho'], {}).get(nome)
+            if not anterior:
+                continue
+            variacoes = []
+            for chave in ('p50_ms', 'p95_ms'):
+                if anterior[chave]:
+                    variacoes.append(f"{chave[:3]} {(medida[chave] / anterior[chave] - 1) * 100:+.1f}%")
+            linhas.append(f"{resultado['tamanho']:>7} {nome:<42} {'  '.join(variacoes)}")
+    return linhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do motor de sugestões com guarda-roupas sintéticos")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO), help="quantidades de peças (padrão: 100 1000 10000 100000)")
+    parser.add_argument("--iteracoes", type=int, default=ITERACOES_PADRAO, help="chamadas medidas por operação")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO, help="semente do gerador sintético")
+    parser.add_argument("--operacao", action="append", help="mede só as operações cujo nome contém o texto (repetível)")
+    parser.add_argument("--pasta", help="pasta dos bancos sintéticos (padrão: temporária, apagada no fim)")
+    parser.add_argument("--comparar", help="relatório JSON anterior para mostrar a variação de p50/p95")
+    parser.add_argument("-o", "--saida", help="arquivo JSON do relatório (padrão: stdout)")
+    args = parser.parse_args()
+    if args.iteracoes < 1 or any(tamanho < 1 for tamanho in args.tamanhos):
+        parser.error("--iteracoes e --tamanhos devem ser positivos")
+
+    pasta_temporaria = None if args.pasta else tempfile.TemporaryDirectory(prefix="benchmark_guarda_roupa_")
+    pasta = args.pasta or pasta_temporaria.name
+    os.makedirs(pasta, exist_ok=True)
+    try:
+        # Os prints do app vão para stderr para o stdout conter só o JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            relatorio = executar(args.tamanhos, args.iteracoes, args.semente, pasta, args.operacao)
+    finally:
+        if pasta_temporaria:
+            pasta_temporaria.cleanup()
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            for linha in comparar(relatorio, json.load(arquivo)):
+                print(linha, file=sys.stderr)
+
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(saida + "\n")
+        print(f"✅ Relatório salvo em {args.saida}", file=sys.stderr)
+    else:
+        print(saida)
@@ -0,0 +1,144 @@
+# =============================================================================
+# BUSCA EXATA DE COMBINAÇÕES - BRANCH AND BOUND
+# =============================================================================
+
+import heapq
+import itertools
+import time
+from typing import Dict, List, Any, Tuple, Callable, Optional, Sequence
+
+EPSILON = 1e-9
+
+# A descida confere o prazo a cada tantos nós visitados (perf_counter a cada nó pesaria no laço)
+NOS_POR_VERIFICACAO = 256
+
+
+class OrcamentoEsgotado(Exception):
+    """Sinaliza que o tempo máximo da busca foi atingido"""
+
+
+class BuscaBranchAndBound:
+    """
+    Enumera combinações (uma peça por slot) e mantém as K melhores.
+
+    Cada peça tem um vetor de valores separáveis; `teto` recebe a soma
+    desses vetores (peças escolhidas + melhor valor de cada slot restante)
+    e o prefixo já escolhido, e devolve um limite superior para o score
+    exato (deve ser não-decrescente em cada componente). Ramos cujo
+    teto não supera o K-ésimo melhor score já encontrado são podados.
+    Várias formas de combinação podem ser exploradas na mesma busca,
+    compartilhando o ranking e o orçamento de tempo.
+    """
+
+    def __init__(self, k: int = 3, orcamento_ms: Optional[float] = None, tamanho_lote: int = 256):
+        self.k = max(1, k)
+        self.tamanho_lote = max(1, tamanho_lote)
+        self._pendentes: List[List[Dict]] = []
+        self.prazo = time.perf_counter() + orcamento_ms / 1000 if orcamento_ms else None
+        self._melhores: List[Tuple[float, int, List[Dict]]] = []
+        self._contador = itertools.count()
+        self.avaliadas = 0
+        self.podas = 0
+        self.nos = 0
+        self.completa = True
+        self._inicio = time.perf_counter()
+
+    def explorar(self,
+                 slots: Sequence[Sequence[Dict]],
+                 valores: Callable[[Dict], Tuple[float, ...]],
+                 teto: Callable[[Tuple[float, ...], List[Dict]], float],
+                 avaliar: Optional[Callable[[List[Dict]], float]] = None,
+                 avaliar_lote: Optional[Callable[[List[List[Dict]]], Sequence[float]]] = None):
+        """
+        Explora todas as combinações de uma forma (lista de slots). Com
+        `avaliar_lote`, as combinações completas são acumuladas e
+        avaliadas em lotes de até `tamanho_lote` por chamada.
+        """
+        if not slots or any(not candidatos for candidatos in slots) or not self.completa:
+            return
+        if avaliar_lote is None:
+            avaliar_lote = lambda combinacoes: [avaliar(c) for c in combinacoes]
+
+        slots_valorados = []
+        for candidatos in slots:
+            valorados = [(roupa, tuple(valores(roupa))) for roupa in candidatos]
+            valorados.sort(key=lambda par: sum(par[1]), reverse=True)
+            slots_valorados.append(valorados)
+
+        dimensoes = len(slots_valorados[0][0][1])
+        melhor_restante = [(0.0,) * dimensoes]
+        for valorados in reversed(slots_valorados):
+            maximos = tuple(max(v[d] for _, v in valorados) for d in range(dimensoes))
+            melhor_restante.append(tuple(a + b for a, b in zip(maximos, melhor_restante[-1])))
+        melhor_restante.reverse()
+
+        try:
+            self._descer(slots_valorados, 0, [], (0.0,) * dimensoes, melhor_restante, teto, avaliar_lote)
+            self._avaliar_pendentes(avaliar_lote)
+        except OrcamentoEsgotado:
+            self.completa = False
+            # Sem nenhum resultado ainda, avalia o que já foi enumerado para não voltar vazia
+            if not self._melhores and self._pendentes:
+                pendentes, self._pendentes = self._pendentes, []
+                for combinacao, score in zip(pendentes, avaliar_lote(pendentes)):
+                    self._registrar(combinacao, float(score))
+            self._pendentes = []
+
+    def _descer(self, slots, nivel, parcial, soma, melhor_restante, teto, avaliar_lote):
+        ultimo = nivel == len(slots) - 1
+
+        for roupa, valor in slots[nivel]:
+            self.nos += 1
+            if self.nos % NOS_POR_VERIFICACAO == 0:
+                self._verificar_prazo()
+            nova_soma = tuple(a + b for a, b in zip(soma, valor))
+            parcial.append(roupa)
+            if not ultimo and len(self._melhores) >= self.k:
+                limite = teto(tuple(a + b for a, b in zip(nova_soma, melhor_restante[nivel + 1])), parcial)
+                if limite <= self._melhores[0][0] + EPSILON:
+                    self.podas += 1
+                    parcial.pop()
+                    continue
+            if ultimo:
+                self._pendentes.append(list(parcial))
+            else:
+                self._descer(slots, nivel + 1, parcial, nova_soma, melhor_restante, teto, avaliar_lote)
+            parcial.pop()
+
+        if len(self._pendentes) >= self.tamanho_lote:
+            self._avaliar_pendentes(avaliar_lote)
+
+    def _avaliar_pendentes(self, avaliar_lote):
+        if not self._pendentes:
+            return
+        pendentes, self._pendentes = self._pendentes, []
+        for combinacao, score in zip(pendentes, avaliar_lote(pendentes)):
+            self._registrar(combinacao, float(score))
+        self._verificar_prazo()
+
+    def _registrar(self, combinacao: List[Dict], score: float):
+        self.avaliadas += 1
+        item = (score, -next(self._contador), combinacao)
+        if len(self._melhores) < self.k:
+            heapq.heappush(self._melhores, item)
+        elif score > self._melhores[0][0]:
+            heapq.heapreplace(self._melhores, item)
+
+    def _verificar_prazo(self):
+        if self.prazo is not None and time.perf_counter() > self.prazo:
+            raise OrcamentoEsgotado()
+
+    def resultados(self) -> List[Tuple[List[Dict], float]]:
+        """Melhores combinações encontradas, em ordem decrescente de score"""
+        ordenados = sorted(self._melhores, reverse=True)
+        return [(combinacao, score) for score, _, combinacao in ordenados]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores da busca"""
+        return {
+            'avaliadas': self.avaliadas,
+            'podas': self.podas,
+            'nos': self.nos,
+            'completa': self.completa,
+            'tempo_ms': round((time.perf_counter() - self._inicio) * 1000, 2)
+        }
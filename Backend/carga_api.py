@@ -0,0 +1,267 @@
+# =============================================================================
+# GERADOR DE CARGA - RPS ALVO EM MALHA ABERTA, VAZÃO E LATÊNCIA DE CAUDA
+# =============================================================================
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+URL_PADRAO = "http://127.0.0.1:5000"
+RPS_PADRAO = 10.0
+DURACAO_PADRAO_S = 30.0
+CONCORRENCIA_PADRAO = 32
+TIMEOUT_PADRAO_S = 30.0
+MIX_PADRAO = "sugestao=5,clima=3,feedback=2"
+PERCENTIS = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+# Capitais (as mesmas de clima_service.simular_clima_por_cidade); além delas, "Cidade N"
+CIDADES = (
+    "São Paulo", "Rio de Janeiro", "Salvador", "Recife", "Fortaleza", "Brasília", "Belo Horizonte",
+    "Porto Alegre", "Curitiba", "Manaus", "Belém", "Goiânia", "Florianópolis", "Natal", "Campo Grande",
+    "João Pessoa", "Cuiabá", "Vitória", "Aracaju", "Teresina", "Macapá", "Palmas", "Rio Branco",
+    "Boa Vista", "Porto Velho",
+)
+
+
+# =============================================================================
+# REQUISIÇÕES
+# =============================================================================
+
+def lista_cidades(quantidade: int) -> List[str]:
+    """Cidades usadas na carga; menos cidades significa mais acertos no cache de clima"""
+    return [CIDADES[i] if i < len(CIDADES) else f"Cidade {i + 1}" for i in range(max(1, quantidade))]
+
+
+def ler_mix(texto: str) -> List[Tuple[str, float]]:
+    """Converte 'sugestao=5,clima=3' em [(rota, peso)]; levanta ValueError se inválido"""
+    mix = []
+    for parte in texto.split(','):
+        rota, _, peso = parte.partition('=')
+        rota = rota.strip()
+        if rota not in ROTAS:
+            raise ValueError(f"rota desconhecida no mix: {rota!r} (use {', '.join(ROTAS)})")
+        mix.append((rota, float(peso or 1)))
+    if not mix or sum(peso for _, peso in mix) <= 0:
+        raise ValueError("o mix precisa de ao menos uma rota com peso positivo")
+    return mix
+
+
+def _sugestao(rng: random.Random, cidade: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    # Só a cidade: a rota busca o clima (no stub ou na Open-Meteo) antes de sugerir
+    return 'POST', '/api/sugestao', {'cidade': cidade}
+
+
+def _clima(rng: random.Random, cidade: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    return 'GET', f'/api/clima/{quote(cidade)}', None
+
+
+def _feedback(rng: random.Random, cidade: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    score = rng.choices((1, 2, 3, 4, 5), weights=(5, 10, 20, 35, 30))[0]
+    return 'POST', '/api/feedback', {
+        'cidade': cidade,
+        'temperatura': rng.randint(5, 35),
+        'score': score,
+        'tipo_feedback': 'positivo' if score >= 4 else 'negativo' if score <= 2 else 'neutro',
+        'combinacao': [],
+    }
+
+
+ROTAS = {
+    'sugestao': _sugestao,
+    'clima': _clima,
+    'feedback': _feedback,
+}
+
+
+class GeradorCarga:
+    """
+    Dispara requisições num ritmo fixo (malha aberta): a i-ésima sai em
+    inicio + i / rps, esteja o servidor rápido ou não. A latência é medida
+    a partir do horário agendado, então o tempo de fila de um servidor
+    saturado entra nos percentis em vez de baixar o ritmo da carga.
+    """
+
+    def __init__(self, url: str, rps: float, duracao_s: float, mix: List[Tuple[str, float]],
+                 cidades: List[str], concorrencia: int = CONCORRENCIA_PADRAO,
+                 timeout_s: float = TIMEOUT_PADRAO_S, semente: Optional[int] = None):
+        self.url = url.rstrip('/')
+        self.rps = rps
+        self.duracao_s = duracao_s
+        self.mix = mix
+        self.cidades = cidades
+        self.concorrencia = max(1, concorrencia)
+        self.timeout_s = timeout_s
+        self.rng = random.Random(semente)
+        self._sessoes = threading.local()
+        self._lock = threading.Lock()
+        # (rota, status ou nome da exceção, latência desde o agendamento, tempo de serviço), em ms
+        self.resultados: List[Tuple[str, str, float, float]] = []
+        self.atraso_maximo_envio_ms = 0.0
+
+    def _sessao(self) -> requests.Session:
+        sessao = getattr(self._sessoes, 'sessao', None)
+        if sessao is None:
+            sessao = self._sessoes.sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+        return sessao
+
+    def _executar(self, rota: str, metodo: str, caminho: str, corpo: Optional[Dict[str, Any]], agendado: float):
+        inicio = time.perf_counter()
+        try:
+            response = self._sessao().request(metodo, self.url + caminho, json=corpo, timeout=self.timeout_s)
+            resultado = str(response.status_code)
+            response.close()
+        except requests.RequestException as e:
+            resultado = type(e).__name__
+        fim = time.perf_counter()
+        with self._lock:
+            self.resultados.append((rota, resultado, (fim - agendado) * 1000, (fim - inicio) * 1000))
+
+    def executar(self) -> float:
+        """Roda a carga e retorna a duração real em segundos (até a última resposta)"""
+        rotas, pesos = zip(*self.mix)
+        total = max(1, int(self.rps * self.duracao_s))
+        with ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix="carga") as executor:
+            inicio = time.perf_counter()
+            for i in range(total):
+                agendado = inicio + i / self.rps
+                espera = agendado - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                else:
+                    self.atraso_maximo_envio_ms = max(self.atraso_maximo_envio_ms, -espera * 1000)
+                rota = self.rng.choices(rotas, weights=pesos)[0]
+                metodo, caminho, corpo = ROTAS[rota](self.rng, self.rng.choice(self.cidades))
+                executor.submit(self._executar, rota, metodo, caminho, corpo, agendado)
+        return time.perf_counter() - inicio
+
+
+# =============================================================================
+# RELATÓRIO
+# =============================================================================
+
+def percentil(valores: List[float], fracao: float) -> float:
+    """Percentil por posição mais próxima (nearest-rank)"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(fracao * len(ordenados)) - 1)]
+
+
+def resumir(resultados: List[Tuple[str, str, float, float]], duracao_s: float) -> Dict[str, Any]:
+    """Vazão, status e percentis de latência de um conjunto de resultados"""
+    latencias = [latencia for _, _, latencia, _ in resultados]
+    servico = [tempo for _, _, _, tempo in resultados]
+    status: Dict[str, int] = {}
+    for _, resultado, _, _ in resultados:
+        status[resultado] = status.get(resultado, 0) + 1
+    sucesso = sum(total for resultado, total in status.items() if resultado.isdigit() and int(resultado) < 400)
+    resumo = {
+        'requisicoes': len(resultados),
+        'sucesso': sucesso,
+        'taxa_erro': round(1 - sucesso / len(resultados), 4) if resultados else 0.0,
+        'vazao_rps': round(len(resultados) / duracao_s, 2) if duracao_s else 0.0,
+        'vazao_sucesso_rps': round(sucesso / duracao_s, 2) if duracao_s else 0.0,
+        'status': dict(sorted(status.items())),
+    }
+    if latencias:
+        resumo['latencia_ms'] = {f"p{fracao * 100:g}": round(percentil(latencias, fracao), 2) for fracao in PERCENTIS}
+        resumo['latencia_ms']['media'] = round(sum(latencias) / len(latencias), 2)
+        resumo['latencia_ms']['max'] = round(max(latencias), 2)
+        resumo['servico_ms'] = {f"p{fracao * 100:g}": round(percentil(servico, fracao), 2) for fracao in (0.5, 0.99)}
+    return resumo
+
+
+def _estatisticas_stub(url: str) -> Optional[Dict[str, Any]]:
+    try:
+        return requests.get(url.rstrip('/') + "/_stub/estatisticas", timeout=5).json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"⚠️ Não foi possível ler as estatísticas do stub: {e}", file=sys.stderr)
+        return None
+
+
+def gerar_relatorio(gerador: GeradorCarga, duracao_s: float, url_stub: Optional[str] = None) -> Dict[str, Any]:
+    por_rota: Dict[str, List[Tuple[str, str, float, float]]] = {}
+    for resultado in gerador.resultados:
+        por_rota.setdefault(resultado[0], []).append(resultado)
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'parametros': {
+            'url': gerador.url,
+            'rps_alvo': gerador.rps,
+            'duracao_s': gerador.duracao_s,
+            'mix': dict(gerador.mix),
+            'cidades': len(gerador.cidades),
+            'concorrencia': gerador.concorrencia,
+            'timeout_s': gerador.timeout_s,
+        },
+        'duracao_real_s': round(duracao_s, 2),
+        # Acima de alguns ms o gerador não acompanhou o ritmo: aumente --concorrencia ou rode em outra máquina
+        'atraso_maximo_envio_ms': round(gerador.atraso_maximo_envio_ms, 2),
+        'total': resumir(gerador.resultados, duracao_s),
+        'rotas': {rota: resumir(resultados, duracao_s) for rota, resultados in sorted(por_rota.items())},
+    }
+    if url_stub:
+        relatorio['stub'] = _estatisticas_stub(url_stub)
+    return relatorio
+
+
+def imprimir_resumo(relatorio: Dict[str, Any]):
+    print(f"📊 {relatorio['total']['requisicoes']} requisições em {relatorio['duracao_real_s']} s "
+          f"(alvo {relatorio['parametros']['rps_alvo']:g} rps)", file=sys.stderr)
+    for nome, resumo in [('total', relatorio['total'])] + list(relatorio['rotas'].items()):
+        latencia = resumo.get('latencia_ms', {})
+        print(f"   {nome:<10} {resumo['vazao_rps']:>8.2f} rps  erro {resumo['taxa_erro'] * 100:>5.1f}%  "
+              f"p50 {latencia.get('p50', 0):>9.2f}  p95 {latencia.get('p95', 0):>9.2f}  "
+              f"p99 {latencia.get('p99', 0):>9.2f}  max {latencia.get('max', 0):>9.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera carga em /api/sugestao, /api/clima/<cidade> e /api/feedback")
+    parser.add_argument("--url", default=URL_PADRAO, help="endereço do backend (padrão: http://127.0.0.1:5000)")
+    parser.add_argument("--rps", type=float, default=RPS_PADRAO, help="requisições por segundo")
+    parser.add_argument("--duracao", type=float, default=DURACAO_PADRAO_S, help="segundos de carga")
+    parser.add_argument("--mix", default=MIX_PADRAO, help="pesos das rotas (padrão: sugestao=5,clima=3,feedback=2)")
+    parser.add_argument("--cidades", type=int, default=len(CIDADES), help="quantidade de cidades distintas")
+    parser.add_argument("--concorrencia", type=int, default=CONCORRENCIA_PADRAO, help="requisições simultâneas no máximo")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_PADRAO_S, help="timeout de cada requisição (s)")
+    parser.add_argument("--semente", type=int, help="semente do sorteio de rotas e cidades")
+    parser.add_argument("--stub", help="URL do stub_open_meteo.py para incluir as estatísticas dele no relatório")
+    parser.add_argument("-o", "--saida", help="arquivo JSON do relatório (padrão: stdout)")
+    args = parser.parse_args()
+    if args.rps <= 0 or args.duracao <= 0:
+        parser.error("--rps e --duracao devem ser positivos")
+    try:
+        mix = ler_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    gerador = GeradorCarga(args.url, args.rps, args.duracao, mix, lista_cidades(args.cidades),
+                           args.concorrencia, args.timeout, args.semente)
+    print(f"🚀 {args.rps:g} rps por {args.duracao:g} s em {gerador.url}...", file=sys.stderr)
+    try:
+        duracao = gerador.executar()
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrompido; relatório parcial", file=sys.stderr)
+        duracao = args.duracao
+    relatorio = gerar_relatorio(gerador, duracao, args.stub)
+    imprimir_resumo(relatorio)
+
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(saida + "\n")
+        print(f"✅ Relatório salvo em {args.saida}", file=sys.stderr)
+    else:
+        print(saida)
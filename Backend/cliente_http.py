@@ -0,0 +1,180 @@
+# =============================================================================
+# CLIENTE HTTP COMPARTILHADO - KEEP-ALIVE, TIMEOUTS E RETRY COM JITTER
+# =============================================================================
+
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Timeouts separados: conectar deve ser rápido; a leitura tolera a API mais lenta
+TIMEOUT_CONEXAO_SEGUNDOS = float(os.environ.get("GUARDA_ROUPA_HTTP_TIMEOUT_CONEXAO", "2"))
+TIMEOUT_LEITURA_SEGUNDOS = float(os.environ.get("GUARDA_ROUPA_HTTP_TIMEOUT_LEITURA", "4"))
+TENTATIVAS_EXTRAS = int(os.environ.get("GUARDA_ROUPA_HTTP_RETRIES", "0"))
+BACKOFF_BASE_SEGUNDOS = 0.2
+BACKOFF_MAXIMO_SEGUNDOS = 2.0
+CONEXOES_POR_HOST = 10
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+
+# Limites superiores (ms) dos buckets do histograma de latência
+BUCKETS_LATENCIA_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class HistogramaLatencia:
+    """Histograma cumulativo de latências (em ms) de um endpoint"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS_LATENCIA_MS):
+        self.buckets = tuple(buckets)
+        self._contagens = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.soma_ms = 0.0
+        self.maximo_ms = 0.0
+        self.erros = 0
+
+    def registrar(self, duracao_ms: float, erro: bool = False):
+        self._contagens[bisect_left(self.buckets, duracao_ms)] += 1
+        self.total += 1
+        self.soma_ms += duracao_ms
+        self.maximo_ms = max(self.maximo_ms, duracao_ms)
+        if erro:
+            self.erros += 1
+
+    def percentil(self, fracao: float) -> Optional[float]:
+        """Limite superior do bucket que contém o percentil pedido"""
+        if not self.total:
+            return None
+        alvo = fracao * self.total
+        acumulado = 0
+        for limite, contagem in zip(self.buckets, self._contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return self.maximo_ms
+
+    def estatisticas(self) -> Dict[str, Any]:
+        acumulado = 0
+        buckets = {}
+        for limite, contagem in zip(self.buckets, self._contagens):
+            acumulado += contagem
+            buckets[str(limite)] = acumulado
+        buckets['+Inf'] = self.total
+        return {
+            'total': self.total,
+            'erros': self.erros,
+            'soma_ms': round(self.soma_ms, 2),
+            'media_ms': round(self.soma_ms / self.total, 2) if self.total else 0.0,
+            'maximo_ms': round(self.maximo_ms, 2),
+            'p50_ms': self.percentil(0.5),
+            'p95_ms': self.percentil(0.95),
+            'buckets': buckets
+        }
+
+
+class ClienteHTTP:
+    """
+    Sessão requests com pool de conexões keep-alive, timeouts de conexão
+    e leitura separados, retry opcional com backoff exponencial e jitter
+    completo, e histogramas de latência por endpoint.
+    """
+
+    def __init__(self,
+                 timeout_conexao: float = TIMEOUT_CONEXAO_SEGUNDOS,
+                 timeout_leitura: float = TIMEOUT_LEITURA_SEGUNDOS,
+                 tentativas_extras: int = TENTATIVAS_EXTRAS,
+                 backoff_base: float = BACKOFF_BASE_SEGUNDOS,
+                 conexoes_por_host: int = CONEXOES_POR_HOST):
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.tentativas_extras = max(0, tentativas_extras)
+        self.backoff_base = backoff_base
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=conexoes_por_host, max_retries=0)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+        self._lock = threading.Lock()
+        self._histogramas: Dict[str, HistogramaLatencia] = {}
+        self.repeticoes = 0
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, endpoint: Optional[str] = None) -> requests.Response:
+        """GET com retry para falhas de rede e status temporários (429/5xx)"""
+        endpoint = endpoint or url
+        tentativa = 0
+        while True:
+            inicio = time.perf_counter()
+            try:
+                response = self.sessao.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._registrar(endpoint, inicio, erro=True)
+                if tentativa >= self.tentativas_extras:
+                    raise
+            else:
+                repetir = response.status_code in STATUS_REPETIVEIS
+                self._registrar(endpoint, inicio, erro=response.status_code >= 400)
+                if not repetir or tentativa >= self.tentativas_extras:
+                    return response
+                response.close()
+            self._aguardar_backoff(tentativa)
+            tentativa += 1
+
+    def _aguardar_backoff(self, tentativa: int):
+        with self._lock:
+            self.repeticoes += 1
+        teto = min(BACKOFF_MAXIMO_SEGUNDOS, self.backoff_base * (2 ** tentativa))
+        time.sleep(random.uniform(0, teto))
+
+    def _registrar(self, endpoint: str, inicio: float, erro: bool = False):
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            histograma = self._histogramas.get(endpoint)
+            if histograma is None:
+                histograma = self._histogramas[endpoint] = HistogramaLatencia()
+            histograma.registrar(duracao_ms, erro)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Configuração e histogramas de latência por endpoint"""
+        with self._lock:
+            return {
+                'timeout_conexao': self.timeout[0],
+                'timeout_leitura': self.timeout[1],
+                'tentativas_extras': self.tentativas_extras,
+                'repeticoes': self.repeticoes,
+                'endpoints': {nome: h.estatisticas() for nome, h in self._histogramas.items()}
+            }
+
+    def fechar(self):
+        """Fecha as conexões keep-alive da sessão"""
+        self.sessao.close()
+
+
+_cliente: Optional[ClienteHTTP] = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente_http():
+    """Retorna o cliente HTTP global, criando-o na primeira chamada"""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = ClienteHTTP()
+    return _cliente
+
+
+def definir_cliente_http(cliente) -> Optional[ClienteHTTP]:
+    """
+    Substitui o cliente global (por exemplo, por um apontando para um
+    servidor stub local) e retorna o anterior
+    """
+    global _cliente
+    with _cliente_lock:
+        anterior, _cliente = _cliente, cliente
+    return anterior
+
+
+def estatisticas_http() -> Dict[str, Any]:
+    """Histogramas de latência do cliente HTTP global"""
+    return obter_cliente_http().estatisticas()
@@ -2,20 +2,197 @@
 # SERVIÇO DE CLIMA - Open-Meteo (100% GRÁTIS, SEM CADASTRO!)
 # =============================================================================
 
-import requests
 import json
+import os
 import random
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+from database import get_connection
+from cliente_http import obter_cliente_http
+from metricas import metricas, medir
 
 # Open-Meteo - COMPLETAMENTE GRÁTIS (sem cadastro, sem chave, sem limite)
 # Documentação: https://open-meteo.com/
-BASE_URL = "https://api.open-meteo.com/v1/forecast"
-GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+# As URLs podem apontar para o stub local (stub_open_meteo.py) em testes de carga offline
+BASE_URL = os.environ.get("GUARDA_ROUPA_CLIMA_URL", "https://api.open-meteo.com/v1/forecast")
+GEOCODING_URL = os.environ.get("GUARDA_ROUPA_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
 
 # Sistema sempre usa dados reais!
 USE_REAL_API = True
 
+# Cache de clima: condições atuais mudam devagar, coordenadas de cidades nunca
+CLIMA_TTL_SEGUNDOS = 600
+CLIMA_CACHE_MAX_ENTRADAS = 1024
+CASAS_DECIMAIS_COORDENADAS = 2
+
+# =============================================================================
+# CACHES (CLIMA EM MEMÓRIA COM TTL E GEOCODING PERSISTENTE)
+# =============================================================================
+
+class CacheTTL:
+    """
+    Cache em memória com expiração por tempo e contadores de hit/miss.
+    Guarda as respostas brutas da Open-Meteo; o processamento é refeito
+    a cada leitura para manter timestamp e nome da cidade corretos.
+    """
+
+    def __init__(self, ttl_segundos: float = CLIMA_TTL_SEGUNDOS, max_entradas: int = CLIMA_CACHE_MAX_ENTRADAS):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._itens: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirados = 0
+
+    def obter(self, chave) -> Optional[Any]:
+        """Retorna o valor em cache ou None se ausente/expirado"""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            expira_em, valor = item
+            if expira_em <= agora:
+                del self._itens[chave]
+                self.expirados += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            return valor
+
+    def guardar(self, chave, valor):
+        """Guarda um valor até o fim do TTL"""
+        agora = time.monotonic()
+        with self._lock:
+            if len(self._itens) >= self.max_entradas and chave not in self._itens:
+                self._descartar_expirados(agora)
+                if len(self._itens) >= self.max_entradas:
+                    mais_antiga = min(self._itens, key=lambda c: self._itens[c][0])
+                    del self._itens[mais_antiga]
+            self._itens[chave] = (agora + self.ttl_segundos, valor)
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._itens.clear()
+
+    def _descartar_expirados(self, agora: float):
+        for chave in [c for c, (expira_em, _) in self._itens.items() if expira_em <= agora]:
+            del self._itens[chave]
+            self.expirados += 1
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de uso do cache"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'entradas': len(self._itens),
+                'ttl_segundos': self.ttl_segundos,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirados': self.expirados,
+                'taxa_acerto': round(self.hits / consultas, 3) if consultas else 0.0
+            }
+
+class CacheGeocoding:
+    """
+    Cache de geocoding persistido na tabela cache_geocoding, com uma
+    cópia em memória. Apenas cidades encontradas são gravadas, para que
+    falhas temporárias da API não fiquem registradas.
+    """
+
+    def __init__(self):
+        self._memoria: Dict[str, Tuple[float, float, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalizar(cidade: str) -> str:
+        return ' '.join(cidade.strip().lower().split())
+
+    def obter(self, cidade: str) -> Optional[Tuple[float, float, str]]:
+        """Retorna (lat, lon, nome) da cidade se já tiver sido resolvida"""
+        chave = self._normalizar(cidade)
+        with self._lock:
+            coords = self._memoria.get(chave)
+        if coords is None:
+            try:
+                conn = get_connection()
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "SELECT latitude, longitude, nome FROM cache_geocoding WHERE cidade = ?", (chave,)
+                    )
+                    linha = cursor.fetchone()
+                    conn.commit()
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"Erro ao ler cache de geocoding: {e}")
+                linha = None
+            if linha:
+                coords = (linha[0], linha[1], linha[2])
+                with self._lock:
+                    self._memoria[chave] = coords
+        with self._lock:
+            if coords is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return coords
+
+    def guardar(self, cidade: str, coords: Tuple[float, float, str]):
+        """Persiste as coordenadas resolvidas de uma cidade"""
+        chave = self._normalizar(cidade)
+        with self._lock:
+            self._memoria[chave] = coords
+        try:
+            conn = get_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO cache_geocoding (cidade, latitude, longitude, nome)
+                    VALUES (?, ?, ?, ?)
+                ''', (chave, coords[0], coords[1], coords[2]))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Erro ao gravar cache de geocoding: {e}")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de uso do cache"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'entradas_memoria': len(self._memoria),
+                'hits': self.hits,
+                'misses': self.misses,
+                'taxa_acerto': round(self.hits / consultas, 3) if consultas else 0.0
+            }
+
+# Instâncias globais dos caches
+cache_clima = CacheTTL()
+cache_geocoding = CacheGeocoding()
+metricas.registrar_cache('clima', cache_clima.estatisticas)
+metricas.registrar_cache('geocoding', cache_geocoding.estatisticas)
+
+def chave_coordenadas(lat: float, lon: float, *extra) -> tuple:
+    """Chave de cache por coordenadas arredondadas (~1 km com 2 casas decimais)"""
+    return (round(float(lat), CASAS_DECIMAIS_COORDENADAS), round(float(lon), CASAS_DECIMAIS_COORDENADAS)) + extra
+
+def estatisticas_cache_clima() -> Dict[str, Any]:
+    """Hits/misses dos caches de clima e de geocoding"""
+    return {
+        'clima': cache_clima.estatisticas(),
+        'geocoding': cache_geocoding.estatisticas()
+    }
+
 def obter_clima_por_cidade(cidade: str) -> Dict[str, Any]:
     """
     Obtém informações climáticas para uma cidade específica
@@ -47,10 +224,15 @@ def obter_clima_real_por_cidade(cidade: str) -> Dict[str, Any]:
     except Exception as e:
         raise Exception(f"Erro ao buscar clima: {str(e)}")
 
+@medir('clima.geocoding')
 def obter_coordenadas_cidade(cidade: str) -> tuple:
     """
     Obtém coordenadas da cidade usando geocoding gratuito
     """
+    coords = cache_geocoding.obter(cidade)
+    if coords:
+        return coords
+    
     try:
         params = {
             'name': cidade,
@@ -59,7 +241,7 @@ def obter_coordenadas_cidade(cidade: str) -> tuple:
             'format': 'json'
         }
         
-        response = requests.get(GEOCODING_URL, params=params, timeout=10)
+        response = obter_cliente_http().get(GEOCODING_URL, params=params, endpoint='geocoding')
         
         if response.status_code == 200:
             data = response.json()
@@ -68,6 +250,7 @@ def obter_coordenadas_cidade(cidade: str) -> tuple:
                 lat = result['latitude']
                 lon = result['longitude']
                 nome = result['name']
+                cache_geocoding.guardar(cidade, (lat, lon, nome))
                 return lat, lon, nome
             else:
                 return None
@@ -90,10 +273,16 @@ def obter_clima_por_coordenadas(lat: float, lon: float) -> Dict[str, Any]:
         cidade = determinar_cidade_por_coordenadas(lat, lon)
         return simular_clima_por_cidade(cidade)
 
+@medir('clima.atual')
 def obter_clima_real_por_coordenadas(lat: float, lon: float, cidade: str = None) -> Dict[str, Any]:
     """
     Busca clima real por coordenadas usando Open-Meteo
     """
+    chave = chave_coordenadas(lat, lon)
+    data = cache_clima.obter(chave)
+    if data is not None:
+        return processar_dados_clima_real(data, lat, lon, cidade)
+    
     try:
         params = {
             'latitude': lat,
@@ -103,18 +292,95 @@ def obter_clima_real_por_coordenadas(lat: float, lon: float, cidade: str = None)
             'forecast_days': 1
         }
         
-        response = requests.get(BASE_URL, params=params, timeout=10)
+        response = obter_cliente_http().get(BASE_URL, params=params, endpoint='clima_atual')
         
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Clima real obtido com sucesso via Open-Meteo!")
-            return processar_dados_clima_real(data, lat, lon, cidade)
+            resultado = processar_dados_clima_real(data, lat, lon, cidade)
+            cache_clima.guardar(chave, data)
+            return resultado
         else:
             raise Exception(f"API retornou status {response.status_code}")
             
     except Exception as e:
         raise Exception(f"Erro ao buscar clima: {str(e)}")
 
+@medir('clima.previsao')
+def obter_previsao_por_cidade(cidade: str, dias: int) -> List[Dict[str, Any]]:
+    """
+    Obtém a previsão diária (um dicionário de clima por dia) para uma cidade
+    """
+    try:
+        print(f"🌐 Buscando previsão de {dias} dias para {cidade} via Open-Meteo...")
+        coords = obter_coordenadas_cidade(cidade)
+        if not coords:
+            raise Exception(f"Cidade '{cidade}' não encontrada")
+        
+        lat, lon, nome_cidade = coords
+        chave = chave_coordenadas(lat, lon, 'diaria', dias)
+        data = cache_clima.obter(chave)
+        if data is not None:
+            return processar_previsao_diaria(data, lat, lon, nome_cidade)
+        
+        params = {
+            'latitude': lat,
+            'longitude': lon,
+            'daily': 'weather_code,temperature_2m_max,temperature_2m_min,apparent_temperature_max,precipitation_sum,wind_speed_10m_max',
+            'timezone': 'auto',
+            'forecast_days': dias
+        }
+        
+        response = obter_cliente_http().get(BASE_URL, params=params, endpoint='previsao_diaria')
+        
+        if response.status_code != 200:
+            raise Exception(f"API retornou status {response.status_code}")
+        
+        data = response.json()
+        previsao = processar_previsao_diaria(data, lat, lon, nome_cidade)
+        cache_clima.guardar(chave, data)
+        return previsao
+        
+    except Exception as e:
+        print(f"❌ Erro ao obter previsão real: {str(e)}")
+        print("🔄 Usando previsão simulada como fallback...")
+        return [simular_clima_por_cidade(cidade, dia) for dia in range(dias)]
+
+def processar_previsao_diaria(data: Dict, lat: float, lon: float, cidade: str) -> List[Dict[str, Any]]:
+    """
+    Converte o bloco 'daily' da Open-Meteo em uma lista de climas no formato padronizado
+    """
+    daily = data['daily']
+    previsao = []
+    
+    for i, data_dia in enumerate(daily.get('time', [])):
+        def valor_dia(chave: str, padrao):
+            valores = daily.get(chave) or []
+            return valores[i] if i < len(valores) and valores[i] is not None else padrao
+        
+        temp_max = valor_dia('temperature_2m_max', 25)
+        temp_min = valor_dia('temperature_2m_min', 15)
+        weather_code = valor_dia('weather_code', 0)
+        
+        previsao.append({
+            "cidade": cidade,
+            "pais": "BR",
+            "data": data_dia,
+            "temperatura": round((temp_max + temp_min) / 2),
+            "sensacao_termica": round(valor_dia('apparent_temperature_max', temp_max)),
+            "temperatura_min": round(temp_min),
+            "temperatura_max": round(temp_max),
+            "vento": round(valor_dia('wind_speed_10m_max', 0)),
+            "condicao": converter_codigo_tempo(weather_code),
+            "condicao_id": weather_code,
+            "precipitacao": valor_dia('precipitation_sum', 0),
+            "coordenadas": {"lat": lat, "lon": lon},
+            "fonte": "Open-Meteo (100% Gratuita)",
+            "qualidade": "real"
+        })
+    
+    return previsao
+
 def processar_dados_clima_real(data: Dict, lat: float, lon: float, cidade: str = None) -> Dict[str, Any]:
     """
     Processa dados reais da Open-Meteo para formato padronizado
@@ -190,12 +456,12 @@ def converter_codigo_tempo(codigo: int) -> str:
 # SISTEMA DE SIMULAÇÃO (FALLBACK)
 # =============================================================================
 
-def simular_clima_por_cidade(cidade: str) -> Dict[str, Any]:
+def simular_clima_por_cidade(cidade: str, dia: int = 0) -> Dict[str, Any]:
     """
     Simula dados climáticos realistas para uma cidade
     """
-    # Usar cidade como seed para consistência
-    random.seed(hash(cidade) % 1000)
+    # Usar cidade (e o dia, em previsões) como seed para consistência
+    random.seed(hash(cidade) % 1000 + dia)
     
     # Padrões climáticos brasileiros realistas
     temperaturas_por_regiao = {
@@ -1,7 +1,269 @@
 import sqlite3
 import os
-def get_connection():
-    """Conecta ao banco de dados SQLite"""
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Database", "roupas.db")
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+DB_PATH = os.environ.get(
+    "GUARDA_ROUPA_DB",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "Database", "roupas.db")
+)
+POOL_TAMANHO = int(os.environ.get("GUARDA_ROUPA_DB_POOL", "8"))
+POOL_ESPERA_SEGUNDOS = 2.0
+# Intervalo entre verificações de conexões abandonadas enquanto um empréstimo espera
+POOL_INTERVALO_ESPERA_SEGUNDOS = 0.05
+BUSY_TIMEOUT_MS = 5000
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+# Chamado a cada instrução executada pela aplicação (ver metricas.py); None desativa
+_observador_consultas = None
+def definir_observador_consultas(funcao):
+    """Define a função chamada (sem argumentos) a cada execute/executemany"""
+    global _observador_consultas
+    _observador_consultas = funcao
+class CursorContado(sqlite3.Cursor):
+    """Cursor que avisa o observador de consultas; executemany conta como uma instrução"""
+    def execute(self, sql, parametros=()):
+        observador = _observador_consultas
+        if observador is not None:
+            observador()
+        return super().execute(sql, parametros)
+    def executemany(self, sql, parametros):
+        observador = _observador_consultas
+        if observador is not None:
+            observador()
+        return super().executemany(sql, parametros)
+    def executescript(self, script):
+        observador = _observador_consultas
+        if observador is not None:
+            observador()
+        return super().executescript(script)
+def _abrir_conexao(db_path):
+    """Abre uma conexão SQLite já configurada com os PRAGMAs de desempenho"""
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    return sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+class ConexaoPooled:
+    """Conexão emprestada do pool; close() devolve ao pool em vez de fechar"""
+    def __init__(self, pool, conn, overflow=False):
+        self._pool = pool
+        self._conn = conn
+        self._overflow = overflow
+    def __getattr__(self, nome):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool")
+        return getattr(self._conn, nome)
+    def cursor(self):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool")
+        return self._conn.cursor(CursorContado)
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool.devolver(conn, self._overflow)
+    def __del__(self):
+        # Conexão emprestada e nunca fechada: a vaga volta ao pool no próximo empréstimo.
+        # Não devolve aqui porque o coletor pode rodar com o lock do pool já adquirido
+        conn = self.__dict__.get('_conn')
+        if conn is not None and not self._overflow:
+            self._conn = None
+            self._pool.abandonar(conn)
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._conn is not None:
+                if exc_type is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+        finally:
+            self.close()
+        return False
+class PoolConexoes:
+    """Pool limitado de conexões SQLite reutilizáveis"""
+    def __init__(self, db_path, tamanho=POOL_TAMANHO, espera=POOL_ESPERA_SEGUNDOS):
+        self.db_path = db_path
+        self.tamanho = max(1, tamanho)
+        self.espera = espera
+        self._ociosas = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._criadas = 0
+        self._emprestadas = 0
+        self._hits = 0
+        self._misses = 0
+        self._esperas = 0
+        self._overflow = 0
+        self._abandonadas = deque()
+        self._recuperadas = 0
+    def _resetar_se_fork(self):
+        if os.getpid() != self._pid:
+            with self._lock:
+                self._ociosas = queue.LifoQueue()
+                self._pid = os.getpid()
+                self._criadas = 0
+                self._emprestadas = 0
+                self._abandonadas = deque()
+    def abandonar(self, conn):
+        """Recebe uma conexão emprestada que foi coletada sem close() (sem locks: chamado por __del__)"""
+        self._abandonadas.append((os.getpid(), conn))
+    def _recuperar_abandonadas(self):
+        while True:
+            try:
+                pid, conn = self._abandonadas.popleft()
+            except IndexError:
+                return
+            if pid != self._pid:
+                continue
+            with self._lock:
+                self._recuperadas += 1
+            print("⚠️ Conexão emprestada sem close() devolvida ao pool")
+            self.devolver(conn)
+    def emprestar(self):
+        """Empresta uma conexão do pool, abrindo uma nova se houver capacidade"""
+        self._resetar_se_fork()
+        self._recuperar_abandonadas()
+        try:
+            conn = self._ociosas.get_nowait()
+            with self._lock:
+                self._hits += 1
+                self._emprestadas += 1
+            return ConexaoPooled(self, conn)
+        except queue.Empty:
+            pass
+        with self._lock:
+            pode_criar = self._criadas < self.tamanho
+            if pode_criar:
+                self._criadas += 1
+                self._misses += 1
+                self._emprestadas += 1
+        if pode_criar:
+            try:
+                return ConexaoPooled(self, _abrir_conexao(self.db_path))
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                    self._emprestadas -= 1
+                raise
+        with self._lock:
+            self._esperas += 1
+        limite = time.monotonic() + self.espera
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                conn = self._ociosas.get(timeout=min(restante, POOL_INTERVALO_ESPERA_SEGUNDOS))
+            except queue.Empty:
+                self._recuperar_abandonadas()
+                continue
+            with self._lock:
+                self._emprestadas += 1
+            return ConexaoPooled(self, conn)
+        with self._lock:
+            self._overflow += 1
+        return ConexaoPooled(self, _abrir_conexao(self.db_path), overflow=True)
+    def devolver(self, conn, overflow=False):
+        """Devolve a conexão ao pool descartando transações pendentes"""
+        if overflow or os.getpid() != self._pid:
+            conn.close()
+            return
+        descartar = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            descartar = True
+        with self._lock:
+            self._emprestadas -= 1
+            if descartar:
+                self._criadas -= 1
+        if descartar:
+            conn.close()
+            return
+        self._ociosas.put(conn)
+    def fechar(self):
+        """Fecha todas as conexões ociosas"""
+        with self._lock:
+            while True:
+                try:
+                    self._ociosas.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._criadas -= 1
+    def estatisticas(self):
+        """Retorna contadores de uso do pool"""
+        with self._lock:
+            return {
+                'db_path': self.db_path,
+                'tamanho': self.tamanho,
+                'criadas': self._criadas,
+                'emprestadas': self._emprestadas,
+                'ociosas': self._ociosas.qsize(),
+                'hits': self._hits,
+                'misses': self._misses,
+                'esperas': self._esperas,
+                'overflow': self._overflow,
+                'recuperadas': self._recuperadas
+            }
+_pool = None
+_pool_lock = threading.Lock()
+def obter_pool():
+    """Retorna o pool global, criando-o na primeira chamada"""
+    global _pool
+    if _pool is None or _pool.db_path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.db_path != DB_PATH:
+                if _pool is not None:
+                    _pool.fechar()
+                _pool = PoolConexoes(DB_PATH)
+    return _pool
+def get_connection():
+    """Empresta uma conexão do pool SQLite; close() devolve a conexão ao pool"""
+    return obter_pool().emprestar()
+@contextmanager
+def conexao():
+    """Empresta uma conexão com commit ao final do bloco e rollback em caso de erro"""
+    with get_connection() as conn:
+        yield conn
+def estatisticas_pool():
+    """Contadores de hits, misses e esperas do pool de conexões"""
+    return obter_pool().estatisticas()
+def fechar_pool():
+    """Fecha as conexões ociosas do pool global"""
+    if _pool is not None:
+        _pool.fechar()
+def explicar_consulta(cursor, sql, params=()):
+    """Retorna as linhas de detalhe do EXPLAIN QUERY PLAN de uma consulta"""
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return [linha[-1] for linha in cursor.fetchall()]
+class PlanoSemIndice(RuntimeError):
+    """Consulta quente cujo plano não usa o índice esperado (ou ordena em B-tree temporária)"""
+def verificar_uso_indice(cursor, sql, params, indice):
+    """
+    Garante que a consulta usa o índice informado e não ordena em B-tree
+    temporária; levanta PlanoSemIndice (não assert, que some com python -O)
+    """
+    detalhes = explicar_consulta(cursor, sql, params)
+    usa_indice = any(indice in detalhe for detalhe in detalhes)
+    ordena_em_memoria = any('TEMP B-TREE' in detalhe for detalhe in detalhes)
+    if not usa_indice or ordena_em_memoria:
+        raise PlanoSemIndice(f"Plano sem {indice}: {detalhes}")
+    return detalhes
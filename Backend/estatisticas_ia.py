@@ -0,0 +1,189 @@
+# =============================================================================
+# ESTATÍSTICAS DA IA MATERIALIZADAS - CONTADORES MANTIDOS POR TRIGGERS
+# =============================================================================
+
+from typing import Dict, Any
+from database import get_connection
+
+# Feedback a partir desta nota conta como positivo
+RATING_POSITIVO = 4
+
+SQL_CRIAR_CONTADORES = '''
+    CREATE TABLE IF NOT EXISTS contadores_ia (
+        id INTEGER PRIMARY KEY CHECK (id = 1),  -- linha única
+        total_feedbacks INTEGER NOT NULL DEFAULT 0,
+        soma_ratings INTEGER NOT NULL DEFAULT 0,
+        feedbacks_positivos INTEGER NOT NULL DEFAULT 0,
+        sugestoes_usadas INTEGER NOT NULL DEFAULT 0,
+        padroes_aprendidos INTEGER NOT NULL DEFAULT 0,
+        preferencias_positivas INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+SQL_CRIAR_SUGESTOES_DIARIAS = '''
+    CREATE TABLE IF NOT EXISTS sugestoes_diarias (
+        dia TEXT PRIMARY KEY,  -- YYYY-MM-DD (horário local)
+        total INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+'''
+
+# Cada trigger aplica à linha única a diferença causada pela escrita. As comparações ficam em
+# COALESCE: com a coluna NULL elas dariam NULL, violando o NOT NULL e abortando a escrita do usuário
+TRIGGERS_CONTADORES = (
+    f"""CREATE TRIGGER IF NOT EXISTS trg_contadores_feedback_insert
+        AFTER INSERT ON feedback_sugestoes
+        BEGIN
+            UPDATE contadores_ia SET
+                total_feedbacks = total_feedbacks + 1,
+                soma_ratings = soma_ratings + NEW.feedback_usuario,
+                feedbacks_positivos = feedbacks_positivos + COALESCE(NEW.feedback_usuario >= {RATING_POSITIVO}, 0),
+                sugestoes_usadas = sugestoes_usadas + COALESCE(NEW.usado = 1, 0)
+            WHERE id = 1;
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_contadores_feedback_update
+        AFTER UPDATE OF feedback_usuario, usado ON feedback_sugestoes
+        BEGIN
+            UPDATE contadores_ia SET
+                soma_ratings = soma_ratings - OLD.feedback_usuario + NEW.feedback_usuario,
+                feedbacks_positivos = feedbacks_positivos
+                    - COALESCE(OLD.feedback_usuario >= {RATING_POSITIVO}, 0) + COALESCE(NEW.feedback_usuario >= {RATING_POSITIVO}, 0),
+                sugestoes_usadas = sugestoes_usadas - COALESCE(OLD.usado = 1, 0) + COALESCE(NEW.usado = 1, 0)
+            WHERE id = 1;
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_contadores_feedback_delete
+        AFTER DELETE ON feedback_sugestoes
+        BEGIN
+            UPDATE contadores_ia SET
+                total_feedbacks = total_feedbacks - 1,
+                soma_ratings = soma_ratings - OLD.feedback_usuario,
+                feedbacks_positivos = feedbacks_positivos - COALESCE(OLD.feedback_usuario >= {RATING_POSITIVO}, 0),
+                sugestoes_usadas = sugestoes_usadas - COALESCE(OLD.usado = 1, 0)
+            WHERE id = 1;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_contadores_padroes_insert
+        AFTER INSERT ON padroes_aprendidos
+        BEGIN
+            UPDATE contadores_ia SET padroes_aprendidos = padroes_aprendidos + 1 WHERE id = 1;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_contadores_padroes_delete
+        AFTER DELETE ON padroes_aprendidos
+        BEGIN
+            UPDATE contadores_ia SET padroes_aprendidos = padroes_aprendidos - 1 WHERE id = 1;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_contadores_preferencias_insert
+        AFTER INSERT ON preferencias_usuario
+        BEGIN
+            UPDATE contadores_ia SET preferencias_positivas = preferencias_positivas + COALESCE(NEW.peso > 0, 0) WHERE id = 1;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_contadores_preferencias_update
+        AFTER UPDATE OF peso ON preferencias_usuario
+        BEGIN
+            UPDATE contadores_ia SET
+                preferencias_positivas = preferencias_positivas - COALESCE(OLD.peso > 0, 0) + COALESCE(NEW.peso > 0, 0)
+            WHERE id = 1;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_contadores_preferencias_delete
+        AFTER DELETE ON preferencias_usuario
+        BEGIN
+            UPDATE contadores_ia SET preferencias_positivas = preferencias_positivas - COALESCE(OLD.peso > 0, 0) WHERE id = 1;
+        END""",
+)
+
+# Recalcula tudo a partir das tabelas (a cada boot, em migracoes.verificar_banco, para
+# corrigir escritas feitas sem os triggers)
+SQL_RECALCULAR_CONTADORES = f'''
+    INSERT OR REPLACE INTO contadores_ia
+        (id, total_feedbacks, soma_ratings, feedbacks_positivos, sugestoes_usadas,
+         padroes_aprendidos, preferencias_positivas)
+    SELECT 1, f.total, f.soma, f.positivos, f.usadas,
+        (SELECT COUNT(*) FROM padroes_aprendidos),
+        (SELECT COUNT(*) FROM preferencias_usuario WHERE peso > 0)
+    FROM (
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(feedback_usuario), 0) AS soma,
+               COALESCE(SUM(feedback_usuario >= {RATING_POSITIVO}), 0) AS positivos,
+               COALESCE(SUM(usado = 1), 0) AS usadas
+        FROM feedback_sugestoes
+    ) AS f
+'''
+
+SQL_LER_CONTADORES = '''
+    SELECT c.total_feedbacks, c.soma_ratings, c.feedbacks_positivos, c.sugestoes_usadas,
+           c.padroes_aprendidos, c.preferencias_positivas,
+           COALESCE((SELECT total FROM sugestoes_diarias WHERE dia = date('now', 'localtime')), 0)
+    FROM contadores_ia AS c
+    WHERE c.id = 1
+'''
+
+SQL_REGISTRAR_SUGESTOES = '''
+    INSERT INTO sugestoes_diarias (dia, total) VALUES (date('now', 'localtime'), ?)
+    ON CONFLICT(dia) DO UPDATE SET total = total + excluded.total
+'''
+
+
+def criar_contadores(cursor):
+    """
+    Cria as tabelas de contadores e os triggers e recalcula os totais.
+    Deve rodar depois de feedback_sugestoes, padroes_aprendidos e
+    preferencias_usuario existirem (sem commit; o chamador confirma).
+    """
+    cursor.execute(SQL_CRIAR_CONTADORES)
+    cursor.execute(SQL_CRIAR_SUGESTOES_DIARIAS)
+    for trigger in TRIGGERS_CONTADORES:
+        cursor.execute(trigger)
+    cursor.execute(SQL_RECALCULAR_CONTADORES)
+
+
+def recriar_triggers_contadores(cursor):
+    """
+    Troca os triggers de contadores já gravados no banco pelos de
+    TRIGGERS_CONTADORES (CREATE TRIGGER IF NOT EXISTS não altera os
+    existentes) e recalcula os totais (sem commit)
+    """
+    nomes = [linha[0] for linha in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_contadores_%'"
+    ).fetchall()]
+    for nome in nomes:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+    criar_contadores(cursor)
+
+
+def registrar_sugestoes(quantidade: int = 1):
+    """Soma sugestões geradas ao contador do dia"""
+    if quantidade <= 0:
+        return
+    conn = get_connection()
+    try:
+        conn.execute(SQL_REGISTRAR_SUGESTOES, (quantidade,))
+        conn.commit()
+    except Exception as e:
+        print(f"Erro ao registrar sugestões do dia: {e}")
+    finally:
+        conn.close()
+
+
+def _percentual(parte: float, total: float) -> float:
+    return round(parte / total * 100, 1) if total else 0
+
+
+def ler_estatisticas() -> Dict[str, Any]:
+    """Estatísticas da IA a partir da linha de contadores (leitura O(1))"""
+    conn = get_connection()
+    try:
+        linha = conn.execute(SQL_LER_CONTADORES).fetchone()
+    finally:
+        conn.close()
+    total, soma, positivos, usadas, padroes, preferencias, hoje = linha or (0, 0, 0, 0, 0, 0, 0)
+    rating_medio = soma / total if total else 0
+    return {
+        'total_feedbacks': total,
+        'rating_medio': round(rating_medio, 2),
+        'sugestoes_usadas': usadas,
+        'taxa_uso': _percentual(usadas, total),
+        'padroes_aprendidos': padroes,
+        'preferencias_positivas': preferencias,
+        'feedback_positivo': _percentual(positivos, total),
+        # Nota média em relação à nota máxima (5)
+        'precisao_ia': _percentual(rating_medio, 5),
+        'sugestoes_hoje': hoje
+    }
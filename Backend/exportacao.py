@@ -0,0 +1,230 @@
+# =============================================================================
+# EXPORTAÇÃO EM STREAMING (NDJSON / GZIP) COM CURSOR INCREMENTAL
+# =============================================================================
+
+import argparse
+import json
+import sys
+import zlib
+from typing import Dict, Any, Iterator, Iterable, Optional, Tuple
+from database import get_connection
+
+LINHAS_POR_FETCH = 500
+# Acumula saída comprimida até este tamanho antes de entregar um bloco
+BLOCO_GZIP_BYTES = 64 * 1024
+
+
+class CursorExpirado(ValueError):
+    """O cursor 'since' é anterior ao trecho ainda guardado do log de alterações"""
+
+
+class ExportacaoTabela:
+    """
+    Tabela exportável. O cursor 'since' é a chave de ordenação da última
+    linha já recebida (campo _cursor de cada linha exportada); a próxima
+    exportação começa depois dela.
+    """
+
+    def __init__(self, tabela: str, colunas_json: Tuple[str, ...] = (), coluna_versao: Optional[str] = None):
+        self.tabela = tabela
+        self.colunas_json = colunas_json
+        # Tabelas com linhas que mudam são ordenadas por (coluna_versao, id) para capturar atualizações
+        self.coluna_versao = coluna_versao
+
+    def consulta(self, since: Optional[str]) -> Tuple[str, tuple]:
+        if self.coluna_versao:
+            ordem = f"{self.coluna_versao}, id"
+            if since:
+                versao, _, ultimo_id = since.rpartition('|')
+                return (f"SELECT * FROM {self.tabela} WHERE ({self.coluna_versao}, id) > (?, ?) ORDER BY {ordem}",
+                        (versao, int(ultimo_id)))
+            return f"SELECT * FROM {self.tabela} ORDER BY {ordem}", ()
+        if since:
+            return f"SELECT * FROM {self.tabela} WHERE id > ? ORDER BY id", (int(since),)
+        return f"SELECT * FROM {self.tabela} ORDER BY id", ()
+
+    def cursor_linha(self, linha: Dict[str, Any]) -> str:
+        if self.coluna_versao:
+            return f"{linha[self.coluna_versao]}|{linha['id']}"
+        return str(linha['id'])
+
+    def validar(self, cursor, since: str):
+        """Levanta ValueError se o cursor não servir para esta tabela"""
+        self.consulta(since)
+
+    def preparar_linha(self, linha: Dict[str, Any]) -> Dict[str, Any]:
+        """Decodifica as colunas JSON e acrescenta o _cursor da linha"""
+        for coluna in self.colunas_json:
+            if coluna in linha:
+                linha[coluna] = _decodificar_json(linha[coluna])
+        linha['_cursor'] = self.cursor_linha(linha)
+        return linha
+
+
+class ExportacaoLogAlteracoes(ExportacaoTabela):
+    """
+    Tabela exportada pelo seu log de alterações (ver guarda_roupa_snapshot),
+    para que edições e remoções também cheguem às exportações incrementais.
+    A exportação completa traz o estado atual com _cursor 'seq|id', onde seq
+    é o fim do log no momento da leitura (retomável no meio). Um cursor 'seq'
+    traz o estado atual de cada linha alterada depois dele, na ordem do log;
+    linhas removidas saem como {"id": ..., "_removida": true}.
+    """
+
+    def __init__(self, tabela: str, log: str, coluna_log: str, colunas_json: Tuple[str, ...] = ()):
+        super().__init__(tabela, colunas_json)
+        self.log = log
+        self.coluna_log = coluna_log
+
+    def _interpretar(self, since: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+        if not since:
+            return None, 0
+        seq, separador, ultimo_id = since.partition('|')
+        return int(seq), int(ultimo_id) if separador else None
+
+    def consulta(self, since: Optional[str]) -> Tuple[str, tuple]:
+        seq, ultimo_id = self._interpretar(since)
+        completa = (
+            f"SELECT t.*, {{seq}} AS _seq, NULL AS _id_log, 0 AS _fase, t.id AS _ordem "
+            f"FROM {self.tabela} AS t WHERE t.id > ?"
+        )
+        alteradas = (
+            f"SELECT t.*, a.seq AS _seq, a.{self.coluna_log} AS _id_log, 1 AS _fase, a.seq AS _ordem "
+            f"FROM (SELECT {self.coluna_log}, MAX(seq) AS seq FROM {self.log} WHERE seq > ? GROUP BY {self.coluna_log}) AS a "
+            f"LEFT JOIN {self.tabela} AS t ON t.id = a.{self.coluna_log}"
+        )
+        if seq is None:
+            # Fim do log lido no mesmo comando, portanto no mesmo snapshot das linhas
+            sql = completa.format(seq=f"(SELECT COALESCE(MAX(seq), 0) FROM {self.log})")
+            return f"{sql} ORDER BY t.id", (ultimo_id,)
+        if ultimo_id is None:
+            return f"{alteradas} ORDER BY a.seq", (seq,)
+        # Retomada de uma exportação completa: o restante dela e depois o que mudou desde o seu início
+        sql = f"SELECT * FROM ({completa.format(seq='?')} UNION ALL {alteradas}) ORDER BY _fase, _ordem"
+        return sql, (seq, ultimo_id, seq)
+
+    def validar(self, cursor, since: str):
+        seq, _ = self._interpretar(since)
+        primeiro = cursor.execute(f"SELECT MIN(seq) FROM {self.log}").fetchone()[0]
+        if primeiro is not None and seq < primeiro - 1:
+            raise CursorExpirado(since)
+
+    def cursor_linha(self, linha: Dict[str, Any]) -> str:
+        if linha['_fase'] == 0:
+            return f"{linha['_seq']}|{linha['id']}"
+        return str(linha['_seq'])
+
+    def preparar_linha(self, linha: Dict[str, Any]) -> Dict[str, Any]:
+        if linha['id'] is None:
+            return {'id': linha['_id_log'], '_removida': True, '_cursor': self.cursor_linha(linha)}
+        linha = super().preparar_linha(linha)
+        for coluna in ('_seq', '_id_log', '_fase', '_ordem'):
+            del linha[coluna]
+        return linha
+
+
+EXPORTACOES: Dict[str, ExportacaoTabela] = {
+    'roupas': ExportacaoLogAlteracoes('roupas', 'roupas_alteracoes', 'roupa_id'),
+    'feedback_sugestoes': ExportacaoTabela('feedback_sugestoes', ('clima_data', 'combinacao_sugerida')),
+    'combinacoes_usadas': ExportacaoTabela('combinacoes_usadas', ('roupa_ids',)),
+    'padroes_aprendidos': ExportacaoTabela('padroes_aprendidos', ('combinacao_pattern',), coluna_versao='ultima_atualizacao'),
+}
+
+
+def _decodificar_json(valor):
+    if not isinstance(valor, str):
+        return valor
+    try:
+        return json.loads(valor)
+    except ValueError:
+        return valor
+
+
+def validar_since(nome: str, since: Optional[str]):
+    """
+    Levanta ValueError se o cursor não tiver o formato da tabela, ou
+    CursorExpirado se as alterações posteriores a ele já foram podadas
+    (nesse caso é preciso refazer a exportação completa)
+    """
+    if not since:
+        return
+    conn = get_connection()
+    try:
+        EXPORTACOES[nome].validar(conn.cursor(), since)
+    finally:
+        conn.close()
+
+
+def linhas_ndjson(nome: str, since: Optional[str] = None) -> Iterator[str]:
+    """
+    Gera as linhas da tabela em NDJSON, lendo do banco em blocos
+    (memória constante). A conexão fica emprestada até o fim da iteração.
+    """
+    exportacao = EXPORTACOES[nome]
+    sql, params = exportacao.consulta(since)
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        colunas = [descricao[0] for descricao in cursor.description]
+        while True:
+            bloco = cursor.fetchmany(LINHAS_POR_FETCH)
+            if not bloco:
+                break
+            for valores in bloco:
+                linha = exportacao.preparar_linha(dict(zip(colunas, valores)))
+                yield json.dumps(linha, ensure_ascii=False, default=str) + "\n"
+    finally:
+        conn.close()
+
+
+def comprimir_gzip(linhas: Iterable[str]) -> Iterator[bytes]:
+    """Comprime um fluxo de texto em gzip de forma incremental"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pendente = []
+    tamanho = 0
+    for linha in linhas:
+        pedaco = compressor.compress(linha.encode('utf-8'))
+        if pedaco:
+            pendente.append(pedaco)
+            tamanho += len(pedaco)
+            if tamanho >= BLOCO_GZIP_BYTES:
+                yield b''.join(pendente)
+                pendente, tamanho = [], 0
+    pendente.append(compressor.flush())
+    yield b''.join(pendente)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta uma tabela em NDJSON (streaming)")
+    parser.add_argument("tabela", choices=sorted(EXPORTACOES))
+    parser.add_argument("--since", help="_cursor da última linha já exportada")
+    parser.add_argument("--gzip", action="store_true", help="comprime a saída em gzip")
+    parser.add_argument("-o", "--saida", help="arquivo de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    try:
+        validar_since(args.tabela, args.since)
+    except CursorExpirado:
+        parser.error(f"--since expirado para {args.tabela}: refaça a exportação completa")
+    except ValueError:
+        parser.error(f"--since inválido para {args.tabela}")
+
+    total = 0
+
+    def contar(linhas):
+        global total
+        for linha in linhas:
+            total += 1
+            yield linha
+
+    destino = open(args.saida, 'wb') if args.saida else sys.stdout.buffer
+    try:
+        linhas = contar(linhas_ndjson(args.tabela, args.since))
+        blocos = comprimir_gzip(linhas) if args.gzip else (linha.encode('utf-8') for linha in linhas)
+        for bloco in blocos:
+            destino.write(bloco)
+    finally:
+        if args.saida:
+            destino.close()
+    print(f"✅ {total} linhas de {args.tabela} exportadas", file=sys.stderr)
@@ -4,94 +4,76 @@
 
 import sqlite3
 import json
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from database import get_connection
+from typing import Dict, Any, List, Optional, Tuple
+from database import get_connection, verificar_uso_indice
+from preferencias_snapshot import snapshot_preferencias
+
+# Índices das tabelas de aprendizado (consultas quentes de feedback e sugestão)
+INDICES_FEEDBACK = (
+    """CREATE INDEX IF NOT EXISTS idx_padroes_contexto_pattern
+       ON padroes_aprendidos (tipo_clima, temperatura_faixa, combinacao_pattern)""",
+    """CREATE INDEX IF NOT EXISTS idx_padroes_contexto_score
+       ON padroes_aprendidos (tipo_clima, temperatura_faixa, score_medio DESC, frequencia_uso DESC)""",
+    """CREATE INDEX IF NOT EXISTS idx_feedback_sugestoes_data
+       ON feedback_sugestoes (data_feedback)""",
+)
+
+SQL_PADRAO_EXISTENTE = '''
+    SELECT id, score_medio, frequencia_uso 
+    FROM padroes_aprendidos 
+    WHERE tipo_clima = ? AND temperatura_faixa = ? AND combinacao_pattern = ?
+'''
+
+SQL_PADROES_CONTEXTO = '''
+    SELECT combinacao_pattern, score_medio, frequencia_uso
+    FROM padroes_aprendidos 
+    WHERE tipo_clima = ? AND temperatura_faixa = ?
+    ORDER BY score_medio DESC, frequencia_uso DESC
+    LIMIT 10
+'''
+
+# Soma o delta ao peso atual sem apagar/reinserir a linha (requer UNIQUE(categoria, item))
+SQL_UPSERT_PREFERENCIA = '''
+    INSERT INTO preferencias_usuario (categoria, item, peso, ultima_atualizacao)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(categoria, item) DO UPDATE SET
+        peso = peso + excluded.peso,
+        ultima_atualizacao = excluded.ultima_atualizacao
+'''
+
+SQL_HISTORICO_FEEDBACK = '''
+    SELECT data_sugestao, feedback_usuario, usado, comentario, data_feedback
+    FROM feedback_sugestoes 
+    ORDER BY data_feedback DESC 
+    LIMIT 50
+'''
+
+# (consulta, parâmetros de exemplo, índice esperado) verificados com EXPLAIN QUERY PLAN
+CONSULTAS_INDEXADAS = (
+    (SQL_PADRAO_EXISTENTE, ('sol', 'quente', '{}'), 'idx_padroes_contexto_pattern'),
+    (SQL_PADROES_CONTEXTO, ('sol', 'quente'), 'idx_padroes_contexto_score'),
+    (SQL_HISTORICO_FEEDBACK, (), 'idx_feedback_sugestoes_data'),
+)
 
 class FeedbackLearningSystem:
     """Sistema de aprendizado que coleta feedback do usuário e adapta as sugestões"""
     
-    def __init__(self):
-        self.criar_tabelas_feedback()
-    
-    def criar_tabelas_feedback(self):
-        """Cria tabelas necessárias para armazenar feedback e aprendizado"""
+    def verificar_indices(self) -> Dict[str, List[str]]:
+        """
+        Confere com EXPLAIN QUERY PLAN que as consultas quentes usam os índices.
+        Retorna os planos por índice; levanta PlanoSemIndice se algum regrediu
+        """
+        conn = get_connection()
         try:
-            conn = get_connection()
             cursor = conn.cursor()
-            
-            # Verificar se tabela preferencias_usuario existe e tem estrutura correta
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='preferencias_usuario'")
-            tabela_existe = cursor.fetchone()
-            
-            if tabela_existe:
-                # Verificar se tem a coluna categoria
-                cursor.execute("PRAGMA table_info(preferencias_usuario)")
-                colunas = [col[1] for col in cursor.fetchall()]
-                if 'categoria' not in colunas:
-                    # Recriar a tabela com estrutura correta
-                    cursor.execute('DROP TABLE IF EXISTS preferencias_usuario')
-            
-            # Tabela de feedback das sugestões
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS feedback_sugestoes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    data_sugestao DATETIME NOT NULL,
-                    clima_data TEXT NOT NULL,  -- JSON do clima
-                    combinacao_sugerida TEXT NOT NULL,  -- JSON da combinação
-                    score_original REAL NOT NULL,
-                    feedback_usuario INTEGER CHECK(feedback_usuario IN (1, 2, 3, 4, 5)) NOT NULL,
-                    comentario TEXT,
-                    usado BOOLEAN DEFAULT FALSE,
-                    data_feedback DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabela de padrões aprendidos
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS padroes_aprendidos (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    tipo_clima TEXT NOT NULL,  -- sol, chuva, frio, etc.
-                    temperatura_faixa TEXT NOT NULL,  -- quente, morno, frio
-                    combinacao_pattern TEXT NOT NULL,  -- JSON do padrão
-                    score_medio REAL NOT NULL,
-                    frequencia_uso INTEGER DEFAULT 1,
-                    ultima_atualizacao DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabela de preferências do usuário
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS preferencias_usuario (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    categoria TEXT NOT NULL,  -- cor, estilo, tipo_roupa
-                    item TEXT NOT NULL,  -- azul, casual, camisa, etc.
-                    peso REAL DEFAULT 1.0,  -- peso da preferência (-1 a 1)
-                    ultima_atualizacao DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(categoria, item)
-                )
-            ''')
-            
-            # Tabela de histórico de uso
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS historico_uso (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    roupa_id INTEGER NOT NULL,
-                    data_uso DATE NOT NULL,
-                    clima_data TEXT NOT NULL,
-                    satisfacao INTEGER CHECK(satisfacao IN (1, 2, 3, 4, 5)),
-                    FOREIGN KEY (roupa_id) REFERENCES roupas (id)
-                )
-            ''')
-            
-            conn.commit()
+            return {
+                indice: verificar_uso_indice(cursor, sql, params, indice)
+                for sql, params, indice in CONSULTAS_INDEXADAS
+            }
+        finally:
             conn.close()
-            print("✅ Tabelas de feedback criadas/verificadas com sucesso")
-            
-        except Exception as e:
-            print(f"❌ Erro ao criar tabelas de feedback: {e}")
-            # Se der erro, podemos continuar sem o sistema de aprendizado
-            pass
     
     def registrar_feedback(self, sugestao_id: str, feedback: Dict[str, Any]) -> bool:
         """
@@ -109,138 +91,126 @@ class FeedbackLearningSystem:
         """
         try:
             conn = get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO feedback_sugestoes 
-                (data_sugestao, clima_data, combinacao_sugerida, score_original, 
-                 feedback_usuario, comentario, usado)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(),
-                json.dumps(feedback['clima_data']),
-                json.dumps(feedback['combinacao']),
-                feedback.get('score_original', 0),
-                feedback['rating'],
-                feedback.get('comentario', ''),
-                feedback.get('usado', False)
-            ))
-            
-            # Atualizar padrões aprendidos
-            self._atualizar_padroes_aprendidos(feedback)
-            
-            # Atualizar preferências do usuário
-            self._atualizar_preferencias_usuario(feedback)
-            
-            conn.commit()
-            conn.close()
+            try:
+                self.aplicar_feedback(conn.cursor(), feedback)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
             return True
             
         except Exception as e:
             print(f"Erro ao registrar feedback: {e}")
             return False
     
-    def _atualizar_padroes_aprendidos(self, feedback: Dict[str, Any]):
+    def aplicar_feedback(self, cursor, feedback: Dict[str, Any],
+                         deltas: Optional[Dict[Tuple[str, str], float]] = None):
+        """
+        Grava um feedback e atualiza padrões e preferências usando o cursor
+        (e a transação) do chamador. Não faz commit nem invalida o snapshot
+        de preferências; erros sobem para o chamador decidir o rollback.
+        Se deltas for informado, os ajustes de preferência são apenas
+        acumulados nele para o chamador gravar o lote com gravar_preferencias.
+        """
+        feedback = dict(feedback, combinacao=self._normalizar_combinacao(feedback.get('combinacao')))
+        
+        cursor.execute('''
+            INSERT INTO feedback_sugestoes 
+            (data_sugestao, clima_data, combinacao_sugerida, score_original, 
+             feedback_usuario, comentario, usado)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            feedback.get('data_sugestao') or datetime.now(),
+            json.dumps(feedback['clima_data']),
+            json.dumps(feedback['combinacao']),
+            feedback.get('score_original', 0),
+            feedback['rating'],
+            feedback.get('comentario', ''),
+            feedback.get('usado', False)
+        ))
+        
+        # Atualizar padrões aprendidos
+        self._atualizar_padroes_aprendidos(cursor, feedback)
+        
+        # Atualizar preferências do usuário
+        if deltas is None:
+            self._atualizar_preferencias_usuario(cursor, feedback)
+        else:
+            self.deltas_preferencias(feedback, deltas)
+    
+    def _atualizar_padroes_aprendidos(self, cursor, feedback: Dict[str, Any]):
         """Atualiza padrões aprendidos baseado no feedback"""
-        try:
-            clima = feedback['clima_data']
-            combinacao = feedback['combinacao']
-            rating = feedback['rating']
-            
-            # Classificar tipo de clima
-            tipo_clima = self._classificar_clima(clima)
-            temperatura_faixa = self._classificar_temperatura(clima.get('temperatura', 20))
-            
-            # Criar padrão da combinação
-            pattern = self._extrair_pattern_combinacao(combinacao)
-            
-            conn = get_connection()
-            cursor = conn.cursor()
+        clima = feedback['clima_data']
+        combinacao = feedback['combinacao']
+        rating = feedback['rating']
+        
+        # Classificar tipo de clima
+        tipo_clima = self._classificar_clima(clima)
+        temperatura_faixa = self._classificar_temperatura(clima.get('temperatura', 20))
+        
+        # Criar padrão da combinação
+        pattern = self._extrair_pattern_combinacao(combinacao)
+        
+        # Verificar se padrão já existe
+        cursor.execute(SQL_PADRAO_EXISTENTE, (tipo_clima, temperatura_faixa, json.dumps(pattern)))
+        
+        existing = cursor.fetchone()
+        
+        if existing:
+            # Atualizar padrão existente
+            id_pattern, score_atual, freq_atual = existing
+            novo_score = (score_atual * freq_atual + rating) / (freq_atual + 1)
             
-            # Verificar se padrão já existe
             cursor.execute('''
-                SELECT id, score_medio, frequencia_uso 
-                FROM padroes_aprendidos 
-                WHERE tipo_clima = ? AND temperatura_faixa = ? AND combinacao_pattern = ?
-            ''', (tipo_clima, temperatura_faixa, json.dumps(pattern)))
-            
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Atualizar padrão existente
-                id_pattern, score_atual, freq_atual = existing
-                novo_score = (score_atual * freq_atual + rating) / (freq_atual + 1)
-                
-                cursor.execute('''
-                    UPDATE padroes_aprendidos 
-                    SET score_medio = ?, frequencia_uso = ?, ultima_atualizacao = ?
-                    WHERE id = ?
-                ''', (novo_score, freq_atual + 1, datetime.now(), id_pattern))
-            else:
-                # Criar novo padrão
-                cursor.execute('''
-                    INSERT INTO padroes_aprendidos 
-                    (tipo_clima, temperatura_faixa, combinacao_pattern, score_medio)
-                    VALUES (?, ?, ?, ?)
-                ''', (tipo_clima, temperatura_faixa, json.dumps(pattern), rating))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Erro ao atualizar padrões: {e}")
+                UPDATE padroes_aprendidos 
+                SET score_medio = ?, frequencia_uso = ?, ultima_atualizacao = ?
+                WHERE id = ?
+            ''', (novo_score, freq_atual + 1, datetime.now(), id_pattern))
+        else:
+            # Criar novo padrão
+            cursor.execute('''
+                INSERT INTO padroes_aprendidos 
+                (tipo_clima, temperatura_faixa, combinacao_pattern, score_medio, ultima_atualizacao)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (tipo_clima, temperatura_faixa, json.dumps(pattern), rating, datetime.now()))
     
-    def _atualizar_preferencias_usuario(self, feedback: Dict[str, Any]):
+    def _atualizar_preferencias_usuario(self, cursor, feedback: Dict[str, Any]):
         """Atualiza preferências do usuário baseado no feedback"""
-        try:
-            combinacao = feedback['combinacao']
-            rating = feedback['rating']
-            
-            # Extrair cores, estilos e tipos de roupa
-            preferencias = self._extrair_preferencias_combinacao(combinacao)
-            
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            for categoria, items in preferencias.items():
-                for item in items:
-                    # Calcular novo peso da preferência
-                    peso_feedback = (rating - 3) * 0.2  # Rating 1-5 -> peso -0.4 a 0.4
-                    
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO preferencias_usuario 
-                        (categoria, item, peso, ultima_atualizacao)
-                        VALUES (?, ?, 
-                            COALESCE((SELECT peso FROM preferencias_usuario WHERE categoria = ? AND item = ?), 0) + ?,
-                            ?)
-                    ''', (categoria, item, categoria, item, peso_feedback, datetime.now()))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Erro ao atualizar preferências: {e}")
+        self.gravar_preferencias(cursor, self.deltas_preferencias(feedback))
+    
+    def deltas_preferencias(self, feedback: Dict[str, Any],
+                            deltas: Optional[Dict[Tuple[str, str], float]] = None) -> Dict[Tuple[str, str], float]:
+        """
+        Soma em deltas o ajuste de peso de cada (categoria, item) da
+        combinação avaliada; itens repetidos são agregados
+        """
+        if deltas is None:
+            deltas = {}
+        
+        # Extrair cores, estilos e tipos de roupa
+        preferencias = self._extrair_preferencias_combinacao(feedback['combinacao'])
+        peso_feedback = (feedback['rating'] - 3) * 0.2  # Rating 1-5 -> peso -0.4 a 0.4
+        
+        for categoria, items in preferencias.items():
+            for item in items:
+                chave = (categoria, item)
+                deltas[chave] = deltas.get(chave, 0.0) + peso_feedback
+        return deltas
+    
+    def gravar_preferencias(self, cursor, deltas: Dict[Tuple[str, str], float]) -> int:
+        """Aplica os deltas agregados com um único upsert em lote (sem commit)"""
+        agora = datetime.now()
+        cursor.executemany(SQL_UPSERT_PREFERENCIA, [
+            (categoria, item, delta, agora) for (categoria, item), delta in deltas.items()
+        ])
+        return len(deltas)
     
     def obter_preferencias_usuario(self) -> Dict[str, Dict[str, float]]:
         """Obtém preferências atuais do usuário"""
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT categoria, item, peso 
-                FROM preferencias_usuario 
-                ORDER BY categoria, peso DESC
-            ''')
-            
-            preferencias = {}
-            for categoria, item, peso in cursor.fetchall():
-                if categoria not in preferencias:
-                    preferencias[categoria] = {}
-                preferencias[categoria][item] = peso
-            
-            conn.close()
-            return preferencias
+            return snapshot_preferencias.atual().como_dict()
             
         except Exception as e:
             print(f"Erro ao obter preferências: {e}")
@@ -249,35 +219,37 @@ class FeedbackLearningSystem:
     def obter_padroes_aprendidos(self, clima_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Obtém padrões aprendidos relevantes para o clima atual"""
         try:
-            tipo_clima = self._classificar_clima(clima_data)
-            temperatura_faixa = self._classificar_temperatura(clima_data.get('temperatura', 20))
+            tipo_clima, temperatura_faixa = self.classificar_contexto(clima_data)
             
             conn = get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT combinacao_pattern, score_medio, frequencia_uso
-                FROM padroes_aprendidos 
-                WHERE tipo_clima = ? AND temperatura_faixa = ?
-                ORDER BY score_medio DESC, frequencia_uso DESC
-                LIMIT 10
-            ''', (tipo_clima, temperatura_faixa))
+            try:
+                cursor = conn.cursor()
+                cursor.execute(SQL_PADROES_CONTEXTO, (tipo_clima, temperatura_faixa))
+                linhas = cursor.fetchall()
+            finally:
+                conn.close()
             
             padroes = []
-            for pattern_json, score, freq in cursor.fetchall():
+            for pattern_json, score, freq in linhas:
                 padroes.append({
                     'pattern': json.loads(pattern_json),
                     'score': score,
                     'frequencia': freq
                 })
             
-            conn.close()
             return padroes
             
         except Exception as e:
             print(f"Erro ao obter padrões: {e}")
             return []
     
+    def classificar_contexto(self, clima_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Retorna (tipo_clima, temperatura_faixa) usados para indexar os padrões aprendidos"""
+        return (
+            self._classificar_clima(clima_data),
+            self._classificar_temperatura(clima_data.get('temperatura', 20))
+        )
+    
     def _classificar_clima(self, clima_data: Dict[str, Any]) -> str:
         """Classifica o tipo de clima em categorias"""
         condicao = clima_data.get('condicao', '').lower()
@@ -302,6 +274,14 @@ class FeedbackLearningSystem:
         else:
             return 'quente'
     
+    def _normalizar_combinacao(self, combinacao) -> Dict[str, Any]:
+        """Aceita a combinação como dict (categoria -> roupa) ou lista de roupas"""
+        if isinstance(combinacao, dict):
+            return combinacao
+        if isinstance(combinacao, (list, tuple)):
+            return {str(i): roupa for i, roupa in enumerate(combinacao) if isinstance(roupa, dict)}
+        return {}
+    
     def _extrair_pattern_combinacao(self, combinacao: Dict[str, Any]) -> Dict[str, Any]:
         """Extrai padrão da combinação para aprendizado"""
         pattern = {}
@@ -335,5 +315,14 @@ class FeedbackLearningSystem:
         
         return preferencias
 
-# Instância global do sistema de aprendizado
-feedback_system = FeedbackLearningSystem()
+_feedback_system: Optional[FeedbackLearningSystem] = None
+_feedback_system_lock = threading.Lock()
+
+def obter_feedback_system() -> FeedbackLearningSystem:
+    """Retorna o sistema de aprendizado global, criando-o na primeira chamada"""
+    global _feedback_system
+    if _feedback_system is None:
+        with _feedback_system_lock:
+            if _feedback_system is None:
+                _feedback_system = FeedbackLearningSystem()
+    return _feedback_system
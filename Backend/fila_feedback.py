@@ -0,0 +1,216 @@
+# =============================================================================
+# FILA DURÁVEL DE FEEDBACK (WRITE-BEHIND) - APRENDIZADO EM SEGUNDO PLANO
+# =============================================================================
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+from database import get_connection
+from feedback_learning import obter_feedback_system
+from metricas import metricas
+
+TAMANHO_LOTE = int(os.environ.get("GUARDA_ROUPA_FEEDBACK_LOTE", "100"))
+# Espera curta após o primeiro aviso para juntar feedbacks próximos no mesmo lote
+JANELA_LOTE_SEGUNDOS = 0.05
+# Varredura periódica: recupera itens cujo aviso se perdeu (ex.: gravados por outro processo)
+INTERVALO_VARREDURA_SEGUNDOS = 5.0
+MAX_TENTATIVAS = 3
+
+SQL_PENDENTES = '''
+    SELECT id, payload, criado_em FROM fila_feedback
+    WHERE tentativas < ?
+    ORDER BY id
+    LIMIT ?
+'''
+
+SQL_PROFUNDIDADE = '''
+    SELECT
+        COALESCE(SUM(tentativas < ?), 0),
+        COALESCE(SUM(tentativas >= ?), 0),
+        MIN(CASE WHEN tentativas < ? THEN criado_em END)
+    FROM fila_feedback
+'''
+
+
+class FilaFeedback:
+    """
+    Fila write-behind do feedback. A rota grava o feedback na tabela
+    fila_feedback (na mesma transação do registro bruto) e responde na
+    hora; uma thread de fundo drena a fila em lotes, aplicando cada lote
+    em padroes_aprendidos e preferencias_usuario numa única transação
+    (itens, upsert agregado das preferências e remoção da fila juntos).
+    Itens que falham são repetidos até MAX_TENTATIVAS e depois ficam
+    retidos na tabela para inspeção.
+    """
+
+    def __init__(self, tamanho_lote: int = TAMANHO_LOTE):
+        self.tamanho_lote = max(1, tamanho_lote)
+        self._aviso = threading.Event()
+        self._lock = threading.Lock()
+        self._drenando = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.enfileirados = 0
+        self.processados = 0
+        self.falhas = 0
+        self.lotes = 0
+        self.maior_lote = 0
+        self.ultimo_lote_ms = 0.0
+        self.ultimo_atraso_ms = 0.0
+
+    def retomar_pendentes(self):
+        """Acorda o worker se houver itens pendentes de uma execução anterior (chamado no boot)"""
+        try:
+            conn = get_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM fila_feedback WHERE tentativas < ? LIMIT 1", (MAX_TENTATIVAS,))
+                pendente = cursor.fetchone() is not None
+            finally:
+                conn.close()
+            if pendente:
+                self.notificar()
+        except Exception as e:
+            print(f"❌ Erro ao verificar fila de feedback: {e}")
+
+    def enfileirar(self, cursor, feedback: Dict[str, Any]):
+        """
+        Grava um feedback na fila usando o cursor do chamador; o item fica
+        durável quando o chamador fizer commit. Chame notificar() depois.
+        """
+        payload = dict(feedback)
+        payload.setdefault('data_sugestao', str(datetime.now()))
+        cursor.execute(
+            "INSERT INTO fila_feedback (payload, criado_em) VALUES (?, ?)",
+            (json.dumps(payload), time.time())
+        )
+        with self._lock:
+            self.enfileirados += 1
+
+    def notificar(self):
+        """Acorda o worker (iniciando-o se preciso) para drenar a fila"""
+        self._iniciar_worker()
+        self._aviso.set()
+
+    def _iniciar_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._executar, name="fila-feedback", daemon=True)
+                self._worker.start()
+
+    def _executar(self):
+        while True:
+            avisado = self._aviso.wait(INTERVALO_VARREDURA_SEGUNDOS)
+            if avisado:
+                time.sleep(JANELA_LOTE_SEGUNDOS)
+            self._aviso.clear()
+            try:
+                self.drenar()
+            except Exception as e:
+                print(f"Erro ao drenar fila de feedback: {e}")
+
+    def drenar(self) -> int:
+        """
+        Processa todos os itens pendentes de forma síncrona (flush) e
+        retorna quantos foram aplicados
+        """
+        aplicados = 0
+        with self._drenando:
+            while True:
+                processados, falhas = self._processar_lote()
+                aplicados += processados
+                if processados + falhas < self.tamanho_lote:
+                    return aplicados
+
+    def _processar_lote(self):
+        inicio = time.perf_counter()
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            # Transação única do lote; os savepoints por item ficam aninhados nela
+            # (sem o BEGIN, cada RELEASE faria commit do item sozinho)
+            cursor.execute("BEGIN IMMEDIATE")
+            itens = cursor.execute(SQL_PENDENTES, (MAX_TENTATIVAS, self.tamanho_lote)).fetchall()
+            if not itens:
+                conn.rollback()
+                return 0, 0
+            mais_antigo = min(criado_em for _, _, criado_em in itens)
+
+            processados = falhas = 0
+            # Ajustes de preferência do lote inteiro, gravados num único upsert no fim
+            deltas = {}
+            feedback_system = obter_feedback_system()
+            for item_id, payload, _ in itens:
+                # Savepoint por item: um feedback inválido não desfaz o resto do lote
+                cursor.execute("SAVEPOINT item_feedback")
+                try:
+                    deltas_item = {}
+                    feedback_system.aplicar_feedback(cursor, json.loads(payload), deltas_item)
+                    cursor.execute("DELETE FROM fila_feedback WHERE id = ?", (item_id,))
+                    cursor.execute("RELEASE item_feedback")
+                    for chave, delta in deltas_item.items():
+                        deltas[chave] = deltas.get(chave, 0.0) + delta
+                    processados += 1
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO item_feedback")
+                    cursor.execute("RELEASE item_feedback")
+                    cursor.execute(
+                        "UPDATE fila_feedback SET tentativas = tentativas + 1, ultimo_erro = ? WHERE id = ?",
+                        (str(e), item_id)
+                    )
+                    print(f"Erro ao aplicar feedback da fila (item {item_id}): {e}")
+                    falhas += 1
+            # Mesmo commit dos itens e dos DELETEs da fila: se o upsert falhar, o lote
+            # inteiro volta e os itens continuam na fila para a próxima drenagem
+            feedback_system.gravar_preferencias(cursor, deltas)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            self.processados += processados
+            self.falhas += falhas
+            self.lotes += 1
+            self.maior_lote = max(self.maior_lote, len(itens))
+            self.ultimo_lote_ms = duracao_ms
+            self.ultimo_atraso_ms = (time.time() - mais_antigo) * 1000
+        return processados, falhas
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Profundidade da fila e contadores do worker"""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            pendentes, retidos, mais_antigo = cursor.execute(
+                SQL_PROFUNDIDADE, (MAX_TENTATIVAS, MAX_TENTATIVAS, MAX_TENTATIVAS)
+            ).fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            return {
+                'profundidade': pendentes,
+                'retidos': retidos,
+                'idade_mais_antigo_s': round(time.time() - mais_antigo, 3) if mais_antigo else 0.0,
+                'enfileirados': self.enfileirados,
+                'processados': self.processados,
+                'falhas': self.falhas,
+                'lotes': self.lotes,
+                'maior_lote': self.maior_lote,
+                'ultimo_lote_ms': round(self.ultimo_lote_ms, 2),
+                'ultimo_atraso_ms': round(self.ultimo_atraso_ms, 2),
+                'worker_ativo': self._worker is not None and self._worker.is_alive()
+            }
+
+
+# Instância global da fila
+fila_feedback = FilaFeedback()
+metricas.registrar_medidor(
+    'feedback_fila_profundidade', 'Feedbacks aguardando o worker',
+    lambda: fila_feedback.estatisticas()['profundidade']
+)
@@ -0,0 +1,201 @@
+# =============================================================================
+# SNAPSHOT EM MEMÓRIA DO GUARDA-ROUPA
+# =============================================================================
+
+import json
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+from database import get_connection
+from tags_roupa import NOMES_COLUNAS_TAGS, tags_da_linha
+
+# Colunas canônicas da tabela roupas (as mesmas gravadas pelas rotas); no dicionário
+# da IA elas mantêm os nomes imagem_path / clima_min / clima_max
+COLUNAS_SNAPSHOT = "id, nome, tipo, cor, imagem, temperatura_min, temperatura_max, " + ", ".join(NOMES_COLUNAS_TAGS)
+
+# Log de alterações de roupas preenchido por triggers: toda escrita (rotas, CLI, outros
+# workers, edições manuais) gera uma linha, e seq é a versão do guarda-roupa no banco
+SQL_CRIAR_LOG_ALTERACOES = '''
+    CREATE TABLE IF NOT EXISTS roupas_alteracoes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        roupa_id INTEGER NOT NULL,
+        alterado_em REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)  -- epoch
+    )
+'''
+
+# Linhas mantidas no log; o excedente é podado a cada ALTERACOES_PODA inserções.
+# Um snapshot que ficou para trás da poda relê a tabela inteira
+ALTERACOES_MANTIDAS = 10000
+ALTERACOES_PODA = 1000
+
+TRIGGERS_LOG_ALTERACOES = (
+    """CREATE TRIGGER IF NOT EXISTS trg_roupas_alteracoes_insert
+        AFTER INSERT ON roupas
+        BEGIN
+            INSERT INTO roupas_alteracoes (roupa_id) VALUES (NEW.id);
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_roupas_alteracoes_update
+        AFTER UPDATE ON roupas
+        BEGIN
+            INSERT INTO roupas_alteracoes (roupa_id) VALUES (NEW.id);
+            INSERT INTO roupas_alteracoes (roupa_id) SELECT OLD.id WHERE OLD.id <> NEW.id;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_roupas_alteracoes_delete
+        AFTER DELETE ON roupas
+        BEGIN
+            INSERT INTO roupas_alteracoes (roupa_id) VALUES (OLD.id);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_roupas_alteracoes_poda
+        AFTER INSERT ON roupas_alteracoes
+        WHEN NEW.seq % {ALTERACOES_PODA} = 0
+        BEGIN
+            DELETE FROM roupas_alteracoes WHERE seq <= NEW.seq - {ALTERACOES_MANTIDAS};
+        END""",
+)
+
+SQL_ULTIMA_ALTERACAO = "SELECT seq, alterado_em FROM roupas_alteracoes ORDER BY seq DESC LIMIT 1"
+
+# Acima de tantas roupas alteradas desde a última sincronização, relê a tabela inteira
+LIMITE_SINCRONIZACAO_INCREMENTAL = 500
+
+
+def criar_log_alteracoes(cursor):
+    """Cria o log de alterações de roupas e seus triggers (sem commit; o chamador confirma)"""
+    cursor.execute(SQL_CRIAR_LOG_ALTERACOES)
+    for trigger in TRIGGERS_LOG_ALTERACOES:
+        cursor.execute(trigger)
+
+
+def ultima_alteracao(cursor) -> Tuple[int, Optional[float]]:
+    """(seq, alterado_em) da última escrita em roupas; (0, None) com o log vazio"""
+    linha = cursor.execute(SQL_ULTIMA_ALTERACAO).fetchone()
+    return (linha[0], linha[1]) if linha else (0, None)
+
+
+def _linha_para_roupa(linha) -> Dict[str, Any]:
+    """Converte uma linha da tabela roupas no dicionário usado pela IA"""
+    return {
+        'id': linha[0],
+        'nome': linha[1],
+        'tipo': linha[2],
+        'cor': linha[3],
+        'imagem_path': linha[4],
+        'clima_min': linha[5],
+        'clima_max': linha[6],
+        'tags': tags_da_linha(linha[2], linha[7:])
+    }
+
+
+class SnapshotGuardaRoupa:
+    """
+    Cópia da tabela roupas mantida em memória e sincronizada pelo log
+    roupas_alteracoes. Antes de servir, confere o último seq do log e
+    aplica só as roupas alteradas desde a leitura anterior, venham as
+    escritas de qualquer processo. A versão é o seq do banco, comum a
+    todos os workers, e serve de chave para caches derivados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_sincronizacao = threading.Lock()
+        self._roupas: List[Dict[str, Any]] = []
+        self._por_id: Dict[int, Dict[str, Any]] = {}
+        self._carregado = False
+        self._seq = 0
+        self._recarga_completa = True
+        self._atualizado_em = time.time()
+
+    @property
+    def versao(self) -> int:
+        """Seq do log de alterações refletido no snapshot"""
+        return self._seq
+
+    @property
+    def atualizado_em(self) -> float:
+        """Momento (epoch) da última alteração de roupas gravada no banco"""
+        return self._atualizado_em
+
+    def roupas(self) -> List[Dict[str, Any]]:
+        """Retorna a lista de roupas do snapshot (não deve ser modificada)"""
+        self.sincronizar()
+        return self._roupas
+
+    def obter_roupa(self, roupa_id: int) -> Optional[Dict[str, Any]]:
+        """Busca uma roupa do snapshot pelo ID"""
+        self.sincronizar()
+        return self._por_id.get(roupa_id)
+
+    def total(self) -> int:
+        """Quantidade de roupas no snapshot"""
+        return len(self.roupas())
+
+    def recarregar(self):
+        """Relê toda a tabela roupas"""
+        self.invalidar()
+        self.sincronizar()
+
+    def invalidar(self):
+        """Força a releitura completa; o snapshot atual segue servido até ela terminar"""
+        with self._lock:
+            self._recarga_completa = True
+
+    def sincronizar(self):
+        """
+        Aplica as alterações gravadas no banco desde a última leitura. Se a
+        leitura falhar, mantém o snapshot anterior; sem snapshot carregado
+        o erro é propagado, pois uma lista vazia pareceria um guarda-roupa vazio.
+        """
+        with self._lock_sincronizacao:
+            try:
+                conn = get_connection()
+                try:
+                    cursor = conn.cursor()
+                    if not self._recarga_completa and self._seq == ultima_alteracao(cursor)[0]:
+                        return
+                    # Log e roupas lidos na mesma transação, para o seq bater com as linhas
+                    cursor.execute("BEGIN")
+                    try:
+                        self._aplicar_alteracoes(cursor)
+                    finally:
+                        conn.rollback()
+                finally:
+                    conn.close()
+            except Exception as e:
+                if not self._carregado:
+                    raise
+                print(f"⚠️ Erro ao sincronizar snapshot do guarda-roupa (mantida a versão {self.versao}): {e}")
+
+    def _aplicar_alteracoes(self, cursor):
+        seq, alterado_em = ultima_alteracao(cursor)
+        ids = None
+        if not self._recarga_completa:
+            primeiro = cursor.execute("SELECT MIN(seq) FROM roupas_alteracoes").fetchone()[0]
+            # Com seqs já podados entre o snapshot e o log, as alterações intermediárias se perderam
+            if primeiro is None or primeiro <= self._seq + 1:
+                cursor.execute("SELECT DISTINCT roupa_id FROM roupas_alteracoes WHERE seq > ?", (self._seq,))
+                ids = {linha[0] for linha in cursor.fetchall()}
+                if len(ids) > LIMITE_SINCRONIZACAO_INCREMENTAL:
+                    ids = None
+        if ids is None:
+            cursor.execute(f"SELECT {COLUNAS_SNAPSHOT} FROM roupas ORDER BY id")
+            roupas = [_linha_para_roupa(linha) for linha in cursor.fetchall()]
+        else:
+            # Ids que não existem mais somem da lista
+            cursor.execute(
+                f"SELECT {COLUNAS_SNAPSHOT} FROM roupas WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(ids)),)
+            )
+            roupas = [r for r in self._roupas if r['id'] not in ids]
+            roupas.extend(_linha_para_roupa(linha) for linha in cursor.fetchall())
+            roupas.sort(key=lambda r: r['id'])
+        with self._lock:
+            self._roupas = roupas
+            self._por_id = {r['id']: r for r in roupas}
+            self._carregado = True
+            self._recarga_completa = False
+            self._seq = seq
+            self._atualizado_em = alterado_em if alterado_em is not None else time.time()
+
+
+# Instância global do snapshot
+snapshot_guarda_roupa = SnapshotGuardaRoupa()
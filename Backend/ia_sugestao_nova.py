@@ -1,13 +1,19 @@
 import random
-from typing import List, Dict, Any, Tuple
-from database import get_connection
-from style_ai_avancado import style_ai
-from feedback_learning import feedback_system
+import numpy as np
+from typing import List, Dict, Any, Tuple, Optional
+from busca_combinacoes import BuscaBranchAndBound
+from style_ai_avancado import obter_style_ai
+from feedback_learning import obter_feedback_system
+from guarda_roupa_snapshot import snapshot_guarda_roupa
+from preferencias_snapshot import Preferencias, snapshot_preferencias
+from tags_roupa import tags_da_roupa
+from metricas import medir
 
 def gerar_sugestao_inteligente(clima_data: Dict[str, Any]) -> Dict[str, Any]:
     """Gera sugestão inteligente usando IA avançada que aprende com o tempo"""
     try:
-        roupas_disponiveis = obter_roupas_disponiveis()
+        with medir('sugestao.roupas'):
+            roupas_disponiveis = obter_roupas_disponiveis()
         
         if not roupas_disponiveis:
             return {
@@ -17,59 +23,287 @@ def gerar_sugestao_inteligente(clima_data: Dict[str, Any]) -> Dict[str, Any]:
                 'detalhes': {}
             }
         
-        preferencias_usuario = feedback_system.obter_preferencias_usuario()
-        padroes_aprendidos = feedback_system.obter_padroes_aprendidos(clima_data)
+        with medir('sugestao.preferencias'):
+            preferencias_usuario = snapshot_preferencias.atual()
+        with medir('sugestao.padroes'):
+            padroes_aprendidos = obter_feedback_system().obter_padroes_aprendidos(clima_data)
         
-        melhores_combinacoes = []
+        return montar_sugestao(clima_data, roupas_disponiveis, preferencias_usuario, padroes_aprendidos)
         
+    except Exception as e:
+        print(f"Erro na sugestão inteligente: {e}")
+        return gerar_sugestao_basica_fallback(obter_roupas_disponiveis(), clima_data)
+
+def gerar_sugestoes_lote(climas: List[Dict[str, Any]], sem_repeticao: bool = False) -> Dict[str, Any]:
+    """
+    Gera uma sugestão por dia para uma lista de climas, carregando guarda-roupa,
+    preferências e padrões uma única vez. Com sem_repeticao, evita reutilizar
+    peças já sugeridas em dias anteriores enquanto houver alternativa na categoria.
+    """
+    roupas_disponiveis = obter_roupas_disponiveis()
+    
+    if not roupas_disponiveis:
+        return {
+            'erro': 'Nenhuma roupa encontrada no guarda-roupa',
+            'dias': [],
+            'total_dias': 0
+        }
+    
+    preferencias_usuario = snapshot_preferencias.atual()
+    feedback_system = obter_feedback_system()
+    padroes_por_contexto = {}
+    usadas = set()
+    dias = []
+    
+    for indice, clima_data in enumerate(climas):
+        try:
+            contexto = feedback_system.classificar_contexto(clima_data)
+            if contexto not in padroes_por_contexto:
+                padroes_por_contexto[contexto] = feedback_system.obter_padroes_aprendidos(clima_data)
+            
+            sugestao = montar_sugestao(
+                clima_data, roupas_disponiveis, preferencias_usuario,
+                padroes_por_contexto[contexto], excluir=usadas if sem_repeticao else None
+            )
+        except Exception as e:
+            print(f"Erro na sugestão do dia {indice}: {e}")
+            sugestao = gerar_sugestao_basica_fallback(roupas_disponiveis, clima_data)
+        
+        if sem_repeticao:
+            usadas.update(roupa.get('id') for roupa in sugestao.get('sugestao') or [])
+        
+        sugestao['dia'] = indice
+        dias.append(sugestao)
+    
+    return {
+        'dias': dias,
+        'total_dias': len(dias),
+        'sem_repeticao': sem_repeticao,
+        'timestamp': obter_timestamp()
+    }
+
+def montar_sugestao(clima_data: Dict[str, Any], roupas_disponiveis: List[Dict], preferencias_usuario: Dict[str, Dict[str, float]],
+                    padroes_aprendidos: List[Dict[str, Any]], excluir: Optional[set] = None) -> Dict[str, Any]:
+    """Monta a resposta de sugestão a partir de dados já carregados"""
+    melhores_combinacoes = []
+    
+    # Contexto de score (histórico do banco, vetores por peça) montado uma vez para padrões e busca
+    with medir('sugestao.contexto'):
+        contexto_score = obter_style_ai().preparar_contexto_score(
+            roupas_disponiveis, clima_data, snapshot_para_score(preferencias_usuario)
+        )
+    
+    with medir('sugestao.combinacoes_padrao'):
         for padrao in padroes_aprendidos[:5]:
             combinacao = gerar_combinacao_por_padrao(roupas_disponiveis, padrao['pattern'], clima_data)
-            if combinacao:
-                score = style_ai.calcular_score_combinacao(combinacao, clima_data)
+            if combinacao and not (excluir and any(roupa.get('id') in excluir for roupa in combinacao)):
+                score = obter_style_ai().calcular_score_combinacao(
+                    combinacao, clima_data, snapshot_para_score(preferencias_usuario), contexto_score
+                )
                 score += padrao['score'] * 0.2 + padrao['frequencia'] * 0.1
                 melhores_combinacoes.append((combinacao, score))
-        
-        for _ in range(45):
-            combinacao = gerar_combinacao_aleatoria_inteligente(roupas_disponiveis, clima_data, preferencias_usuario)
-            if combinacao:
-                score = style_ai.calcular_score_combinacao(combinacao, clima_data)
-                score += calcular_bonus_preferencias(combinacao, preferencias_usuario)
-                melhores_combinacoes.append((combinacao, score))
-        
-        if not melhores_combinacoes:
-            return gerar_sugestao_basica_fallback(roupas_disponiveis, clima_data)
-        
-        melhores_combinacoes.sort(key=lambda x: x[1], reverse=True)
-        melhor_combinacao, melhor_score = melhores_combinacoes[0]
-        
+    
+    with medir('sugestao.busca'):
+        melhores_combinacoes.extend(
+            buscar_combinacoes(roupas_disponiveis, clima_data, preferencias_usuario, excluir=excluir,
+                               contexto_score=contexto_score)
+        )
+    
+    if not melhores_combinacoes:
+        return gerar_sugestao_basica_fallback(roupas_disponiveis, clima_data)
+    
+    # Padrões e busca podem chegar à mesma roupa: ela não pode ser principal e alternativa ao mesmo tempo
+    melhores_combinacoes = deduplicar_combinacoes(melhores_combinacoes)
+    melhores_combinacoes.sort(key=lambda x: x[1], reverse=True)
+    melhor_combinacao, melhor_score = melhores_combinacoes[0]
+    
+    with medir('sugestao.analise'):
         detalhes_analise = analisar_combinacao_detalhada(melhor_combinacao, clima_data)
+    
+    detalhes_analise['aprendizado'] = {
+        'padroes_usados': len(padroes_aprendidos),
+        'preferencias_aplicadas': bool(preferencias_usuario),
+        'score_ia': melhor_score
+    }
+    
+    alternativas = []
+    for combinacao, score in melhores_combinacoes[1:3]:
+        alternativas.append({
+            'roupas': combinacao,
+            'score': round(score, 1),
+            'descricao': gerar_descricao_combinacao(combinacao)
+        })
+    
+    return {
+        'sugestao': melhor_combinacao,
+        'score': round(melhor_score, 1),
+        'detalhes': detalhes_analise,
+        'alternativas': alternativas,
+        'clima': clima_data,
+        'timestamp': obter_timestamp()
+    }
+
+def deduplicar_combinacoes(combinacoes: List[Tuple[List[Dict], float]]) -> List[Tuple[List[Dict], float]]:
+    """Mantém uma entrada por conjunto de peças (pelos ids), a de maior score"""
+    por_pecas: Dict[frozenset, Tuple[List[Dict], float]] = {}
+    for combinacao, score in combinacoes:
+        chave = frozenset(roupa.get('id') for roupa in combinacao)
+        atual = por_pecas.get(chave)
+        if atual is None or score > atual[1]:
+            por_pecas[chave] = (combinacao, score)
+    return list(por_pecas.values())
+
+MODO_BUSCA_PADRAO = 'exaustiva'
+TOP_K_BUSCA = 3
+ORCAMENTO_BUSCA_MS = 300
+TENTATIVAS_ALEATORIAS = 45
+
+def buscar_combinacoes(roupas: List[Dict], clima_data: Dict, preferencias: Dict[str, Dict[str, float]] = None,
+                       modo: Optional[str] = None, k: int = TOP_K_BUSCA,
+                       orcamento_ms: Optional[float] = ORCAMENTO_BUSCA_MS,
+                       excluir: Optional[set] = None,
+                       contexto_score: Optional[Tuple[Any, Dict[str, Any]]] = None) -> List[Tuple[List[Dict], float]]:
+    """
+    Busca as melhores combinações usando o motor configurado em MOTORES_BUSCA.
+    `contexto_score` (de StyleAI.preparar_contexto_score) evita remontar o contexto do score
+    """
+    motor = MOTORES_BUSCA.get(modo or MODO_BUSCA_PADRAO, buscar_combinacoes_aleatorias)
+    if preferencias is None:
+        preferencias = snapshot_preferencias.atual()
+    return motor(roupas, clima_data, preferencias, k, orcamento_ms, excluir, contexto_score)
+
+def snapshot_para_score(preferencias) -> Optional[Preferencias]:
+    """Snapshot repassado à StyleAI; dicionários avulsos fazem a IA usar o snapshot global"""
+    return preferencias if isinstance(preferencias, Preferencias) else None
+
+def avaliar_combinacao(combinacao: List[Dict], clima_data: Dict, preferencias: Dict[str, Dict[str, float]]) -> float:
+    """Score usado para ranquear combinações: score da IA + bônus de preferências"""
+    score = obter_style_ai().calcular_score_combinacao(combinacao, clima_data, snapshot_para_score(preferencias))
+    return score + calcular_bonus_preferencias(combinacao, preferencias)
+
+def buscar_combinacoes_aleatorias(roupas: List[Dict], clima_data: Dict, preferencias: Dict[str, Dict[str, float]],
+                                  k: int = TOP_K_BUSCA, orcamento_ms: Optional[float] = None,
+                                  excluir: Optional[set] = None,
+                                  contexto_score: Optional[Tuple[Any, Dict[str, Any]]] = None) -> List[Tuple[List[Dict], float]]:
+    """Sorteia combinações aleatórias e retorna as k melhores (modo de fallback)"""
+    if excluir:
+        roupas = [roupa for roupa in roupas if roupa.get('id') not in excluir] or roupas
+    
+    sorteadas = []
+    for _ in range(TENTATIVAS_ALEATORIAS):
+        combinacao = gerar_combinacao_aleatoria_inteligente(roupas, clima_data, preferencias)
+        if combinacao:
+            sorteadas.append(combinacao)
+    
+    if not sorteadas:
+        return []
+    
+    scores = criar_avaliador_lote(roupas, clima_data, preferencias, contexto_score)(sorteadas)
+    combinacoes = list(zip(sorteadas, scores))
+    combinacoes.sort(key=lambda x: x[1], reverse=True)
+    return combinacoes[:k]
+
+def criar_avaliador_lote(roupas: List[Dict], clima_data: Dict, preferencias: Dict[str, Dict[str, float]],
+                         contexto_score: Optional[Tuple[Any, Dict[str, Any]]] = None):
+    """
+    Cria uma função que pontua várias combinações de uma vez com o kernel vetorizado da IA.
+    O contexto_score recebido só é usado se foi montado para esta mesma lista de roupas
+    """
+    style_ai = obter_style_ai()
+    if contexto_score is None or contexto_score[0].origem is not roupas:
+        contexto_score = style_ai.preparar_contexto_score(roupas, clima_data, snapshot_para_score(preferencias))
+    guarda_roupa, contexto = contexto_score
+    
+    # Bônus de preferências por peça, calculado por cor/estilo/tipo distintos
+    por_cor = np.array([bonus_preferencia_peca({'cor': cor}, preferencias) for cor in guarda_roupa.cores_unicas])
+    por_estilo = np.array([bonus_preferencia_peca({'estilo': estilo}, preferencias) for estilo in guarda_roupa.estilos_declarados_unicos])
+    por_tipo = np.array([bonus_preferencia_peca({'tipo': tipo}, preferencias) for tipo in guarda_roupa.tipos_unicos])
+    bonus_itens = (
+        por_cor[guarda_roupa.cor_codigo] +
+        por_estilo[guarda_roupa.estilo_declarado_codigo] +
+        por_tipo[guarda_roupa.tipo_codigo]
+    )
+    
+    def avaliar_lote(combinacoes: List[List[Dict]]) -> List[float]:
+        indices = guarda_roupa.matriz_indices(combinacoes)
+        scores = style_ai.calcular_scores_lote(guarda_roupa, indices, clima_data, contexto)
+        validos = indices >= 0
+        bonus = (bonus_itens[np.where(validos, indices, 0)] * validos).sum(axis=1)
+        return (scores + np.minimum(bonus, 2.0)).tolist()
+    
+    return avaliar_lote
+
+def buscar_combinacoes_exaustiva(roupas: List[Dict], clima_data: Dict, preferencias: Dict[str, Dict[str, float]],
+                                 k: int = TOP_K_BUSCA, orcamento_ms: Optional[float] = ORCAMENTO_BUSCA_MS,
+                                 excluir: Optional[set] = None,
+                                 contexto_score: Optional[Tuple[Any, Dict[str, Any]]] = None) -> List[Tuple[List[Dict], float]]:
+    """Enumera superior x inferior x calçado (x casaco) com poda branch-and-bound e retorna o top-k exato"""
+    formas = montar_formas_combinacao(roupas, clima_data, preferencias, excluir)
+    if not formas:
+        return buscar_combinacoes_aleatorias(roupas, clima_data, preferencias, k, excluir=excluir,
+                                             contexto_score=contexto_score)
+    
+    busca = BuscaBranchAndBound(k=k, orcamento_ms=orcamento_ms)
+    avaliar_lote = criar_avaliador_lote(roupas, clima_data, preferencias, contexto_score)
+    
+    for slots in formas:
+        valores_ia, teto_ia = obter_style_ai().limites_busca(clima_data, slots, snapshot_para_score(preferencias))
         
-        detalhes_analise['aprendizado'] = {
-            'padroes_usados': len(padroes_aprendidos),
-            'preferencias_aplicadas': bool(preferencias_usuario),
-            'score_ia': melhor_score
-        }
-        
-        alternativas = []
-        for combinacao, score in melhores_combinacoes[1:3]:
-            alternativas.append({
-                'roupas': combinacao,
-                'score': round(score, 1),
-                'descricao': gerar_descricao_combinacao(combinacao)
-            })
+        def valores(roupa: Dict, valores_ia=valores_ia) -> Tuple[float, ...]:
+            return valores_ia(roupa) + (bonus_preferencia_peca(roupa, preferencias),)
         
-        return {
-            'sugestao': melhor_combinacao,
-            'score': round(melhor_score, 1),
-            'detalhes': detalhes_analise,
-            'alternativas': alternativas,
-            'clima': clima_data,
-            'timestamp': obter_timestamp()
-        }
+        def teto(somas: Tuple[float, ...], parcial: List[Dict], teto_ia=teto_ia) -> float:
+            return teto_ia(somas[:-1], parcial) + min(somas[-1], 2.0)
         
-    except Exception as e:
-        print(f"Erro na sugestão inteligente: {e}")
-        return gerar_sugestao_basica_fallback(obter_roupas_disponiveis(), clima_data)
+        busca.explorar(slots, valores, teto, avaliar_lote=avaliar_lote)
+    
+    if not busca.completa:
+        print(f"Busca exaustiva interrompida pelo orçamento: {busca.estatisticas()}")
+    
+    return busca.resultados()
+
+def montar_formas_combinacao(roupas: List[Dict], clima_data: Dict, preferencias: Dict[str, Dict[str, float]] = None,
+                             excluir: Optional[set] = None) -> List[List[List[Dict]]]:
+    """
+    Monta os slots de candidatos (superior, inferior, calçado, casaco) com os mesmos
+    filtros do sorteio; peças em `excluir` são removidas quando a categoria tem alternativa
+    """
+    temperatura = clima_data.get('temperatura', 20)
+    condicao = clima_data.get('condicao', '').lower()
+    
+    roupas_adequadas = filtrar_roupas_por_clima(roupas, temperatura, condicao)
+    
+    if not roupas_adequadas:
+        roupas_adequadas = roupas
+    
+    if preferencias:
+        roupas_adequadas = aplicar_preferencias_selecao(roupas_adequadas, preferencias)
+    
+    categorias = categorizar_roupas(roupas_adequadas)
+    todas_categorias = categorizar_roupas(roupas)
+    
+    ordem = ['superior', 'inferior', 'calçado']
+    if temperatura <= 25:
+        ordem.append('casaco')
+    
+    def sem_excluidas(candidatos: List[Dict]) -> List[Dict]:
+        if not excluir:
+            return candidatos
+        return [roupa for roupa in candidatos if roupa.get('id') not in excluir] or candidatos
+    
+    slots = []
+    for categoria in ordem:
+        candidatos = sem_excluidas(categorias[categoria] or todas_categorias[categoria])
+        if candidatos:
+            slots.append(candidatos)
+    
+    if not slots:
+        return []
+    
+    formas = [slots]
+    if categorias['acessorios']:
+        formas.append(slots + [sem_excluidas(categorias['acessorios'])])
+    return formas
 
 def gerar_combinacao_aleatoria_inteligente(roupas: List[Dict], clima_data: Dict, preferencias: Dict[str, Dict[str, float]] = None) -> List[Dict]:
     """Gera uma combinação completa (superior, inferior, calçado) e adiciona casaco quando necessário"""
@@ -129,7 +363,6 @@ def filtrar_roupas_por_clima(roupas: List[Dict], temperatura: int, condicao: str
     for roupa in roupas:
         clima_min = roupa.get('clima_min', 0)
         clima_max = roupa.get('clima_max', 50)
-        tipo = roupa.get('tipo', '').lower()
         
         if clima_min <= temperatura <= clima_max:
             roupas_adequadas.append(roupa)
@@ -140,7 +373,7 @@ def filtrar_roupas_por_clima(roupas: List[Dict], temperatura: int, condicao: str
             continue
         
         if 'chuva' in condicao:
-            if any(palavra in tipo for palavra in ['impermeável', 'bota', 'jaqueta']):
+            if tags_da_roupa(roupa)['abrigo_chuva']:
                 roupas_adequadas.append(roupa)
     
     return roupas_adequadas
@@ -156,35 +389,14 @@ def categorizar_roupas(roupas: List[Dict]) -> Dict[str, List[Dict]]:
     }
     
     for roupa in roupas:
-        tipo = roupa.get('tipo', '').lower()
-        
-        if tipo == 'superior':
-            categorias['superior'].append(roupa)
-        elif tipo == 'inferior':
-            categorias['inferior'].append(roupa)
-        elif tipo == 'calçado':
-            categorias['calçado'].append(roupa)
-        elif tipo == 'casaco':
-            categorias['casaco'].append(roupa)
-        elif any(palavra in tipo for palavra in ['camiseta', 'camisa', 'blusa', 'regata', 'top']):
-            categorias['superior'].append(roupa)
-        elif any(palavra in tipo for palavra in ['calça', 'short', 'bermuda', 'saia', 'vestido']):
-            categorias['inferior'].append(roupa)
-        elif any(palavra in tipo for palavra in ['sapato', 'tênis', 'sandália', 'chinelo', 'bota']):
-            categorias['calçado'].append(roupa)
-        elif any(palavra in tipo for palavra in ['jaqueta', 'moletom', 'blazer', 'cardigã']):
-            categorias['casaco'].append(roupa)
-        elif any(palavra in tipo for palavra in ['chapéu', 'boné', 'cinto', 'bolsa', 'óculos']):
-            categorias['acessorios'].append(roupa)
-        else:
-            categorias['superior'].append(roupa)
+        categorias[tags_da_roupa(roupa)['categoria']].append(roupa)
     
     return categorias
 
 def analisar_combinacao_detalhada(combinacao: List[Dict], clima_data: Dict) -> Dict:
     """Análise detalhada da combinação escolhida"""
     cores = [roupa.get('cor', 'indefinida') for roupa in combinacao]
-    tipos = [roupa.get('tipo', 'indefinido') for roupa in combinacao]
+    estilos = [tags_da_roupa(roupa)['estilo'] for roupa in combinacao]
     
     temp = clima_data.get('temperatura', 20)
     if temp <= 15:
@@ -202,8 +414,8 @@ def analisar_combinacao_detalhada(combinacao: List[Dict], clima_data: Dict) -> D
     else:
         harmonia_cor = "Arriscada"
     
-    formal_count = sum(1 for tipo in tipos if any(formal in tipo.lower() for formal in ['blazer', 'social', 'terno']))
-    casual_count = sum(1 for tipo in tipos if any(casual in tipo.lower() for casual in ['camiseta', 'jeans', 'tênis']))
+    formal_count = estilos.count('formal')
+    casual_count = estilos.count('casual')
     
     if formal_count > casual_count:
         estilo_dominante = "Formal"
@@ -306,38 +518,8 @@ def gerar_sugestao_basica_fallback(roupas: List[Dict], clima_data: Dict) -> Dict
     }
 
 def obter_roupas_disponiveis() -> List[Dict[str, Any]]:
-    """Busca todas as roupas disponíveis no banco de dados"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("""
-            SELECT id, nome, tipo, cor, imagem_path, clima_min, clima_max
-            FROM roupas 
-            ORDER BY id
-        """)
-        
-        roupas = []
-        
-        for linha in cursor.fetchall():
-            roupa = {
-                'id': linha[0],
-                'nome': linha[1],
-                'tipo': linha[2],
-                'cor': linha[3],
-                'imagem_path': linha[4],
-                'clima_min': linha[5],
-                'clima_max': linha[6]
-            }
-            roupas.append(roupa)
-        
-        return roupas
-        
-    except Exception as e:
-        print(f"Erro ao buscar roupas: {e}")
-        return []
-    finally:
-        conn.close()
+    """Retorna as roupas do snapshot em memória do guarda-roupa"""
+    return snapshot_guarda_roupa.roupas()
 
 def obter_timestamp() -> str:
     """Retorna timestamp atual"""
@@ -354,7 +536,7 @@ def registrar_feedback_sugestao(sugestao_id: str, feedback_score: int, usado: bo
 def aprender_com_uso(roupas_usadas: List[Dict], clima_data: Dict, satisfacao: int):
     """Registra uma combinação usada para aprendizado futuro"""
     try:
-        style_ai.registrar_uso_combinacao(roupas_usadas, clima_data, satisfacao)
+        obter_style_ai().registrar_uso_combinacao(roupas_usadas, clima_data, satisfacao)
         print(f"Aprendizado registrado: {len(roupas_usadas)} roupas, satisfação={satisfacao}")
     except Exception as e:
         print(f"Erro ao registrar aprendizado: {e}")
@@ -396,30 +578,31 @@ def gerar_combinacao_por_padrao(roupas: List[Dict], padrao: Dict[str, Any], clim
 def calcular_bonus_preferencias(combinacao: List[Dict], preferencias: Dict[str, Dict[str, float]]) -> float:
     """Calcula bonus baseado nas preferências do usuário"""
     try:
-        bonus = 0.0
-        
-        for roupa in combinacao:
-            if not roupa:
-                continue
-                
-            cor = roupa.get('cor', '').lower()
-            if cor and 'cor' in preferencias and cor in preferencias['cor']:
-                bonus += preferencias['cor'][cor] * 0.3
-            
-            estilo = roupa.get('estilo', '').lower()
-            if estilo and 'estilo' in preferencias and estilo in preferencias['estilo']:
-                bonus += preferencias['estilo'][estilo] * 0.2
-            
-            tipo = roupa.get('tipo', '').lower()
-            if tipo and 'tipo_roupa' in preferencias and tipo in preferencias['tipo_roupa']:
-                bonus += preferencias['tipo_roupa'][tipo] * 0.2
-        
+        bonus = sum(bonus_preferencia_peca(roupa, preferencias) for roupa in combinacao if roupa)
         return min(bonus, 2.0)
         
     except Exception as e:
         print(f"Erro ao calcular bonus de preferências: {e}")
         return 0.0
 
+def bonus_preferencia_peca(roupa: Dict, preferencias: Dict[str, Dict[str, float]]) -> float:
+    """Bônus de preferências de uma única peça (sem o limite da combinação)"""
+    bonus = 0.0
+    
+    cor = roupa.get('cor', '').lower()
+    if cor and 'cor' in preferencias and cor in preferencias['cor']:
+        bonus += preferencias['cor'][cor] * 0.3
+    
+    estilo = roupa.get('estilo', '').lower()
+    if estilo and 'estilo' in preferencias and estilo in preferencias['estilo']:
+        bonus += preferencias['estilo'][estilo] * 0.2
+    
+    tipo = roupa.get('tipo', '').lower()
+    if tipo and 'tipo_roupa' in preferencias and tipo in preferencias['tipo_roupa']:
+        bonus += preferencias['tipo_roupa'][tipo] * 0.2
+    
+    return bonus
+
 def aplicar_preferencias_selecao(roupas: List[Dict], preferencias: Dict[str, Dict[str, float]]) -> List[Dict]:
     """Aplica preferências do usuário na seleção de roupas, favorecendo itens preferidos"""
     try:
@@ -464,8 +647,13 @@ def gerar_sugestao_roupa(clima_data: Dict[str, Any]) -> Dict[str, Any]:
             'explicacao': resultado.get('detalhes', {}).get('recomendacao', 'Sugestão da IA'),
             'clima': resultado.get('clima', clima_data),
             'score': resultado.get('score', 0),
-            'total_roupas_analisadas': len(obter_roupas_disponiveis()),
+            'total_roupas_analisadas': snapshot_guarda_roupa.total(),
             'detalhes': resultado.get('detalhes', {})
         }
     else:
         return resultado
+
+MOTORES_BUSCA = {
+    'exaustiva': buscar_combinacoes_exaustiva,
+    'aleatoria': buscar_combinacoes_aleatorias
+}
@@ -0,0 +1,171 @@
+# =============================================================================
+# DERIVADAS DE IMAGEM - MINIATURAS E TAMANHO MÉDIO (WEBP / JPEG)
+# =============================================================================
+
+import os
+import queue
+import threading
+from typing import Dict, Any, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele as rotas servem o original
+    Image = None
+    ImageOps = None
+
+PASTA_IMAGENS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Imagens")
+PASTA_DERIVADAS = os.path.join(PASTA_IMAGENS, "derivadas")
+
+# Maior lado (px) de cada rendição; 'original' serve o arquivo enviado
+RENDICOES = {
+    'thumb': 160,
+    'medium': 480
+}
+TAMANHOS_VALIDOS = set(RENDICOES) | {'original'}
+FORMATOS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+
+
+def nome_rendicao(filename: str, tamanho: str, formato: str) -> str:
+    """Nome do arquivo derivado de uma imagem original"""
+    base, _ = os.path.splitext(filename)
+    return f"{base}_{tamanho}.{formato}"
+
+
+class ProcessadorImagens:
+    """
+    Gera as rendições de cada imagem enviada numa thread de fundo, para
+    que o upload não espere o redimensionamento. Imagens antigas sem
+    derivadas são enfileiradas na primeira vez que uma rendição é pedida.
+    """
+
+    def __init__(self, pasta_imagens: str = PASTA_IMAGENS, pasta_derivadas: str = PASTA_DERIVADAS):
+        self.pasta_imagens = pasta_imagens
+        self.pasta_derivadas = pasta_derivadas
+        self._fila: "queue.Queue[str]" = queue.Queue()
+        self._agendadas = set()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.processadas = 0
+        self.falhas = 0
+
+    @property
+    def disponivel(self) -> bool:
+        """Indica se o Pillow está instalado"""
+        return Image is not None
+
+    def agendar(self, filename: str):
+        """Enfileira a geração das derivadas de uma imagem"""
+        if not self.disponivel or not filename:
+            return
+        with self._lock:
+            if filename in self._agendadas:
+                return
+            self._agendadas.add(filename)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._executar, name="processador-imagens", daemon=True)
+                self._worker.start()
+        self._fila.put(filename)
+
+    def aguardar(self):
+        """Bloqueia até a fila esvaziar (útil em scripts e backfills)"""
+        self._fila.join()
+
+    def _executar(self):
+        while True:
+            filename = self._fila.get()
+            try:
+                self.processar(filename)
+            finally:
+                with self._lock:
+                    self._agendadas.discard(filename)
+                self._fila.task_done()
+
+    def processar(self, filename: str) -> bool:
+        """Gera todas as rendições de uma imagem de forma síncrona"""
+        if not self.disponivel:
+            return False
+        origem = os.path.join(self.pasta_imagens, filename)
+        try:
+            os.makedirs(self.pasta_derivadas, exist_ok=True)
+            with Image.open(origem) as imagem:
+                imagem = ImageOps.exif_transpose(imagem)
+                tem_alfa = imagem.mode in ('RGBA', 'LA') or (imagem.mode == 'P' and 'transparency' in imagem.info)
+                imagem = imagem.convert('RGBA' if tem_alfa else 'RGB')
+                for tamanho, lado in RENDICOES.items():
+                    reduzida = imagem.copy()
+                    reduzida.thumbnail((lado, lado), Image.LANCZOS)
+                    for formato, (formato_pil, _, opcoes) in FORMATOS.items():
+                        saida = reduzida
+                        if formato == 'jpg' and tem_alfa:
+                            saida = Image.new('RGB', reduzida.size, (255, 255, 255))
+                            saida.paste(reduzida, mask=reduzida.getchannel('A'))
+                        destino = os.path.join(self.pasta_derivadas, nome_rendicao(filename, tamanho, formato))
+                        temporario = destino + '.tmp'
+                        saida.save(temporario, formato_pil, **opcoes)
+                        os.replace(temporario, destino)
+            with self._lock:
+                self.processadas += 1
+            return True
+        except Exception as e:
+            print(f"Erro ao gerar derivadas de {filename}: {e}")
+            with self._lock:
+                self.falhas += 1
+            return False
+
+    def caminho_rendicao(self, filename: str, tamanho: str, aceita_webp: bool = True) -> Optional[tuple]:
+        """
+        Retorna (caminho, mimetype) da rendição pedida, ou None se ainda
+        não existir ou for mais antiga que a original (nesse caso a
+        geração é agendada)
+        """
+        try:
+            mtime_original = os.path.getmtime(os.path.join(self.pasta_imagens, filename))
+        except OSError:
+            return None
+        formatos = ('webp', 'jpg') if aceita_webp else ('jpg',)
+        for formato in formatos:
+            caminho = os.path.join(self.pasta_derivadas, nome_rendicao(filename, tamanho, formato))
+            try:
+                atualizada = os.path.getmtime(caminho) >= mtime_original
+            except OSError:
+                continue
+            if atualizada:
+                return caminho, FORMATOS[formato][1]
+            # Original trocada no mesmo nome: a derivada antiga não é servida
+            break
+        self.agendar(filename)
+        return None
+
+    def remover_derivadas(self, filename: str):
+        """Apaga as rendições de uma imagem removida"""
+        for tamanho in RENDICOES:
+            for formato in FORMATOS:
+                caminho = os.path.join(self.pasta_derivadas, nome_rendicao(filename, tamanho, formato))
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores do processador"""
+        with self._lock:
+            return {
+                'disponivel': self.disponivel,
+                'fila': self._fila.qsize(),
+                'processadas': self.processadas,
+                'falhas': self.falhas
+            }
+
+
+# Instância global do processador
+processador_imagens = ProcessadorImagens()
+
+
+if __name__ == "__main__":
+    # Gera as derivadas de todas as imagens já existentes
+    extensoes = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+    arquivos = [f for f in sorted(os.listdir(PASTA_IMAGENS)) if f.lower().endswith(extensoes)]
+    print(f"🖼️ Gerando derivadas de {len(arquivos)} imagens...")
+    geradas = sum(1 for filename in arquivos if processador_imagens.processar(filename))
+    print(f"✅ {geradas} imagens processadas, {processador_imagens.falhas} falhas")
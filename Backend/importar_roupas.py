@@ -0,0 +1,239 @@
+# =============================================================================
+# IMPORTADOR DE ROUPAS VIA CSV - STREAMING, EM LOTES E COM UPSERT POR NOME
+# =============================================================================
+
+import argparse
+import csv
+import ntpath
+import os
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from database import get_connection
+from migracoes import migrar
+from tags_roupa import NOMES_COLUNAS_TAGS, valores_tags
+
+CSV_PADRAO = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Database", "csv certo.csv")
+SEPARADOR_PADRAO = ";"
+TAMANHO_LOTE = 1000
+CLIMA_MIN_PADRAO = 10
+CLIMA_MAX_PADRAO = 30
+MAX_ERROS_RELATADOS = 20
+EXTENSOES_IMAGEM = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+# Coluna lógica -> colunas da tabela roupas que a recebem (as legadas só em bancos antigos)
+MAPA_COLUNAS = (
+    ('nome', ('nome',)),
+    ('tipo', ('tipo',)),
+    ('cor', ('cor',)),
+    ('imagem', ('imagem', 'imagem_path')),
+    ('clima_min', ('temperatura_min', 'clima_min')),
+    ('clima_max', ('temperatura_max', 'clima_max')),
+)
+
+
+class LinhaInvalida(ValueError):
+    """Linha do CSV sem os campos obrigatórios ou com valores inválidos"""
+
+
+def _inteiro(valor: Optional[str], padrao: int) -> int:
+    valor = (valor or '').strip().replace(',', '.')
+    if not valor:
+        return padrao
+    try:
+        return int(float(valor))
+    except ValueError:
+        raise LinhaInvalida(f"valor numérico inválido: {valor!r}")
+
+
+def nome_imagem(caminho: Optional[str]) -> Optional[str]:
+    """
+    Extrai o nome do arquivo de imagem (a pasta Imagens é servida pelo
+    nome); caminhos sem arquivo, como 'imagens/', viram None
+    """
+    nome = ntpath.basename((caminho or '').strip())
+    return nome if nome.lower().endswith(EXTENSOES_IMAGEM) else None
+
+
+def ocasioes(valor: Optional[str]) -> List[str]:
+    """Separa o campo multivalorado de categoria/ocasião"""
+    vistos = []
+    for parte in (valor or '').split(','):
+        parte = parte.strip().lower()
+        if parte and parte not in vistos:
+            vistos.append(parte)
+    return vistos
+
+
+def converter_linha(linha: Dict[str, str]) -> Dict[str, Any]:
+    """Converte uma linha do CSV para os campos lógicos da roupa"""
+    roupa = {campo: (linha.get(campo) or '').strip() for campo in ('nome', 'tipo', 'cor')}
+    faltando = [campo for campo, valor in roupa.items() if not valor]
+    if faltando:
+        raise LinhaInvalida(f"campos obrigatórios vazios: {', '.join(faltando)}")
+    roupa['imagem'] = nome_imagem(linha.get('imagem_path') or linha.get('imagem'))
+    roupa['clima_min'] = _inteiro(linha.get('clima_min') or linha.get('temperatura_min'), CLIMA_MIN_PADRAO)
+    roupa['clima_max'] = _inteiro(linha.get('clima_max') or linha.get('temperatura_max'), CLIMA_MAX_PADRAO)
+    roupa['ocasioes'] = ocasioes(linha.get('categoria') or linha.get('ocasiao'))
+    return roupa
+
+
+def ler_csv(caminho: str, separador: str = SEPARADOR_PADRAO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Lê o CSV linha a linha (memória constante); aceita arquivos com BOM"""
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        leitor = csv.DictReader(arquivo, delimiter=separador)
+        for linha in leitor:
+            yield leitor.line_num, {(chave or '').strip().lower(): valor for chave, valor in linha.items()}
+
+
+class ImportadorRoupas:
+    """
+    Importa roupas de um CSV numa única transação. As linhas são
+    convertidas em streaming e gravadas em lotes com executemany; com
+    upsert, uma roupa cujo nome já existe é atualizada em vez de duplicada.
+    As colunas gravadas seguem o esquema real do banco (imagem e
+    imagem_path, temperatura_* e clima_*), incluindo as tags derivadas.
+    """
+
+    def __init__(self, conn, upsert: bool = True, substituir: bool = False, tamanho_lote: int = TAMANHO_LOTE):
+        self.conn = conn
+        self.upsert = upsert
+        self.substituir = substituir
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.inseridas = 0
+        self.atualizadas = 0
+        self.rejeitadas = 0
+        self.erros: List[str] = []
+
+    def _preparar(self, cursor):
+        migrar(self.conn)
+        colunas = {linha[1] for linha in cursor.execute("PRAGMA table_info(roupas)")}
+        self.destinos = [(campo, coluna) for campo, colunas_campo in MAPA_COLUNAS
+                         for coluna in colunas_campo if coluna in colunas]
+        nomes_colunas = [coluna for _, coluna in self.destinos] + list(NOMES_COLUNAS_TAGS)
+
+        self.sql_inserir = (
+            f"INSERT INTO roupas (id, {', '.join(nomes_colunas)}) "
+            f"VALUES (?, {', '.join('?' * len(nomes_colunas))})"
+        )
+        # No upsert a imagem já gravada (ex.: enviada pelo app) é mantida; o CSV só preenche vazias
+        atribuicoes = [
+            f"{coluna} = COALESCE({coluna}, ?)" if campo == 'imagem' else f"{coluna} = ?"
+            for campo, coluna in self.destinos if campo != 'nome'
+        ] + [f"{coluna} = ?" for coluna in NOMES_COLUNAS_TAGS]
+        self.sql_atualizar = f"UPDATE roupas SET {', '.join(atribuicoes)} WHERE id = ?"
+
+    def _valores(self, roupa: Dict[str, Any], incluir_nome: bool) -> List[Any]:
+        valores = [roupa[campo] for campo, _ in self.destinos if incluir_nome or campo != 'nome']
+        return valores + list(valores_tags(roupa['tipo']))
+
+    def importar(self, linhas: Iterator[Tuple[int, Dict[str, str]]]) -> Dict[str, Any]:
+        """Executa a importação e retorna o relatório"""
+        inicio = time.perf_counter()
+        cursor = self.conn.cursor()
+        self._preparar(cursor)
+
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if self.substituir:
+                cursor.execute("DELETE FROM roupa_ocasioes")
+                cursor.execute("DELETE FROM roupas")
+            ids_por_nome: Dict[str, int] = {}
+            if self.upsert:
+                for roupa_id, nome in cursor.execute("SELECT id, nome FROM roupas ORDER BY id"):
+                    ids_por_nome[(nome or '').strip().lower()] = roupa_id
+            # Ids explícitos: o lote inteiro é inserido sem depender de lastrowid
+            proximo_id = cursor.execute(
+                "SELECT MAX(COALESCE((SELECT MAX(id) FROM roupas), 0),"
+                " COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'roupas'), 0))"
+            ).fetchone()[0] + 1
+
+            lote = []
+            for numero, linha in linhas:
+                try:
+                    lote.append(converter_linha(linha))
+                except LinhaInvalida as e:
+                    self.rejeitadas += 1
+                    if len(self.erros) < MAX_ERROS_RELATADOS:
+                        self.erros.append(f"linha {numero}: {e}")
+                    continue
+                if len(lote) >= self.tamanho_lote:
+                    proximo_id = self._gravar_lote(cursor, lote, ids_por_nome, proximo_id)
+                    lote = []
+            if lote:
+                self._gravar_lote(cursor, lote, ids_por_nome, proximo_id)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        duracao = time.perf_counter() - inicio
+        processadas = self.inseridas + self.atualizadas
+        return {
+            'inseridas': self.inseridas,
+            'atualizadas': self.atualizadas,
+            'rejeitadas': self.rejeitadas,
+            'segundos': round(duracao, 3),
+            'linhas_por_segundo': round(processadas / duracao, 1) if duracao else 0.0,
+            'erros': self.erros
+        }
+
+    def _gravar_lote(self, cursor, lote: List[Dict[str, Any]], ids_por_nome: Dict[str, int], proximo_id: int) -> int:
+        inserir, atualizar, ocasioes_lote = [], [], []
+        for roupa in lote:
+            chave = roupa['nome'].lower()
+            roupa_id = ids_por_nome.get(chave) if self.upsert else None
+            if roupa_id is None:
+                roupa_id = proximo_id
+                proximo_id += 1
+                inserir.append([roupa_id] + self._valores(roupa, incluir_nome=True))
+                if self.upsert:
+                    ids_por_nome[chave] = roupa_id
+            else:
+                atualizar.append(self._valores(roupa, incluir_nome=False) + [roupa_id])
+            ocasioes_lote.append((roupa_id, roupa['ocasioes']))
+
+        # Inserções antes das atualizações: um nome repetido no mesmo lote termina com a última linha
+        cursor.executemany(self.sql_inserir, inserir)
+        cursor.executemany(self.sql_atualizar, atualizar)
+        cursor.executemany("DELETE FROM roupa_ocasioes WHERE roupa_id = ?", [(roupa_id,) for roupa_id, _ in ocasioes_lote])
+        cursor.executemany(
+            "INSERT OR IGNORE INTO roupa_ocasioes (roupa_id, ocasiao) VALUES (?, ?)",
+            [(roupa_id, ocasiao) for roupa_id, lista in ocasioes_lote for ocasiao in lista]
+        )
+        self.inseridas += len(inserir)
+        self.atualizadas += len(atualizar)
+        return proximo_id
+
+
+def importar_csv(caminho: str, separador: str = SEPARADOR_PADRAO, upsert: bool = True,
+                 substituir: bool = False, tamanho_lote: int = TAMANHO_LOTE) -> Dict[str, Any]:
+    """Importa um CSV de roupas para o banco configurado (GUARDA_ROUPA_DB)"""
+    conn = get_connection()
+    try:
+        importador = ImportadorRoupas(conn, upsert=upsert, substituir=substituir, tamanho_lote=tamanho_lote)
+        return importador.importar(ler_csv(caminho, separador))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa roupas de um CSV para o banco")
+    parser.add_argument("csv", nargs="?", default=CSV_PADRAO, help="arquivo CSV (padrão: Database/csv certo.csv)")
+    parser.add_argument("--separador", default=SEPARADOR_PADRAO, help="separador de campos (padrão: ';')")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por executemany")
+    parser.add_argument("--sem-upsert", action="store_true", help="sempre insere, mesmo se o nome já existir")
+    parser.add_argument("--substituir", action="store_true", help="apaga todas as roupas antes de importar")
+    args = parser.parse_args()
+
+    print(f"📄 Importando {args.csv}...")
+    try:
+        relatorio = importar_csv(args.csv, args.separador, upsert=not args.sem_upsert,
+                                 substituir=args.substituir, tamanho_lote=args.lote)
+    except Exception as e:
+        print(f"❌ Erro ao importar roupas: {e}")
+        raise SystemExit(1)
+    for erro in relatorio['erros']:
+        print(f"⚠️ {erro}")
+    print(f"✅ {relatorio['inseridas']} inseridas, {relatorio['atualizadas']} atualizadas, "
+          f"{relatorio['rejeitadas']} rejeitadas em {relatorio['segundos']} s "
+          f"({relatorio['linhas_por_segundo']} linhas/s)")
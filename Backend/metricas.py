@@ -0,0 +1,243 @@
+# =============================================================================
+# MÉTRICAS - LATÊNCIA POR ROTA E POR ESTÁGIO, SQL POR REQUEST, CACHES
+# =============================================================================
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from cliente_http import HistogramaLatencia, estatisticas_http
+from database import definir_observador_consultas, estatisticas_pool
+
+PREFIXO = "guarda_roupa"
+
+# Limites (ms) dos buckets; estágios precisam de resolução abaixo de 10 ms
+BUCKETS_ESTAGIO_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+BUCKETS_ROTA_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BUCKETS_CONSULTAS_SQL = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class MedicaoRequest:
+    """Estado de um request em andamento: início, instruções SQL e estágios medidos"""
+
+    __slots__ = ('inicio', 'consultas_sql', 'estagios')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas_sql = 0
+        self.estagios: List[Tuple[str, float]] = []
+
+
+_medicao_atual: ContextVar[Optional[MedicaoRequest]] = ContextVar('medicao_request', default=None)
+
+
+class Metricas:
+    """
+    Registro de métricas do processo. Guarda histogramas de latência por
+    rota e por estágio, a quantidade de instruções SQL por request e lê
+    os contadores de hit/miss dos caches registrados; exporta tudo no
+    formato texto do Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rotas: Dict[Tuple[str, str], HistogramaLatencia] = {}
+        self._respostas: Dict[Tuple[str, str, int], int] = {}
+        self._consultas_rota: Dict[Tuple[str, str], HistogramaLatencia] = {}
+        self._estagios: Dict[str, HistogramaLatencia] = {}
+        self._caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._medidores: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self.consultas_sql = 0
+
+    # -------------------------------------------------------------------------
+    # Coleta
+    # -------------------------------------------------------------------------
+
+    def contar_consulta(self):
+        """Observador do banco: soma uma instrução ao total e ao request atual"""
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.consultas_sql += 1
+        # Sem lock no caminho quente: o total pode perder incrementos sob concorrência
+        self.consultas_sql += 1
+
+    def registrar_estagio(self, estagio: str, duracao_ms: float):
+        with self._lock:
+            histograma = self._estagios.get(estagio)
+            if histograma is None:
+                histograma = self._estagios[estagio] = HistogramaLatencia(BUCKETS_ESTAGIO_MS)
+            histograma.registrar(duracao_ms)
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.estagios.append((estagio, duracao_ms))
+
+    @contextmanager
+    def medir(self, estagio: str):
+        """Mede um trecho (bloco with ou decorador) no histograma do estágio"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_estagio(estagio, (time.perf_counter() - inicio) * 1000)
+
+    def iniciar_request(self) -> MedicaoRequest:
+        medicao = MedicaoRequest()
+        _medicao_atual.set(medicao)
+        return medicao
+
+    def finalizar_request(self, medicao: MedicaoRequest, rota: str, metodo: str, status: int) -> float:
+        """Registra latência, status e instruções SQL do request; retorna a duração em ms"""
+        duracao_ms = (time.perf_counter() - medicao.inicio) * 1000
+        chave = (rota, metodo)
+        with self._lock:
+            histograma = self._rotas.get(chave)
+            if histograma is None:
+                histograma = self._rotas[chave] = HistogramaLatencia(BUCKETS_ROTA_MS)
+                self._consultas_rota[chave] = HistogramaLatencia(BUCKETS_CONSULTAS_SQL)
+            histograma.registrar(duracao_ms, erro=status >= 500)
+            self._consultas_rota[chave].registrar(medicao.consultas_sql)
+            self._respostas[(rota, metodo, status)] = self._respostas.get((rota, metodo, status), 0) + 1
+        _medicao_atual.set(None)
+        return duracao_ms
+
+    def registrar_cache(self, nome: str, estatisticas: Callable[[], Dict[str, Any]]):
+        """Registra um cache cujas estatísticas têm as chaves 'hits' e 'misses'"""
+        self._caches[nome] = estatisticas
+
+    def registrar_medidor(self, nome: str, ajuda: str, valor: Callable[[], float]):
+        """Registra um gauge lido a cada exportação"""
+        self._medidores[nome] = (ajuda, valor)
+
+    # -------------------------------------------------------------------------
+    # Exportação
+    # -------------------------------------------------------------------------
+
+    def exportar_prometheus(self) -> str:
+        """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+        linhas: List[str] = []
+        with self._lock:
+            rotas = {chave: h.estatisticas() for chave, h in self._rotas.items()}
+            consultas = {chave: h.estatisticas() for chave, h in self._consultas_rota.items()}
+            estagios = {nome: h.estatisticas() for nome, h in self._estagios.items()}
+            respostas = dict(self._respostas)
+
+        _cabecalho(linhas, "http_requisicao_segundos", "histogram", "Latência das rotas HTTP")
+        for (rota, metodo), estatisticas in sorted(rotas.items()):
+            _histograma(linhas, "http_requisicao_segundos", {'rota': rota, 'metodo': metodo}, estatisticas, 1000)
+
+        _cabecalho(linhas, "http_respostas_total", "counter", "Respostas HTTP por rota e status")
+        for (rota, metodo, status), total in sorted(respostas.items()):
+            linhas.append(_amostra("http_respostas_total", {'rota': rota, 'metodo': metodo, 'status': status}, total))
+
+        _cabecalho(linhas, "sql_consultas_por_requisicao", "histogram", "Instruções SQL executadas por request")
+        for (rota, metodo), estatisticas in sorted(consultas.items()):
+            _histograma(linhas, "sql_consultas_por_requisicao", {'rota': rota, 'metodo': metodo}, estatisticas, 1)
+
+        _cabecalho(linhas, "sql_consultas_total", "counter", "Instruções SQL executadas pelo processo")
+        linhas.append(_amostra("sql_consultas_total", {}, self.consultas_sql))
+
+        _cabecalho(linhas, "estagio_segundos", "histogram", "Latência de cada estágio da sugestão e do clima")
+        for estagio, estatisticas in sorted(estagios.items()):
+            _histograma(linhas, "estagio_segundos", {'estagio': estagio}, estatisticas, 1000)
+
+        try:
+            endpoints = estatisticas_http()['endpoints']
+        except Exception as e:
+            print(f"Erro ao ler métricas do cliente HTTP: {e}")
+            endpoints = {}
+        _cabecalho(linhas, "http_cliente_segundos", "histogram", "Latência das chamadas à API de clima")
+        for endpoint, estatisticas in sorted(endpoints.items()):
+            _histograma(linhas, "http_cliente_segundos", {'endpoint': endpoint}, estatisticas, 1000)
+
+        caches = {}
+        for nome, funcao in sorted(self._caches.items()):
+            try:
+                caches[nome] = funcao()
+            except Exception as e:
+                print(f"Erro ao ler estatísticas do cache {nome}: {e}")
+        for sufixo, tipo, ajuda in (
+            ("hits_total", "counter", "Leituras atendidas pelo cache"),
+            ("misses_total", "counter", "Leituras que não estavam no cache"),
+            ("taxa_acerto", "gauge", "Hits sobre o total de leituras"),
+        ):
+            _cabecalho(linhas, f"cache_{sufixo}", tipo, ajuda)
+            for nome, estatisticas in caches.items():
+                hits, misses = estatisticas['hits'], estatisticas['misses']
+                valor = {'hits_total': hits, 'misses_total': misses}.get(sufixo)
+                if valor is None:
+                    valor = round(hits / (hits + misses), 4) if hits + misses else 0.0
+                linhas.append(_amostra(f"cache_{sufixo}", {'cache': nome}, valor))
+
+        for nome, (ajuda, funcao) in sorted(self._medidores.items()):
+            try:
+                valor = funcao()
+            except Exception as e:
+                print(f"Erro ao ler medidor {nome}: {e}")
+                continue
+            _cabecalho(linhas, nome, "gauge", ajuda)
+            linhas.append(_amostra(nome, {}, valor))
+
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _amostra(nome: str, rotulos: Dict[str, Any], valor) -> str:
+    if rotulos:
+        texto = ",".join(f'{chave}="{_escapar(v)}"' for chave, v in rotulos.items())
+        return f"{PREFIXO}_{nome}{{{texto}}} {valor}"
+    return f"{PREFIXO}_{nome} {valor}"
+
+
+def _cabecalho(linhas: List[str], nome: str, tipo: str, ajuda: str):
+    linhas.append(f"# HELP {PREFIXO}_{nome} {ajuda}")
+    linhas.append(f"# TYPE {PREFIXO}_{nome} {tipo}")
+
+
+def _histograma(linhas: List[str], nome: str, rotulos: Dict[str, Any], estatisticas: Dict[str, Any], divisor: float):
+    """Converte HistogramaLatencia.estatisticas() (em ms ou unidades) para _bucket/_sum/_count"""
+    for limite, acumulado in estatisticas['buckets'].items():
+        le = limite if limite == '+Inf' else f"{float(limite) / divisor:g}"
+        linhas.append(_amostra(f"{nome}_bucket", {**rotulos, 'le': le}, acumulado))
+    linhas.append(_amostra(f"{nome}_sum", rotulos, round(estatisticas['soma_ms'] / divisor, 6)))
+    linhas.append(_amostra(f"{nome}_count", rotulos, estatisticas['total']))
+
+
+def instrumentar_app(app):
+    """
+    Mede todas as rotas do app: latência e instruções SQL por rota, com
+    os estágios do request no cabeçalho Server-Timing
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _iniciar_medicao():
+        g.medicao = metricas.iniciar_request()
+
+    @app.after_request
+    def _finalizar_medicao(response):
+        medicao = g.pop('medicao', None)
+        if medicao is None:
+            return response
+        rota = request.url_rule.rule if request.url_rule else 'nao_encontrada'
+        duracao_ms = metricas.finalizar_request(medicao, rota, request.method, response.status_code)
+        tempos = [f"{estagio};dur={ms:.2f}" for estagio, ms in medicao.estagios]
+        tempos.append(f'sql;desc="{medicao.consultas_sql} consultas"')
+        tempos.append(f"total;dur={duracao_ms:.2f}")
+        response.headers['Server-Timing'] = ", ".join(tempos)
+        return response
+
+    @app.teardown_request
+    def _descartar_medicao(exc):
+        _medicao_atual.set(None)
+
+
+# Instância global das métricas
+metricas = Metricas()
+medir = metricas.medir
+definir_observador_consultas(metricas.contar_consulta)
+metricas.registrar_cache('pool_conexoes', estatisticas_pool)
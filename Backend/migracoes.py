@@ -0,0 +1,277 @@
+# =============================================================================
+# MIGRAÇÕES DO ESQUEMA - VERSIONADAS POR PRAGMA user_version
+# =============================================================================
+
+from typing import Callable, List, Tuple
+from database import PlanoSemIndice, get_connection, verificar_uso_indice
+from models import create_indexes
+from tags_roupa import backfill_tags, garantir_colunas_tags
+from feedback_learning import INDICES_FEEDBACK, CONSULTAS_INDEXADAS as CONSULTAS_FEEDBACK
+from style_ai_avancado import (
+    INDICES_APRENDIZADO, SQL_BACKFILL_COMBINACAO_ITENS, inserir_regras_base,
+    CONSULTAS_INDEXADAS as CONSULTAS_APRENDIZADO,
+)
+from estatisticas_ia import SQL_RECALCULAR_CONTADORES, criar_contadores, recriar_triggers_contadores
+from guarda_roupa_snapshot import criar_log_alteracoes
+from preferencias_snapshot import criar_versao_preferencias
+
+TABELAS_BASE = (
+    # Guarda-roupa (imagem e temperatura_* são as colunas lidas e gravadas pela aplicação)
+    """CREATE TABLE IF NOT EXISTS roupas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        cor TEXT NOT NULL,
+        imagem TEXT,
+        temperatura_min INTEGER,
+        temperatura_max INTEGER,
+        estilo TEXT DEFAULT 'casual'
+    )""",
+    # Campo 'categoria' do CSV: ocasiões separadas por vírgula ("dia a dia,sair")
+    """CREATE TABLE IF NOT EXISTS roupa_ocasioes (
+        roupa_id INTEGER NOT NULL,
+        ocasiao TEXT NOT NULL,
+        PRIMARY KEY (roupa_id, ocasiao)
+    ) WITHOUT ROWID""",
+    # Feedback das sugestões
+    """CREATE TABLE IF NOT EXISTS feedback_sugestoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data_sugestao DATETIME NOT NULL,
+        clima_data TEXT NOT NULL,  -- JSON do clima
+        combinacao_sugerida TEXT NOT NULL,  -- JSON da combinação
+        score_original REAL NOT NULL,
+        feedback_usuario INTEGER CHECK(feedback_usuario IN (1, 2, 3, 4, 5)) NOT NULL,
+        comentario TEXT,
+        usado BOOLEAN DEFAULT FALSE,
+        data_feedback DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Feedback bruto enviado pela rota /api/feedback
+    """CREATE TABLE IF NOT EXISTS feedback_usuario (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cidade TEXT,
+        temperatura REAL,
+        tipo_feedback TEXT,  -- positivo, neutro, negativo
+        score INTEGER CHECK(score BETWEEN 1 AND 5),
+        data_feedback DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Fila write-behind do feedback (ver fila_feedback.py)
+    """CREATE TABLE IF NOT EXISTS fila_feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payload TEXT NOT NULL,  -- JSON no formato de FeedbackLearningSystem.registrar_feedback
+        criado_em REAL NOT NULL,  -- epoch do enfileiramento
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        ultimo_erro TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS padroes_aprendidos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo_clima TEXT NOT NULL,  -- sol, chuva, frio, etc.
+        temperatura_faixa TEXT NOT NULL,  -- quente, morno, frio
+        combinacao_pattern TEXT NOT NULL,  -- JSON do padrão
+        score_medio REAL NOT NULL,
+        frequencia_uso INTEGER DEFAULT 1,
+        ultima_atualizacao DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS preferencias_usuario (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        categoria TEXT NOT NULL,  -- cor, estilo, tipo_roupa
+        item TEXT NOT NULL,  -- azul, casual, camisa, etc.
+        peso REAL DEFAULT 1.0,  -- peso da preferência (-1 a 1)
+        ultima_atualizacao DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(categoria, item)
+    )""",
+    """CREATE TABLE IF NOT EXISTS historico_uso (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        roupa_id INTEGER NOT NULL,
+        data_uso DATE NOT NULL,
+        clima_data TEXT NOT NULL,
+        satisfacao INTEGER CHECK(satisfacao IN (1, 2, 3, 4, 5)),
+        FOREIGN KEY (roupa_id) REFERENCES roupas (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS sugestao_feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        clima_data TEXT NOT NULL,
+        sugestao_data TEXT NOT NULL,
+        feedback_score INTEGER NOT NULL, -- 1-5 (1=péssimo, 5=excelente)
+        usado BOOLEAN DEFAULT FALSE,
+        data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS combinacoes_usadas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        roupa_ids TEXT NOT NULL, -- JSON array com IDs das roupas
+        clima_tipo TEXT NOT NULL,
+        temperatura INTEGER NOT NULL,
+        ocasiao TEXT DEFAULT 'casual',
+        satisfacao INTEGER DEFAULT 3, -- 1-5
+        data_uso TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Peças de cada combinação usada (normaliza roupa_ids para buscas por peça)
+    """CREATE TABLE IF NOT EXISTS combinacao_itens (
+        combinacao_id INTEGER NOT NULL,
+        roupa_id INTEGER NOT NULL,
+        PRIMARY KEY (combinacao_id, roupa_id),
+        FOREIGN KEY (combinacao_id) REFERENCES combinacoes_usadas (id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS harmonizacao_cores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cor1 TEXT NOT NULL,
+        cor2 TEXT NOT NULL,
+        compatibilidade REAL NOT NULL, -- 0.0-1.0
+        contexto TEXT DEFAULT 'geral', -- casual, formal, esportivo
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Cache persistente de geocoding (ver clima_service.CacheGeocoding)
+    """CREATE TABLE IF NOT EXISTS cache_geocoding (
+        cidade TEXT PRIMARY KEY,
+        latitude REAL NOT NULL,
+        longitude REAL NOT NULL,
+        nome TEXT NOT NULL,
+        data_cache TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+)
+
+INDICES_BASE = INDICES_FEEDBACK + INDICES_APRENDIZADO + (
+    "CREATE INDEX IF NOT EXISTS idx_roupa_ocasioes_ocasiao ON roupa_ocasioes (ocasiao, roupa_id)",
+)
+
+# Colunas canônicas de roupas e a coluna legada (dos bancos criados por models.create_table) copiada para elas
+COLUNAS_CANONICAS_ROUPAS = (
+    ('imagem', 'TEXT', 'imagem_path'),
+    ('temperatura_min', 'INTEGER', 'clima_min'),
+    ('temperatura_max', 'INTEGER', 'clima_max'),
+    ('estilo', "TEXT DEFAULT 'casual'", None),
+)
+
+
+def _colunas(cursor, tabela: str) -> List[str]:
+    return [linha[1] for linha in cursor.execute(f"PRAGMA table_info({tabela})")]
+
+
+def _criar_tabelas_base(cursor):
+    # Versões antigas de preferencias_usuario não tinham a coluna categoria
+    colunas_preferencias = _colunas(cursor, 'preferencias_usuario')
+    if colunas_preferencias and 'categoria' not in colunas_preferencias:
+        cursor.execute("DROP TABLE preferencias_usuario")
+    for tabela in TABELAS_BASE:
+        cursor.execute(tabela)
+    for indice in INDICES_BASE:
+        cursor.execute(indice)
+    cursor.execute(SQL_BACKFILL_COMBINACAO_ITENS)
+
+
+def _unificar_colunas_roupas(cursor):
+    colunas = _colunas(cursor, 'roupas')
+    for coluna, tipo, legada in COLUNAS_CANONICAS_ROUPAS:
+        if coluna not in colunas:
+            cursor.execute(f"ALTER TABLE roupas ADD COLUMN {coluna} {tipo}")
+        if legada in colunas:
+            cursor.execute(f"UPDATE roupas SET {coluna} = {legada} WHERE {coluna} IS NULL")
+
+
+def _criar_tags_roupas(cursor):
+    garantir_colunas_tags(cursor)
+    pendentes = backfill_tags(cursor, apenas_pendentes=True)
+    if pendentes:
+        print(f"🏷️ Tags derivadas calculadas para {pendentes} roupas")
+    create_indexes(cursor)
+
+
+# (versão, descrição, função). Novas migrações entram no fim com a próxima versão;
+# as já publicadas não mudam, pois bancos existentes já as aplicaram
+MIGRACOES: Tuple[Tuple[int, str, Callable], ...] = (
+    (1, "tabelas e índices do guarda-roupa e do aprendizado", _criar_tabelas_base),
+    (2, "colunas canônicas de roupas (imagem, temperatura_*)", _unificar_colunas_roupas),
+    (3, "tags derivadas das roupas e índices de roupas", _criar_tags_roupas),
+    (4, "regras base de harmonização de cores", inserir_regras_base),
+    (5, "contadores das estatísticas da IA", criar_contadores),
+    (6, "triggers dos contadores tolerantes a colunas NULL", recriar_triggers_contadores),
+    (7, "log de alterações de roupas (versão do snapshot)", criar_log_alteracoes),
+    (8, "versão das preferências mantida por triggers", criar_versao_preferencias),
+)
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_banco(cursor) -> int:
+    """Versão do esquema gravada no cabeçalho do banco"""
+    return cursor.execute("PRAGMA user_version").fetchone()[0]
+
+
+def verificar_planos(cursor) -> List[str]:
+    """Confere com EXPLAIN QUERY PLAN as consultas quentes; retorna os avisos"""
+    avisos = []
+    for sql, params, indice in CONSULTAS_FEEDBACK + CONSULTAS_APRENDIZADO:
+        try:
+            verificar_uso_indice(cursor, sql, params, indice)
+        except PlanoSemIndice as e:
+            avisos.append(str(e))
+    return avisos
+
+
+def migrar(conn=None) -> List[int]:
+    """
+    Aplica as migrações pendentes e retorna as versões aplicadas. Com o
+    banco já na versão atual custa só a leitura de PRAGMA user_version, de
+    modo que cada worker de um servidor com fork pode chamar no boot.
+    Cada migração roda em uma transação BEGIN IMMEDIATE junto com a troca
+    de versão; processos concorrentes esperam o lock e pulam o que já foi
+    aplicado.
+    """
+    propria = conn is None
+    if propria:
+        conn = get_connection()
+    aplicadas = []
+    try:
+        cursor = conn.cursor()
+        if versao_banco(cursor) >= VERSAO_ATUAL:
+            return aplicadas
+        if conn.in_transaction:
+            conn.commit()
+        for versao, descricao, aplicar in MIGRACOES:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                if versao_banco(cursor) >= versao:
+                    conn.rollback()
+                    continue
+                aplicar(cursor)
+                cursor.execute(f"PRAGMA user_version = {versao}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            aplicadas.append(versao)
+            print(f"🗄️ Migração {versao} aplicada: {descricao}")
+        return aplicadas
+    finally:
+        if propria:
+            conn.close()
+
+
+def verificar_banco(conn=None) -> List[str]:
+    """
+    Rotina de boot que roda sempre, mesmo com o esquema em dia:
+    recalcula os contadores da IA (corrige escritas feitas sem os
+    triggers, como edições manuais ou restaurações de backup) e confere
+    os planos das consultas quentes. Retorna os avisos de plano.
+    """
+    propria = conn is None
+    if propria:
+        conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQL_RECALCULAR_CONTADORES)
+        conn.commit()
+        avisos = verificar_planos(cursor)
+        for aviso in avisos:
+            print(f"⚠️ Consulta sem índice: {aviso}")
+        return avisos
+    finally:
+        if propria:
+            conn.close()
+
+
+if __name__ == "__main__":
+    aplicadas = migrar()
+    verificar_banco()
+    if aplicadas:
+        print(f"✅ Banco migrado para a versão {VERSAO_ATUAL}")
+    else:
+        print(f"✅ Banco já está na versão {VERSAO_ATUAL}")
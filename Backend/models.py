@@ -20,20 +20,17 @@ class Roupa:
             'temperatura_max': self.temperatura_max,
             'imagem': self.imagem
         }
-def create_table(conn):
-    """Cria a tabela 'roupas' no banco de dados se ela não existir"""
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS roupas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT,
-            tipo TEXT,
-            cor TEXT,
-            categoria TEXT,
-            imagem_path TEXT,
-            clima_min INTEGER,
-            clima_max INTEGER
-        )
-    """)
-    conn.commit()
-    print("✅ Tabela 'roupas' criada/verificada com sucesso")
+# Índices usados pela listagem paginada/filtrada de GET /roupas e pelas tags derivadas
+INDICES_ROUPAS = (
+    ("idx_roupas_tipo", "tipo COLLATE NOCASE, id", ("tipo",)),
+    ("idx_roupas_cor", "cor COLLATE NOCASE, id", ("cor",)),
+    ("idx_roupas_temperatura", "temperatura_min, temperatura_max", ("temperatura_min", "temperatura_max")),
+    ("idx_roupas_tag_categoria", "tag_categoria, id", ("tag_categoria",)),
+    ("idx_roupas_tag_estilo", "tag_estilo, id", ("tag_estilo",)),
+)
+def create_indexes(cursor):
+    """Cria os índices da tabela 'roupas' para as colunas que existem no banco (sem commit)"""
+    colunas = {linha[1] for linha in cursor.execute("PRAGMA table_info(roupas)")}
+    for nome, definicao, requeridas in INDICES_ROUPAS:
+        if all(coluna in colunas for coluna in requeridas):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON roupas ({definicao})")
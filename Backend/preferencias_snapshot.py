@@ -0,0 +1,186 @@
+# =============================================================================
+# SNAPSHOT IMUTÁVEL DAS PREFERÊNCIAS DO USUÁRIO
+# =============================================================================
+
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from database import get_connection
+from metricas import metricas
+
+# Versão das preferências no banco: linha única incrementada por triggers em toda escrita
+# de preferencias_usuario (feedback, fila, outros workers, importações, edições manuais)
+SQL_CRIAR_VERSAO_PREFERENCIAS = '''
+    CREATE TABLE IF NOT EXISTS preferencias_versao (
+        id INTEGER PRIMARY KEY CHECK (id = 1),  -- linha única
+        versao INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+# Upsert em vez de UPDATE: sem a linha, um UPDATE não faria nada e a versão congelaria
+_SQL_INCREMENTAR_VERSAO = (
+    "INSERT INTO preferencias_versao (id, versao) VALUES (1, 1) "
+    "ON CONFLICT(id) DO UPDATE SET versao = versao + 1;"
+)
+
+TRIGGERS_VERSAO_PREFERENCIAS = tuple(
+    f"""CREATE TRIGGER IF NOT EXISTS trg_preferencias_versao_{operacao.lower()}
+        AFTER {operacao} ON preferencias_usuario
+        BEGIN
+            {_SQL_INCREMENTAR_VERSAO}
+        END"""
+    for operacao in ('INSERT', 'UPDATE', 'DELETE')
+)
+
+SQL_LER_VERSAO_PREFERENCIAS = "SELECT versao FROM preferencias_versao WHERE id = 1"
+
+
+def criar_versao_preferencias(cursor):
+    """Cria a linha de versão das preferências e seus triggers (sem commit; o chamador confirma)"""
+    cursor.execute(SQL_CRIAR_VERSAO_PREFERENCIAS)
+    cursor.execute("INSERT OR IGNORE INTO preferencias_versao (id, versao) VALUES (1, 0)")
+    for trigger in TRIGGERS_VERSAO_PREFERENCIAS:
+        cursor.execute(trigger)
+
+
+def versao_preferencias(cursor) -> int:
+    """Versão atual das preferências gravada no banco (0 sem nenhuma escrita)"""
+    linha = cursor.execute(SQL_LER_VERSAO_PREFERENCIAS).fetchone()
+    return linha[0] if linha else 0
+
+
+class Preferencias(Mapping):
+    """
+    Preferências congeladas de uma geração de escrita. Funciona como
+    Dict[categoria, Dict[item, peso]] somente leitura e expõe buscas
+    por dicionário para o score de preferências da StyleAI.
+    """
+
+    def __init__(self, linhas: List[Tuple[str, str, float]], versao: int):
+        self.versao = versao
+        self.linhas = tuple(linhas)
+        self.peso_total = sum(peso for _, _, peso in self.linhas)
+
+        por_categoria: Dict[str, Dict[str, float]] = {}
+        normalizadas: Dict[str, Dict[str, float]] = {}
+        for categoria, item, peso in self.linhas:
+            por_categoria.setdefault(categoria, {})[item] = peso
+            chave = (item or '').lower()
+            grupo = normalizadas.setdefault(categoria, {})
+            grupo[chave] = grupo.get(chave, 0.0) + peso
+
+        self._por_categoria = MappingProxyType({c: MappingProxyType(itens) for c, itens in por_categoria.items()})
+        self._cores = normalizadas.get('cor', {})
+        self._cores_evitadas = normalizadas.get('cor_evitada', {})
+        self._tipos = tuple(normalizadas.get('tipo', {}).items())
+        self._score_por_tipo: Dict[str, float] = {}
+
+    def __getitem__(self, categoria: str):
+        return self._por_categoria[categoria]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._por_categoria)
+
+    def __len__(self) -> int:
+        return len(self._por_categoria)
+
+    @property
+    def usar_no_score(self) -> bool:
+        """Preferências só entram no score quando há peso positivo para normalizar"""
+        return bool(self.linhas) and self.peso_total > 0
+
+    def score_cor(self, cor: str) -> float:
+        """Contribuição da cor de uma peça (antes da normalização)"""
+        cor = (cor or '').lower()
+        return self._cores.get(cor, 0.0) * 5 - self._cores_evitadas.get(cor, 0.0) * 3
+
+    def score_tipo(self, tipo: str) -> float:
+        """Contribuição do tipo de uma peça; preferências de tipo casam por substring"""
+        tipo = (tipo or '').lower()
+        score = self._score_por_tipo.get(tipo)
+        if score is None:
+            score = sum(peso * 3 for valor, peso in self._tipos if valor in tipo)
+            self._score_por_tipo[tipo] = score
+        return score
+
+    def score_peca(self, roupa: Dict[str, Any]) -> float:
+        """Contribuição de uma peça para o score de preferências (antes da normalização)"""
+        return self.score_cor(roupa.get('cor', '')) + self.score_tipo(roupa.get('tipo', ''))
+
+    def como_dict(self) -> Dict[str, Dict[str, float]]:
+        """Cópia mutável no formato de FeedbackLearningSystem.obter_preferencias_usuario"""
+        return {categoria: dict(itens) for categoria, itens in self._por_categoria.items()}
+
+
+class SnapshotPreferencias:
+    """
+    Mantém a versão atual das preferências. Cada leitura confere a versão
+    gravada no banco (uma consulta pela chave primária) e só relê a tabela
+    quando ela mudou, venha a escrita de qualquer processo; entre escritas
+    todos os requests compartilham o mesmo objeto imutável.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._atual: Optional[Preferencias] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def versao(self) -> int:
+        """Versão do banco refletida no snapshot carregado"""
+        atual = self._atual
+        return atual.versao if atual is not None else 0
+
+    def atual(self) -> Preferencias:
+        """Retorna o snapshot da versão atual do banco, recarregando-o se necessário"""
+        try:
+            conn = get_connection()
+            try:
+                cursor = conn.cursor()
+                versao = versao_preferencias(cursor)
+                atual = self._atual
+                if atual is not None and atual.versao == versao:
+                    self.hits += 1  # Caminho rápido sem lock: contador aproximado
+                    return atual
+                with self._lock:
+                    if self._atual is None or self._atual.versao != versao:
+                        self.misses += 1
+                        self._atual = self._carregar(conn, cursor)
+                    return self._atual
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Erro ao carregar preferências: {e}")
+            # Falha de leitura não é cacheada: serve o snapshot anterior ou um vazio e tenta de novo na próxima chamada
+            atual = self._atual
+            return atual if atual is not None else Preferencias([], 0)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Leituras servidas pelo snapshot (hits) e recargas da tabela (misses)"""
+        return {'versao': self.versao, 'hits': self.hits, 'misses': self.misses}
+
+    def invalidar(self):
+        """Descarta o snapshot; a próxima leitura relê a tabela mesmo sem mudança de versão"""
+        with self._lock:
+            self._atual = None
+
+    def _carregar(self, conn, cursor) -> Preferencias:
+        # Versão e linhas lidas na mesma transação, para a versão corresponder ao conteúdo
+        cursor.execute("BEGIN")
+        try:
+            versao = versao_preferencias(cursor)
+            cursor.execute('''
+                SELECT categoria, item, peso
+                FROM preferencias_usuario
+                ORDER BY categoria, peso DESC
+            ''')
+            return Preferencias(cursor.fetchall(), versao)
+        finally:
+            conn.rollback()
+
+
+# Instância global do snapshot
+snapshot_preferencias = SnapshotPreferencias()
+metricas.registrar_cache('preferencias', snapshot_preferencias.estatisticas)
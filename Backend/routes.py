@@ -1,12 +1,40 @@
-from flask import Blueprint, jsonify, request, send_from_directory
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
 from werkzeug.utils import secure_filename
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
+from datetime import datetime, timezone
 from models import Roupa
 from database import get_connection
+from guarda_roupa_snapshot import snapshot_guarda_roupa, ultima_alteracao
+from imagens_derivadas import processador_imagens, TAMANHOS_VALIDOS
+from tags_roupa import gravar_tags
+from fila_feedback import fila_feedback
+from estatisticas_ia import ler_estatisticas, registrar_sugestoes
+from exportacao import EXPORTACOES, CursorExpirado, comprimir_gzip, linhas_ndjson, validar_since
+from metricas import metricas
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 import os
+import json
+import hashlib
+import threading
 routes = Blueprint('routes', __name__)
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Imagens")
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+MAX_DIAS_LOTE = 16
+PARAMETROS_LISTAGEM = ('limit', 'after_id', 'tipo', 'cor', 'temp')
+LIMITE_PADRAO_ROUPAS = 50
+LIMITE_MAXIMO_ROUPAS = 500
+MAX_ITENS_LOTE_ROUPAS = 500
+TRABALHADORES_IMAGENS = 4
+SQL_INSERIR_ROUPA = """
+    INSERT INTO roupas (nome, tipo, cor, imagem, temperatura_min, temperatura_max)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+_hashes_arquivos = {}
+_hashes_lock = threading.Lock()
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -19,18 +47,132 @@ def save_uploaded_file(file):
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
         file_path = os.path.join(UPLOAD_FOLDER, filename)
         file.save(file_path)
+        processador_imagens.agendar(filename)
         return filename
     return None
+def remover_imagens(filenames):
+    """Apaga imagens enviadas (e suas derivadas) de uma gravação desfeita"""
+    for filename in filenames:
+        if not filename:
+            continue
+        caminho = os.path.join(UPLOAD_FOLDER, filename)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        processador_imagens.remover_derivadas(filename)
+def hash_arquivo(caminho):
+    """Hash do conteúdo de um arquivo, recalculado só quando mtime ou tamanho mudam"""
+    info = os.stat(caminho)
+    chave = (info.st_mtime_ns, info.st_size)
+    with _hashes_lock:
+        em_cache = _hashes_arquivos.get(caminho)
+    if em_cache and em_cache[0] == chave:
+        return em_cache[1]
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(65536), b''):
+            sha.update(bloco)
+    digest = sha.hexdigest()[:32]
+    with _hashes_lock:
+        _hashes_arquivos[caminho] = (chave, digest)
+    return digest
+def enviar_arquivo(caminho, mimetype=None, imutavel=False):
+    """Envia um arquivo com ETag do conteúdo, Last-Modified e Cache-Control (304 quando não mudou)"""
+    resposta = send_file(
+        caminho,
+        mimetype=mimetype,
+        etag=hash_arquivo(caminho),
+        last_modified=os.path.getmtime(caminho),
+        conditional=True
+    )
+    resposta.headers['Cache-Control'] = CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR
+    return resposta
+def enviar_imagem(filename, mimetype=None):
+    """
+    Envia a rendição pedida em ?size= (thumb, medium) ou a imagem original.
+    Como a original pode ser trocada no mesmo nome, a resposta só vai como
+    imutável quando a URL traz ?v= igual ao hash do conteúdo da original;
+    sem ele revalida por ETag/Last-Modified
+    """
+    tamanho = request.args.get('size', 'original')
+    if tamanho not in TAMANHOS_VALIDOS:
+        return jsonify({"erro": f"size deve ser um de: {', '.join(sorted(TAMANHOS_VALIDOS))}"}), 400
+    caminho = safe_join(UPLOAD_FOLDER, filename)
+    if not caminho or not os.path.isfile(caminho):
+        return "Imagem não encontrada", 404
+    versao = request.args.get('v')
+    imutavel = bool(versao) and versao == hash_arquivo(caminho)
+    if tamanho != 'original':
+        aceita_webp = 'image/webp' in request.headers.get('Accept', '')
+        rendicao = processador_imagens.caminho_rendicao(filename, tamanho, aceita_webp)
+        if not rendicao:
+            # Original provisório enquanto a rendição é gerada: não pode ficar em cache longo
+            return enviar_arquivo(caminho, mimetype)
+        resposta = enviar_arquivo(rendicao[0], rendicao[1], imutavel)
+        resposta.headers['Vary'] = 'Accept'
+        return resposta
+    return enviar_arquivo(caminho, mimetype, imutavel)
+def validadores_guarda_roupa(cursor):
+    """
+    ETag e Last-Modified da lista de roupas, lidos do log de alterações do
+    banco: mudam com escritas de qualquer processo e valem entre workers
+    """
+    seq, alterado_em = ultima_alteracao(cursor)
+    modificado = datetime.fromtimestamp(int(alterado_em), tz=timezone.utc) if alterado_em is not None else None
+    return f"roupas-{seq}", modificado
+def aplicar_validadores(resposta, etag, modificado):
+    """Adiciona ETag, Last-Modified e Cache-Control de revalidação à resposta"""
+    resposta.set_etag(etag)
+    if modificado is not None:
+        resposta.last_modified = modificado
+    resposta.headers['Cache-Control'] = CACHE_REVALIDAR
+    return resposta
 @routes.route("/roupas", methods=["GET"])
 def listar_roupas():
-    """Lista todas as roupas"""
+    """
+    Lista as roupas. Sem parâmetros retorna todas (lista simples); com limit,
+    after_id, tipo, cor ou temp retorna uma página filtrada com os totais
+    """
+    paginado = any(parametro in request.args for parametro in PARAMETROS_LISTAGEM)
+    try:
+        limite = min(int(request.args.get('limit', LIMITE_PADRAO_ROUPAS)), LIMITE_MAXIMO_ROUPAS)
+        after_id = int(request.args['after_id']) if request.args.get('after_id') else None
+        temperatura = float(request.args['temp']) if request.args.get('temp') else None
+    except ValueError:
+        return jsonify({"erro": "limit, after_id e temp devem ser numéricos"}), 400
+    if limite < 1:
+        return jsonify({"erro": "limit deve ser maior que zero"}), 400
+    filtros = []
+    valores = []
+    if request.args.get('tipo'):
+        filtros.append("tipo = ? COLLATE NOCASE")
+        valores.append(request.args['tipo'])
+    if request.args.get('cor'):
+        filtros.append("cor = ? COLLATE NOCASE")
+        valores.append(request.args['cor'])
+    if temperatura is not None:
+        filtros.append("temperatura_min <= ? AND temperatura_max >= ?")
+        valores.extend([temperatura, temperatura])
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT id, nome, tipo, cor, imagem, temperatura_min, temperatura_max FROM roupas")
-        roupas_data = cursor.fetchall()
+        # Validadores e linhas lidos na mesma transação, para a ETag corresponder ao corpo
+        cursor.execute("BEGIN")
+        etag, modificado = validadores_guarda_roupa(cursor)
+        if not is_resource_modified(request.environ, etag=etag, last_modified=modificado):
+            return aplicar_validadores(current_app.response_class(status=304), etag, modificado)
+        colunas = "SELECT id, nome, tipo, cor, imagem, temperatura_min, temperatura_max FROM roupas"
+        if not paginado:
+            cursor.execute(f"{colunas} ORDER BY id")
+            roupas_data = cursor.fetchall()
+        else:
+            filtros_pagina = filtros + (["id > ?"] if after_id is not None else [])
+            valores_pagina = valores + ([after_id] if after_id is not None else [])
+            where_pagina = f"WHERE {' AND '.join(filtros_pagina)}" if filtros_pagina else ""
+            cursor.execute(f"{colunas} {where_pagina} ORDER BY id LIMIT ?", valores_pagina + [limite + 1])
+            roupas_data = cursor.fetchall()
         roupas = []
-        for roupa_data in roupas_data:
+        for roupa_data in roupas_data[:limite] if paginado else roupas_data:
             roupa = Roupa(
                 id=roupa_data[0],
                 nome=roupa_data[1],
@@ -41,7 +183,24 @@ def listar_roupas():
                 temperatura_max=roupa_data[6]
             )
             roupas.append(roupa.to_dict())
-        return jsonify(roupas)
+        if not paginado:
+            return aplicar_validadores(jsonify(roupas), etag, modificado)
+        cursor.execute("SELECT COUNT(*) FROM roupas")
+        total = cursor.fetchone()[0]
+        if filtros:
+            cursor.execute(f"SELECT COUNT(*) FROM roupas {where}", valores)
+            total_filtrado = cursor.fetchone()[0]
+        else:
+            total_filtrado = total
+        tem_mais = len(roupas_data) > limite
+        return aplicar_validadores(jsonify({
+            'roupas': roupas,
+            'total': total,
+            'total_filtrado': total_filtrado,
+            'limit': limite,
+            'after_id': after_id,
+            'proximo_after_id': roupas[-1]['id'] if tem_mais and roupas else None
+        }), etag, modificado)
     except Exception as e:
         print(f"Erro ao listar roupas: {e}")
         return jsonify({"erro": "Erro interno do servidor"}), 500
@@ -91,18 +250,117 @@ def adicionar_roupa():
                 imagem=data.get('imagem_path')
             )
         conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO roupas (nome, tipo, cor, imagem, temperatura_min, temperatura_max)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (roupa.nome, roupa.tipo, roupa.cor, roupa.imagem, roupa.temperatura_min, roupa.temperatura_max))
-        conn.commit()
-        roupa.id = cursor.lastrowid
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(SQL_INSERIR_ROUPA, (roupa.nome, roupa.tipo, roupa.cor, roupa.imagem, roupa.temperatura_min, roupa.temperatura_max))
+            roupa.id = cursor.lastrowid
+            gravar_tags(cursor, roupa.id, roupa.tipo)
+            conn.commit()
+        finally:
+            conn.close()
         return jsonify(roupa.to_dict()), 201
     except Exception as e:
         print(f"Erro ao adicionar roupa: {e}")
         return jsonify({"erro": "Erro interno do servidor"}), 500
+def validar_item_lote(item, arquivo=None):
+    """Valida um item de POST /roupas/lote; retorna (Roupa, erros)"""
+    if not isinstance(item, dict):
+        return None, ["Item deve ser um objeto"]
+    erros = []
+    for campo, mensagem in (('nome', "Nome é obrigatório"), ('tipo', "Tipo é obrigatório"), ('cor', "Cor é obrigatória")):
+        if not isinstance(item.get(campo), str) or not item[campo].strip():
+            erros.append(mensagem)
+    temperaturas = {}
+    for campo, padrao in (('temperatura_min', 0), ('temperatura_max', 50)):
+        try:
+            temperaturas[campo] = int(item.get(campo, padrao))
+        except (TypeError, ValueError):
+            erros.append(f"{campo} deve ser um número inteiro")
+    if arquivo is not None and arquivo.filename and not allowed_file(arquivo.filename):
+        erros.append("Tipo de arquivo não permitido")
+    if erros:
+        return None, erros
+    roupa = Roupa(
+        nome=item['nome'].strip(),
+        tipo=item['tipo'].strip(),
+        cor=item['cor'].strip(),
+        temperatura_min=temperaturas['temperatura_min'],
+        temperatura_max=temperaturas['temperatura_max'],
+        imagem=item.get('imagem_path')
+    )
+    return roupa, []
+@routes.route("/roupas/lote", methods=["POST"])
+def adicionar_roupas_lote():
+    """
+    Adiciona várias roupas numa única transação. Aceita um array JSON (ou
+    {"roupas": [...]}) ou multipart com o array no campo 'roupas' e a
+    imagem do item i no arquivo 'imagem_<i>'. Se algum item for inválido
+    nada é gravado.
+    """
+    try:
+        arquivos = {}
+        if request.content_type and 'multipart/form-data' in request.content_type:
+            try:
+                itens = json.loads(request.form.get('roupas', ''))
+            except ValueError:
+                return jsonify({"erro": "Campo 'roupas' deve conter um array JSON"}), 400
+            arquivos = request.files
+        else:
+            itens = request.get_json(silent=True)
+            if isinstance(itens, dict):
+                itens = itens.get('roupas')
+        if not isinstance(itens, list) or not itens:
+            return jsonify({"erro": "Envie um array não vazio de roupas"}), 400
+        if len(itens) > MAX_ITENS_LOTE_ROUPAS:
+            return jsonify({"erro": f"Máximo de {MAX_ITENS_LOTE_ROUPAS} roupas por lote"}), 400
+        roupas = []
+        invalidos = []
+        uploads = []
+        for indice, item in enumerate(itens):
+            arquivo = arquivos.get(f"imagem_{indice}")
+            roupa, erros = validar_item_lote(item, arquivo)
+            if erros:
+                invalidos.append({"indice": indice, "erros": erros})
+                continue
+            roupas.append(roupa)
+            if arquivo is not None and arquivo.filename:
+                uploads.append((roupa, arquivo))
+        if invalidos:
+            return jsonify({"erro": "Lote inválido; nenhuma roupa foi adicionada", "itens": invalidos}), 400
+        if uploads:
+            with ThreadPoolExecutor(max_workers=min(TRABALHADORES_IMAGENS, len(uploads))) as executor:
+                futuros = [executor.submit(save_uploaded_file, arquivo) for _, arquivo in uploads]
+            # Todos os salvamentos já terminaram; se algum falhou, os arquivos dos outros são apagados
+            falha = None
+            for (roupa, _), futuro in zip(uploads, futuros):
+                try:
+                    roupa.imagem = futuro.result()
+                except Exception as e:
+                    falha = falha or e
+            if falha is not None:
+                remover_imagens(roupa.imagem for roupa, _ in uploads)
+                raise falha
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            for roupa in roupas:
+                cursor.execute(SQL_INSERIR_ROUPA, (roupa.nome, roupa.tipo, roupa.cor, roupa.imagem, roupa.temperatura_min, roupa.temperatura_max))
+                roupa.id = cursor.lastrowid
+                gravar_tags(cursor, roupa.id, roupa.tipo)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            remover_imagens(roupa.imagem for roupa, _ in uploads)
+            raise
+        finally:
+            conn.close()
+        return jsonify({
+            "total": len(roupas),
+            "roupas": [dict(roupa.to_dict(), indice=indice) for indice, roupa in enumerate(roupas)]
+        }), 201
+    except Exception as e:
+        print(f"Erro ao adicionar lote de roupas: {e}")
+        return jsonify({"erro": "Erro interno do servidor"}), 500
 @routes.route("/roupas/<int:roupa_id>", methods=["PUT"])
 def atualizar_roupa(roupa_id):
     """Atualiza roupa existente"""
@@ -133,6 +391,7 @@ def atualizar_roupa(roupa_id):
                             if os.path.exists(old_path):
                                 os.remove(old_path)
                                 print(f"🗑️ Imagem antiga removida: {old_path}")
+                            processador_imagens.remover_derivadas(imagem_filename)
                         imagem_filename = new_filename
                     else:
                         print("❌ Tipo de arquivo não permitido")
@@ -186,6 +445,8 @@ def atualizar_roupa(roupa_id):
         print(f"🔍 Query SQL: {query}")
         print(f"📝 Valores: {values}")
         cursor.execute(query, values)
+        if data.get('tipo'):
+            gravar_tags(cursor, roupa_id, data['tipo'])
         conn.commit()
         print(f"✅ Roupa ID {roupa_id} atualizada com sucesso")
         cursor.execute("SELECT id, nome, tipo, cor, imagem, temperatura_min, temperatura_max FROM roupas WHERE id = ?", (roupa_id,))
@@ -219,7 +480,7 @@ def get_roupa_image(roupa_id):
         if not result or not result[0]:
             return "Imagem não encontrada", 404
         filename = result[0]
-        return send_from_directory(UPLOAD_FOLDER, filename)
+        return enviar_imagem(filename)
     except Exception as e:
         print(f"Erro ao buscar imagem: {e}")
         return "Erro interno do servidor", 500
@@ -239,6 +500,7 @@ def deletar_roupa(roupa_id):
             image_path = os.path.join(UPLOAD_FOLDER, result[0])
             if os.path.exists(image_path):
                 os.remove(image_path)
+            processador_imagens.remover_derivadas(result[0])
         cursor.execute("DELETE FROM roupas WHERE id = ?", (roupa_id,))
         conn.commit()
         return jsonify({"mensagem": "Roupa deletada com sucesso"})
@@ -265,6 +527,7 @@ def upload_imagem():
         os.makedirs(images_folder, exist_ok=True)
         file_path = os.path.join(images_folder, unique_filename)
         file.save(file_path)
+        processador_imagens.agendar(unique_filename)
         return jsonify({
             "mensagem": "Upload realizado com sucesso",
             "filename": unique_filename
@@ -277,7 +540,7 @@ def get_image(roupa_id):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT imagem_path FROM roupas WHERE id = ?", (roupa_id,))
+        cursor.execute("SELECT imagem FROM roupas WHERE id = ?", (roupa_id,))
         result = cursor.fetchone()
         if not result or not result[0]:
             return "Imagem não encontrada", 404
@@ -293,8 +556,7 @@ def get_image(roupa_id):
             'png': 'image/png',
             'webp': 'image/webp'
         }.get(file_extension, 'application/octet-stream')
-        from flask import send_file
-        return send_file(file_path, mimetype=content_type)
+        return enviar_imagem(imagem_path, content_type)
     except Exception as e:
         print(f"Erro ao servir imagem: {e}")
         return "Erro interno do servidor", 500
@@ -315,8 +577,7 @@ def serve_static_image(filename):
             'png': 'image/png',
             'webp': 'image/webp'
         }.get(file_extension, 'application/octet-stream')
-        from flask import send_file
-        return send_file(file_path, mimetype=content_type)
+        return enviar_imagem(filename, content_type)
     except Exception as e:
         print(f"Erro ao servir imagem estática: {e}")
         return "Erro interno do servidor", 500
@@ -357,9 +618,40 @@ def obter_sugestao_roupa():
             clima_data = request_data
         from ia_sugestao_nova import gerar_sugestao_inteligente
         sugestao = gerar_sugestao_inteligente(clima_data)
+        registrar_sugestoes(1)
         return jsonify(sugestao)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+@routes.route("/api/sugestao/lote", methods=["POST"])
+def obter_sugestoes_lote():
+    """Obtém uma sugestão por dia para uma lista de climas ou para a previsão de uma cidade"""
+    try:
+        request_data = request.get_json()
+        if not request_data:
+            return jsonify({"error": "Dados são obrigatórios"}), 400
+        if 'climas' in request_data:
+            climas = request_data['climas']
+            if not isinstance(climas, list) or not climas:
+                return jsonify({"error": "climas deve ser uma lista não vazia"}), 400
+        elif 'cidade' in request_data:
+            try:
+                dias = int(request_data.get('dias', 7))
+            except (TypeError, ValueError):
+                return jsonify({"error": "dias deve ser um número inteiro"}), 400
+            if dias < 1 or dias > MAX_DIAS_LOTE:
+                return jsonify({"error": f"dias deve estar entre 1 e {MAX_DIAS_LOTE}"}), 400
+            from clima_service import obter_previsao_por_cidade
+            climas = obter_previsao_por_cidade(request_data['cidade'], dias)
+        else:
+            return jsonify({"error": "Informe 'climas' ou 'cidade'"}), 400
+        if len(climas) > MAX_DIAS_LOTE:
+            return jsonify({"error": f"Máximo de {MAX_DIAS_LOTE} dias por lote"}), 400
+        from ia_sugestao_nova import gerar_sugestoes_lote
+        resultado = gerar_sugestoes_lote(climas, bool(request_data.get('sem_repeticao', False)))
+        registrar_sugestoes(resultado['total_dias'])
+        return jsonify(resultado)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 @routes.route("/api/feedback", methods=["POST"])
 def registrar_feedback():
     """Registra feedback do usuário sobre uma sugestão"""
@@ -371,37 +663,76 @@ def registrar_feedback():
         score = data.get('score', 3)
         if not isinstance(score, int) or score < 1 or score > 5:
             return jsonify({"error": "Score deve ser um número entre 1 e 5"}), 400
+        feedback_data = {
+            'rating': score,
+            'clima_data': {'temperatura': temperatura, 'cidade': cidade},
+            'combinacao': data.get('combinacao', [])
+        }
         conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO feedback_usuario (cidade, temperatura, tipo_feedback, score, data_feedback)
-            VALUES (?, ?, ?, ?, datetime('now'))
-        """, (cidade, temperatura, tipo_feedback, score))
         try:
-            from feedback_learning import feedback_system
-            feedback_data = {
-                'rating': score,
-                'clima_data': {'temperatura': temperatura, 'cidade': cidade},
-                'combinacao': data.get('combinacao', [])
-            }
-            feedback_system.registrar_feedback("sugestao_atual", feedback_data)
-        except ImportError:
-            pass
-        conn.commit()
-        conn.close()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO feedback_usuario (cidade, temperatura, tipo_feedback, score, data_feedback)
+                VALUES (?, ?, ?, ?, datetime('now'))
+            """, (cidade, temperatura, tipo_feedback, score))
+            fila_feedback.enfileirar(cursor, feedback_data)
+            conn.commit()
+        finally:
+            conn.close()
+        fila_feedback.notificar()
         return jsonify({
             "message": "Feedback registrado com sucesso", 
             "score": score,
             "aprendizado": True
-        })
+        }), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+@routes.route("/api/feedback/flush", methods=["POST"])
+def drenar_fila_feedback():
+    """Aplica agora todo o feedback pendente na fila e retorna as métricas"""
+    try:
+        aplicados = fila_feedback.drenar()
+        return jsonify({"aplicados": aplicados, "fila": fila_feedback.estatisticas()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+@routes.route("/api/feedback/fila", methods=["GET"])
+def estatisticas_fila_feedback():
+    """Profundidade da fila de feedback e contadores do worker"""
+    try:
+        return jsonify(fila_feedback.estatisticas())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+@routes.route("/api/exportar/<tabela>", methods=["GET"])
+def exportar_tabela(tabela):
+    """
+    Exporta uma tabela em NDJSON por streaming. ?since=<_cursor> retoma
+    depois da última linha recebida; gzip com Accept-Encoding ou ?gzip=1
+    """
+    if tabela not in EXPORTACOES:
+        return jsonify({"error": f"tabela deve ser uma de: {', '.join(sorted(EXPORTACOES))}"}), 404
+    since = request.args.get('since') or None
+    try:
+        validar_since(tabela, since)
+    except CursorExpirado:
+        return jsonify({"error": "since expirado: refaça a exportação completa, sem since"}), 410
+    except ValueError:
+        return jsonify({"error": "since inválido"}), 400
+    usar_gzip = request.args.get('gzip') == '1' or 'gzip' in request.headers.get('Accept-Encoding', '')
+    corpo = linhas_ndjson(tabela, since)
+    if usar_gzip:
+        corpo = comprimir_gzip(corpo)
+    resposta = Response(stream_with_context(corpo), mimetype='application/x-ndjson')
+    resposta.headers['Cache-Control'] = 'no-store'
+    if usar_gzip:
+        resposta.headers['Content-Encoding'] = 'gzip'
+        resposta.headers['Vary'] = 'Accept-Encoding'
+    return resposta
 @routes.route("/api/preferencias", methods=["GET"])
 def obter_preferencias():
     """Obtém preferências atuais do usuário"""
     try:
-        from feedback_learning import feedback_system
-        preferencias = feedback_system.obter_preferencias_usuario()
+        from feedback_learning import obter_feedback_system
+        preferencias = obter_feedback_system().obter_preferencias_usuario()
         return jsonify(preferencias)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -412,8 +743,8 @@ def obter_padroes_aprendidos():
         clima_data = request.get_json()
         if not clima_data:
             return jsonify({"error": "Dados do clima são obrigatórios"}), 400
-        from feedback_learning import feedback_system
-        padroes = feedback_system.obter_padroes_aprendidos(clima_data)
+        from feedback_learning import obter_feedback_system
+        padroes = obter_feedback_system().obter_padroes_aprendidos(clima_data)
         return jsonify({"padroes": padroes})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -421,17 +752,16 @@ def obter_padroes_aprendidos():
 def obter_historico_feedback():
     """Obtém histórico de feedback para análise"""
     try:
-        from database import get_connection
+        from feedback_learning import SQL_HISTORICO_FEEDBACK
         conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT data_sugestao, feedback_usuario, usado, comentario, data_feedback
-            FROM feedback_sugestoes 
-            ORDER BY data_feedback DESC 
-            LIMIT 50
-        ''')
+        try:
+            cursor = conn.cursor()
+            cursor.execute(SQL_HISTORICO_FEEDBACK)
+            linhas = cursor.fetchall()
+        finally:
+            conn.close()
         historico = []
-        for row in cursor.fetchall():
+        for row in linhas:
             historico.append({
                 'data_sugestao': row[0],
                 'rating': row[1],
@@ -439,7 +769,6 @@ def obter_historico_feedback():
                 'comentario': row[3],
                 'data_feedback': row[4]
             })
-        conn.close()
         return jsonify({"historico": historico})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -447,26 +776,12 @@ def obter_historico_feedback():
 def obter_estatisticas_ia():
     """Obtém estatísticas do sistema de IA e aprendizado"""
     try:
-        from database import get_connection
-        conn = get_connection()
-        cursor = conn.cursor()
-        stats = {}
-        cursor.execute('SELECT COUNT(*) FROM feedback_sugestoes')
-        stats['total_feedbacks'] = cursor.fetchone()[0]
-        cursor.execute('SELECT AVG(feedback_usuario) FROM feedback_sugestoes')
-        avg_rating = cursor.fetchone()[0]
-        stats['rating_medio'] = round(avg_rating, 2) if avg_rating else 0
-        cursor.execute('SELECT COUNT(*) FROM feedback_sugestoes WHERE usado = 1')
-        stats['sugestoes_usadas'] = cursor.fetchone()[0]
-        cursor.execute('SELECT COUNT(*) FROM padroes_aprendidos')
-        stats['padroes_aprendidos'] = cursor.fetchone()[0]
-        cursor.execute('SELECT COUNT(*) FROM preferencias_usuario WHERE peso > 0')
-        stats['preferencias_positivas'] = cursor.fetchone()[0]
-        if stats['total_feedbacks'] > 0:
-            stats['taxa_uso'] = round((stats['sugestoes_usadas'] / stats['total_feedbacks']) * 100, 1)
-        else:
-            stats['taxa_uso'] = 0
-        conn.close()
+        estatisticas = ler_estatisticas()
+        stats = {chave: estatisticas[chave] for chave in (
+            'total_feedbacks', 'rating_medio', 'sugestoes_usadas', 'padroes_aprendidos',
+            'preferencias_positivas', 'taxa_uso'
+        )}
+        stats['feedbacks_pendentes'] = fila_feedback.estatisticas()['profundidade']
         return jsonify(stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -474,21 +789,25 @@ def obter_estatisticas_ia():
 def obter_stats_simples():
     """Obtém estatísticas simplificadas para o frontend"""
     try:
-        from database import get_connection
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM roupas')
-        total_roupas = cursor.fetchone()[0]
-        sugestoes_hoje = 12
-        feedback_positivo = 85
-        precisao_ia = 92
+        estatisticas = ler_estatisticas()
         stats = {
-            'sugestoes_hoje': sugestoes_hoje,
-            'feedback_positivo': feedback_positivo,
-            'precisao_ia': precisao_ia,
-            'total_roupas': total_roupas
+            'sugestoes_hoje': estatisticas['sugestoes_hoje'],
+            'feedback_positivo': estatisticas['feedback_positivo'],
+            'precisao_ia': estatisticas['precisao_ia'],
+            'total_roupas': snapshot_guarda_roupa.total()
         }
-        conn.close()
         return jsonify(stats)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+@routes.route("/api/harmonizacao-cores", methods=["GET"])
+def exportar_harmonizacao_cores():
+    """Exporta a matriz de harmonização de cores usada pela IA"""
+    try:
+        from style_ai_avancado import obter_style_ai
+        return jsonify(obter_style_ai().exportar_matriz_cores())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+@routes.route("/metrics", methods=["GET"])
+def exportar_metricas():
+    """Métricas de latência, SQL por request e caches no formato texto do Prometheus"""
+    return Response(metricas.exportar_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,127 @@
+# =============================================================================
+# GUARDA-ROUPA EM ARRAYS - BASE DO SCORE VETORIZADO
+# =============================================================================
+
+from typing import Dict, List, Any, Sequence
+import numpy as np
+from tags_roupa import tags_da_roupa
+
+ESTILOS = {'': 0, 'formal': 1, 'casual': 2, 'esportivo': 3}
+
+
+class GuardaRoupaArrays:
+    """
+    Representação colunar (NumPy) das roupas usada por
+    StyleAI.calcular_scores_lote. Combinações são passadas como uma
+    matriz N x P de índices nesta estrutura (-1 = posição vazia).
+    """
+
+    def __init__(self, roupas: Sequence[Dict[str, Any]], style_ai):
+        self.origem = roupas
+        self.roupas = list(roupas)
+        total = len(self.roupas)
+        matriz = style_ai.obter_matriz_cores()
+
+        self.ids = np.zeros(total, dtype=np.int64)
+        self.tem_id = np.zeros(total, dtype=bool)
+        self.clima_min = np.zeros(total, dtype=np.float64)
+        self.clima_max = np.zeros(total, dtype=np.float64)
+        self.cor_id = np.full(total, -1, dtype=np.int64)
+        self.estilo = np.zeros(total, dtype=np.int8)
+        self.cor_codigo = np.zeros(total, dtype=np.int64)
+        self.tipo_codigo = np.zeros(total, dtype=np.int64)
+
+        # Flags das regras de clima, lidas das tags da peça (ver StyleAI.score_clima_peca)
+        self.frio_bonus = np.zeros(total, dtype=bool)
+        self.frio_penalidade = np.zeros(total, dtype=bool)
+        self.quente_bonus = np.zeros(total, dtype=bool)
+        self.quente_penalidade = np.zeros(total, dtype=bool)
+        self.chuva_bonus = np.zeros(total, dtype=bool)
+        self.chuva_penalidade = np.zeros(total, dtype=bool)
+
+        self.estilo_declarado_codigo = np.zeros(total, dtype=np.int64)
+
+        self.cores_unicas: List[str] = []
+        self.tipos_unicos: List[str] = []
+        self.estilos_declarados_unicos: List[str] = []
+        codigos_cor: Dict[str, int] = {}
+        codigos_tipo: Dict[str, int] = {}
+        codigos_estilo: Dict[str, int] = {}
+        self._indice_por_objeto: Dict[int, int] = {}
+
+        for i, roupa in enumerate(self.roupas):
+            self._indice_por_objeto[id(roupa)] = i
+            roupa_id = roupa.get('id')
+            if roupa_id:
+                self.ids[i] = int(roupa_id)
+                self.tem_id[i] = True
+
+            clima_min = roupa.get('clima_min', 0)
+            clima_max = roupa.get('clima_max', 50)
+            self.clima_min[i] = clima_min if clima_min is not None else 0
+            self.clima_max[i] = clima_max if clima_max is not None else 50
+
+            cor = (roupa.get('cor') or '').lower()
+            if roupa.get('cor'):
+                self.cor_id[i] = matriz.id_cor(cor)
+            if cor not in codigos_cor:
+                codigos_cor[cor] = len(self.cores_unicas)
+                self.cores_unicas.append(cor)
+            self.cor_codigo[i] = codigos_cor[cor]
+
+            tipo = (roupa.get('tipo') or '').lower()
+            if tipo not in codigos_tipo:
+                codigos_tipo[tipo] = len(self.tipos_unicos)
+                self.tipos_unicos.append(tipo)
+            self.tipo_codigo[i] = codigos_tipo[tipo]
+
+            estilo = (roupa.get('estilo') or '').lower()
+            if estilo not in codigos_estilo:
+                codigos_estilo[estilo] = len(self.estilos_declarados_unicos)
+                self.estilos_declarados_unicos.append(estilo)
+            self.estilo_declarado_codigo[i] = codigos_estilo[estilo]
+
+            tags = tags_da_roupa(roupa)
+            self.estilo[i] = ESTILOS[tags['estilo']]
+
+            self.frio_bonus[i] = tags['frio'] > 0
+            self.frio_penalidade[i] = tags['frio'] < 0
+            self.quente_bonus[i] = tags['calor'] > 0
+            self.quente_penalidade[i] = tags['calor'] < 0
+            self.chuva_bonus[i] = tags['chuva'] > 0
+            self.chuva_penalidade[i] = tags['chuva'] < 0
+
+    def __len__(self) -> int:
+        return len(self.roupas)
+
+    def indice(self, roupa: Dict[str, Any]) -> int:
+        """Índice de uma roupa (mesmo objeto usado na construção)"""
+        return self._indice_por_objeto[id(roupa)]
+
+    def matriz_indices(self, combinacoes: Sequence[Sequence[Dict[str, Any]]]) -> np.ndarray:
+        """Converte combinações (listas de roupas) numa matriz N x P de índices"""
+        largura = max((len(c) for c in combinacoes), default=0)
+        indices = np.full((len(combinacoes), largura), -1, dtype=np.int64)
+        for linha, combinacao in enumerate(combinacoes):
+            for coluna, roupa in enumerate(combinacao):
+                indices[linha, coluna] = self._indice_por_objeto[id(roupa)]
+        return indices
+
+    def score_clima_itens(self, clima_data: Dict[str, Any]) -> np.ndarray:
+        """Score de clima de cada peça (vetorizado)"""
+        temperatura = clima_data.get('temperatura', 20)
+        condicao = clima_data.get('condicao', '').lower()
+
+        dentro = (self.clima_min <= temperatura) & (temperatura <= self.clima_max)
+        diferenca = np.minimum(np.abs(temperatura - self.clima_min), np.abs(temperatura - self.clima_max))
+        score = np.where(dentro, 25.0, np.maximum(0.0, 25.0 - diferenca * 2))
+
+        if temperatura <= 15:
+            score = score + np.where(self.frio_bonus, 10.0, np.where(self.frio_penalidade, -15.0, 0.0))
+        elif temperatura >= 28:
+            score = score + np.where(self.quente_bonus, 10.0, np.where(self.quente_penalidade, -15.0, 0.0))
+
+        if 'chuva' in condicao:
+            score = score + np.where(self.chuva_bonus, 5.0, np.where(self.chuva_penalidade, -10.0, 0.0))
+
+        return score
@@ -0,0 +1,266 @@
+# =============================================================================
+# STUB LOCAL DA OPEN-METEO - PREVISÃO E GEOCODING COM FALHAS INJETÁVEIS
+# =============================================================================
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+PORTA_PADRAO = 8099
+CAMINHO_PREVISAO = "/v1/forecast"
+CAMINHO_GEOCODING = "/v1/search"
+CAMINHO_CONFIG = "/_stub/config"
+CAMINHO_ESTATISTICAS = "/_stub/estatisticas"
+
+# Códigos WMO sorteados para as condições (os mesmos de clima_service.converter_codigo_tempo)
+CODIGOS_TEMPO = (0, 1, 2, 3, 45, 51, 61, 63, 80, 95)
+
+
+class ConfiguracaoStub:
+    """
+    Falhas e atrasos injetados em cada resposta. Pode ser trocada com o
+    servidor rodando via POST /_stub/config com um JSON parcial.
+    """
+
+    CAMPOS = ('latencia_ms', 'jitter_ms', 'taxa_erro', 'status_erro', 'taxa_timeout', 'atraso_timeout_s')
+
+    def __init__(self, latencia_ms: float = 0.0, jitter_ms: float = 0.0, taxa_erro: float = 0.0,
+                 status_erro: int = 503, taxa_timeout: float = 0.0, atraso_timeout_s: float = 10.0):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_erro = taxa_erro
+        self.status_erro = status_erro
+        # Timeout injetado: segura a conexão por atraso_timeout_s e fecha sem responder
+        self.taxa_timeout = taxa_timeout
+        self.atraso_timeout_s = atraso_timeout_s
+
+    def atualizar(self, dados: Dict[str, Any]):
+        """Aplica os campos conhecidos; levanta ValueError para valores inválidos"""
+        desconhecidos = set(dados) - set(self.CAMPOS)
+        if desconhecidos:
+            raise ValueError(f"campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+        novos = {campo: type(getattr(self, campo))(valor) for campo, valor in dados.items()}
+        for campo in ('taxa_erro', 'taxa_timeout'):
+            if not 0 <= novos.get(campo, getattr(self, campo)) <= 1:
+                raise ValueError(f"{campo} deve estar entre 0 e 1")
+        for campo, valor in novos.items():
+            setattr(self, campo, valor)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+
+class StubOpenMeteo:
+    """
+    Respostas sintéticas no formato da Open-Meteo. Coordenadas e clima
+    são derivados de forma determinística do nome da cidade e das
+    coordenadas pedidas, então a mesma consulta sempre traz os mesmos
+    dados; só as falhas injetadas são sorteadas.
+    """
+
+    def __init__(self, configuracao: Optional[ConfiguracaoStub] = None, semente: Optional[int] = None):
+        self.configuracao = configuracao or ConfiguracaoStub()
+        self._rng = random.Random(semente)
+        self._lock = threading.Lock()
+        self.requisicoes: Dict[str, int] = {}
+        self.erros_injetados = 0
+        self.timeouts_injetados = 0
+
+    def sortear_falha(self, caminho: str) -> Tuple[Optional[str], float]:
+        """Conta a requisição e decide ('timeout', 'erro' ou None) e o atraso em segundos"""
+        config = self.configuracao
+        with self._lock:
+            self.requisicoes[caminho] = self.requisicoes.get(caminho, 0) + 1
+            sorteio = self._rng.random()
+            atraso_ms = config.latencia_ms + self._rng.uniform(-config.jitter_ms, config.jitter_ms)
+            if sorteio < config.taxa_timeout:
+                self.timeouts_injetados += 1
+                return 'timeout', config.atraso_timeout_s
+            if sorteio < config.taxa_timeout + config.taxa_erro:
+                self.erros_injetados += 1
+                return 'erro', max(0.0, atraso_ms) / 1000
+        return None, max(0.0, atraso_ms) / 1000
+
+    def geocoding(self, params: Dict[str, str]) -> Dict[str, Any]:
+        nome = ' '.join(params.get('name', '').split())
+        if not nome:
+            return {'generationtime_ms': 0.1}
+        semente = zlib.crc32(nome.lower().encode('utf-8'))
+        # Pontos dentro do território brasileiro
+        return {
+            'results': [{
+                'id': semente,
+                'name': nome.title(),
+                'latitude': round(-33 + (semente % 3800) / 100, 4),
+                'longitude': round(-73 + (semente // 3800 % 3800) / 100, 4),
+                'country_code': 'BR',
+                'timezone': 'America/Sao_Paulo',
+            }],
+            'generationtime_ms': 0.1,
+        }
+
+    def previsao(self, params: Dict[str, str]) -> Dict[str, Any]:
+        latitude = float(params.get('latitude', 0))
+        longitude = float(params.get('longitude', 0))
+        rng = random.Random(f"{latitude:.2f},{longitude:.2f},{date.today().isoformat()}")
+        # Mais frio quanto mais ao sul, como no Brasil
+        base = 30 + latitude * 0.45
+        resposta = {
+            'latitude': latitude,
+            'longitude': longitude,
+            'timezone': params.get('timezone', 'auto'),
+            'generationtime_ms': 0.1,
+        }
+        if 'current' in params:
+            temperatura = round(base + rng.uniform(-4, 4), 1)
+            resposta['current'] = {
+                'time': time.strftime('%Y-%m-%dT%H:%M'),
+                'temperature_2m': temperatura,
+                'relative_humidity_2m': rng.randint(35, 95),
+                'apparent_temperature': round(temperatura + rng.uniform(-2, 3), 1),
+                'precipitation': round(rng.choice((0, 0, 0, 0.4, 2.5)), 1),
+                'weather_code': rng.choice(CODIGOS_TEMPO),
+                'cloud_cover': rng.randint(0, 100),
+                'wind_speed_10m': round(rng.uniform(0.5, 8), 1),
+                'wind_direction_10m': rng.randint(0, 359),
+            }
+        if 'daily' in params:
+            dias = max(1, min(16, int(params.get('forecast_days', 7))))
+            minimas = [round(base - 4 + rng.uniform(-3, 3), 1) for _ in range(dias)]
+            maximas = [round(minima + rng.uniform(5, 11), 1) for minima in minimas]
+            resposta['daily'] = {
+                'time': [(date.today() + timedelta(days=dia)).isoformat() for dia in range(dias)],
+                'weather_code': [rng.choice(CODIGOS_TEMPO) for _ in range(dias)],
+                'temperature_2m_max': maximas,
+                'temperature_2m_min': minimas,
+                'apparent_temperature_max': [round(maxima + rng.uniform(-1, 3), 1) for maxima in maximas],
+                'precipitation_sum': [round(rng.choice((0, 0, 1.2, 6.5, 18)), 1) for _ in range(dias)],
+                'wind_speed_10m_max': [round(rng.uniform(5, 30), 1) for _ in range(dias)],
+            }
+        return resposta
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'configuracao': self.configuracao.como_dict(),
+                'requisicoes': dict(self.requisicoes),
+                'erros_injetados': self.erros_injetados,
+                'timeouts_injetados': self.timeouts_injetados,
+            }
+
+
+class HandlerStub(BaseHTTPRequestHandler):
+    """Rotas do stub; o servidor expõe a instância de StubOpenMeteo em self.server.stub"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _responder(self, status: int, corpo: Dict[str, Any]):
+        dados = json.dumps(corpo).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        stub: StubOpenMeteo = self.server.stub
+        if url.path == CAMINHO_ESTATISTICAS:
+            return self._responder(200, stub.estatisticas())
+        if url.path not in (CAMINHO_PREVISAO, CAMINHO_GEOCODING):
+            return self._responder(404, {'error': True, 'reason': f"caminho desconhecido: {url.path}"})
+
+        falha, atraso = stub.sortear_falha(url.path)
+        if atraso:
+            time.sleep(atraso)
+        if falha == 'timeout':
+            self.close_connection = True
+            return
+        if falha == 'erro':
+            return self._responder(stub.configuracao.status_erro, {'error': True, 'reason': "erro injetado pelo stub"})
+
+        params = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        try:
+            corpo = stub.geocoding(params) if url.path == CAMINHO_GEOCODING else stub.previsao(params)
+        except ValueError as e:
+            return self._responder(400, {'error': True, 'reason': str(e)})
+        self._responder(200, corpo)
+
+    def do_POST(self):
+        if urlparse(self.path).path != CAMINHO_CONFIG:
+            return self._responder(404, {'error': True, 'reason': "caminho desconhecido"})
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+            self.server.stub.configuracao.atualizar(json.loads(self.rfile.read(tamanho) or b'{}'))
+        except (ValueError, TypeError) as e:
+            return self._responder(400, {'error': True, 'reason': str(e)})
+        self._responder(200, self.server.stub.configuracao.como_dict())
+
+    def log_message(self, formato, *args):
+        # Um print por requisição distorceria a latência sob carga
+        pass
+
+
+def criar_servidor(host: str = "127.0.0.1", porta: int = PORTA_PADRAO,
+                   stub: Optional[StubOpenMeteo] = None) -> ThreadingHTTPServer:
+    """Cria o servidor (porta 0 escolhe uma livre; veja server_address)"""
+    servidor = ThreadingHTTPServer((host, porta), HandlerStub)
+    servidor.daemon_threads = True
+    servidor.stub = stub or StubOpenMeteo()
+    return servidor
+
+
+def iniciar_em_thread(host: str = "127.0.0.1", porta: int = 0,
+                      stub: Optional[StubOpenMeteo] = None) -> ThreadingHTTPServer:
+    """Sobe o stub numa thread daemon; pare com servidor.shutdown()"""
+    servidor = criar_servidor(host, porta, stub)
+    threading.Thread(target=servidor.serve_forever, name="stub-open-meteo", daemon=True).start()
+    return servidor
+
+
+def urls_stub(servidor: ThreadingHTTPServer) -> Dict[str, str]:
+    """Variáveis de ambiente que apontam o clima_service para o stub"""
+    host, porta = servidor.server_address[:2]
+    return {
+        'GUARDA_ROUPA_CLIMA_URL': f"http://{host}:{porta}{CAMINHO_PREVISAO}",
+        'GUARDA_ROUPA_GEOCODING_URL': f"http://{host}:{porta}{CAMINHO_GEOCODING}",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local da Open-Meteo (previsão e geocoding) para testes offline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--latencia-ms", type=float, default=0, help="atraso de cada resposta")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="variação uniforme (±) sobre a latência")
+    parser.add_argument("--taxa-erro", type=float, default=0, help="fração das requisições respondidas com erro")
+    parser.add_argument("--status-erro", type=int, default=503, help="status HTTP dos erros injetados")
+    parser.add_argument("--taxa-timeout", type=float, default=0, help="fração das requisições que nunca respondem")
+    parser.add_argument("--atraso-timeout-s", type=float, default=10, help="quanto tempo segurar a conexão num timeout")
+    parser.add_argument("--semente", type=int, help="semente do sorteio de falhas")
+    args = parser.parse_args()
+
+    configuracao = ConfiguracaoStub()
+    try:
+        configuracao.atualizar({campo: getattr(args, campo) for campo in ConfiguracaoStub.CAMPOS})
+    except ValueError as e:
+        parser.error(str(e))
+    servidor = criar_servidor(args.host, args.porta, StubOpenMeteo(configuracao, args.semente))
+
+    print(f"🌦️ Stub da Open-Meteo em http://{args.host}:{servidor.server_address[1]}")
+    print("   Para apontar o backend para o stub:")
+    for variavel, valor in urls_stub(servidor).items():
+        print(f"   export {variavel}={valor}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stub encerrado")
+    finally:
+        servidor.server_close()
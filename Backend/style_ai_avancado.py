@@ -2,12 +2,222 @@
 # SISTEMA DE IA AVANÇADO - APRENDIZADO DE COMBINAÇÕES
 # =============================================================================
 
-from typing import Dict, List, Any, Tuple
-from database import get_connection
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from database import get_connection, verificar_uso_indice
 import json
 import math
 from datetime import datetime, timedelta
 import sqlite3
+import threading
+from array import array
+import numpy as np
+from score_lote import GuardaRoupaArrays
+from preferencias_snapshot import Preferencias, snapshot_preferencias
+from tags_roupa import tags_da_roupa
+
+CORES_NEUTRAS = ('preto', 'branco', 'cinza')
+
+# Histórico por tipo de clima e faixa de ±5 graus; o índice cobre as colunas lidas
+INDICES_APRENDIZADO = (
+    """CREATE INDEX IF NOT EXISTS idx_combinacoes_clima_temperatura
+       ON combinacoes_usadas (clima_tipo, temperatura, satisfacao)""",
+    """CREATE INDEX IF NOT EXISTS idx_combinacao_itens_roupa
+       ON combinacao_itens (roupa_id, combinacao_id)""",
+    """CREATE INDEX IF NOT EXISTS idx_harmonizacao_cores_par
+       ON harmonizacao_cores (cor1, cor2)""",
+)
+
+# Preenche combinacao_itens para combinações gravadas antes da tabela existir
+SQL_BACKFILL_COMBINACAO_ITENS = """
+    INSERT OR IGNORE INTO combinacao_itens (combinacao_id, roupa_id)
+    SELECT c.id, CAST(j.value AS INTEGER)
+    FROM combinacoes_usadas c, json_each(c.roupa_ids) j
+    WHERE c.id > (SELECT COALESCE(MAX(combinacao_id), 0) FROM combinacao_itens)
+    AND j.value IS NOT NULL
+"""
+
+# Regras básicas de harmonização de cores (cor1, cor2, compatibilidade, contexto)
+REGRAS_CORES_BASE = (
+    # Combinações clássicas
+    ('preto', 'branco', 1.0, 'geral'),
+    ('preto', 'cinza', 0.9, 'geral'),
+    ('branco', 'azul', 0.9, 'geral'),
+    ('branco', 'vermelho', 0.8, 'geral'),
+    ('azul', 'branco', 0.9, 'geral'),
+    ('azul', 'cinza', 0.8, 'geral'),
+    ('azul', 'marrom', 0.7, 'casual'),
+    
+    # Tons neutros
+    ('bege', 'marrom', 0.9, 'geral'),
+    ('cinza', 'azul', 0.8, 'geral'),
+    ('cinza', 'verde', 0.7, 'casual'),
+    
+    # Combinações arriscadas (menor compatibilidade)
+    ('vermelho', 'verde', 0.3, 'geral'),
+    ('laranja', 'rosa', 0.2, 'geral'),
+    ('amarelo', 'roxo', 0.4, 'casual'),
+    
+    # Monocromáticas (sempre funcionam)
+    ('azul', 'azul claro', 1.0, 'geral'),
+    ('cinza', 'cinza claro', 1.0, 'geral'),
+    ('verde', 'verde claro', 0.9, 'casual'),
+)
+
+SQL_HISTORICO_CONTEXTO = """
+    SELECT c.id, c.satisfacao, i.roupa_id
+    FROM combinacoes_usadas c
+    JOIN combinacao_itens i ON i.combinacao_id = c.id
+    WHERE c.clima_tipo = ?
+    AND c.temperatura BETWEEN ? - 5 AND ? + 5
+"""
+
+SQL_HISTORICO_ITENS = """
+    SELECT AVG(satisfacao) as media_satisfacao, COUNT(*) as total_usos
+    FROM combinacoes_usadas
+    WHERE clima_tipo = ?
+    AND temperatura BETWEEN ? - 5 AND ? + 5
+    AND id IN (SELECT combinacao_id FROM combinacao_itens WHERE roupa_id IN (?, ?))
+"""
+
+SQL_HISTORICO_EXISTE = """
+    SELECT 1 FROM combinacoes_usadas
+    WHERE clima_tipo = ? AND temperatura BETWEEN ? - 5 AND ? + 5
+    LIMIT 1
+"""
+
+# (consulta, parâmetros de exemplo, índice esperado) verificados com EXPLAIN QUERY PLAN
+CONSULTAS_INDEXADAS = (
+    (SQL_HISTORICO_CONTEXTO, ('ameno', 20, 20), 'idx_combinacoes_clima_temperatura'),
+    (SQL_HISTORICO_EXISTE, ('ameno', 20, 20), 'idx_combinacoes_clima_temperatura'),
+    (SQL_HISTORICO_ITENS, ('ameno', 20, 20, 1, 2), 'idx_combinacao_itens_roupa'),
+)
+
+def inserir_regras_base(cursor) -> int:
+    """
+    Insere as regras básicas de harmonização (nas duas ordens) se a tabela
+    estiver vazia; retorna quantas linhas foram gravadas (sem commit)
+    """
+    cursor.execute("SELECT 1 FROM harmonizacao_cores LIMIT 1")
+    if cursor.fetchone():
+        return 0  # Já inicializado
+    linhas = []
+    for cor1, cor2, compat, contexto in REGRAS_CORES_BASE:
+        linhas.append((cor1, cor2, compat, contexto))
+        linhas.append((cor2, cor1, compat, contexto))  # Também na ordem inversa
+    cursor.executemany("""
+        INSERT INTO harmonizacao_cores (cor1, cor2, compatibilidade, contexto)
+        VALUES (?, ?, ?, ?)
+    """, linhas)
+    return len(linhas)
+
+class MatrizHarmonizacaoCores:
+    """
+    Matriz densa cor x cor com o score de harmonização (escala 0-25)
+    já resolvido, incluindo as heurísticas para pares não catalogados
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._cores: List[str] = []
+        self._linhas: List[array] = []
+        self._compat: Dict[Tuple[str, str], float] = {}
+        self._array_cache = (-1, None)
+        self.versao = 0
+        self.carregada = False
+    
+    def carregar(self, cursor):
+        """Carrega a tabela harmonizacao_cores para a memória"""
+        cursor.execute("SELECT cor1, cor2, compatibilidade FROM harmonizacao_cores")
+        compat = {}
+        for cor1, cor2, valor in cursor.fetchall():
+            chave = (cor1.lower(), cor2.lower())
+            compat[chave] = max(valor, compat.get(chave, valor))
+        
+        with self._lock:
+            self._ids = {}
+            self._cores = []
+            self._linhas = []
+            self._compat = compat
+            for cor1, cor2 in compat:
+                self._registrar_cor(cor1)
+                self._registrar_cor(cor2)
+            self.versao += 1
+            self.carregada = True
+    
+    def id_cor(self, cor: str) -> int:
+        """Retorna o ID da cor na matriz, registrando cores novas"""
+        id_existente = self._ids.get(cor)
+        if id_existente is not None:
+            return id_existente
+        with self._lock:
+            return self._registrar_cor(cor)
+    
+    def score_par(self, cor1: str, cor2: str) -> float:
+        """Score de harmonização (0-25) para um par de cores"""
+        return self._linhas[self.id_cor(cor1)][self.id_cor(cor2)]
+    
+    def score_ids(self, id1: int, id2: int) -> float:
+        """Score de harmonização (0-25) para um par de IDs de cor"""
+        return self._linhas[id1][id2]
+    
+    def atualizar(self, cor1: str, cor2: str, compatibilidade: float):
+        """Aplica na matriz uma compatibilidade aprendida para o par"""
+        with self._lock:
+            i = self._registrar_cor(cor1)
+            j = self._registrar_cor(cor2)
+            self._compat[(cor1, cor2)] = compatibilidade
+            score = self._score_resolvido(cor1, cor2)
+            self._linhas[i][j] = score
+            self._linhas[j][i] = score
+            self.versao += 1
+    
+    def como_array(self) -> np.ndarray:
+        """Cópia NumPy da matriz, reconstruída apenas quando a matriz muda"""
+        versao, matriz = self._array_cache
+        if versao != self.versao or matriz is None:
+            with self._lock:
+                matriz = np.array([list(linha) for linha in self._linhas], dtype=np.float64).reshape(len(self._linhas), len(self._linhas))
+                self._array_cache = (self.versao, matriz)
+        return matriz
+    
+    def exportar(self) -> Dict[str, Any]:
+        """Exporta a matriz para inspeção"""
+        with self._lock:
+            return {
+                'cores': list(self._cores),
+                'matriz': [list(linha) for linha in self._linhas],
+                'escala': '0-25'
+            }
+    
+    def _registrar_cor(self, cor: str) -> int:
+        if cor in self._ids:
+            return self._ids[cor]
+        novo_id = len(self._cores)
+        for outra, linha in zip(self._cores, self._linhas):
+            linha.append(self._score_resolvido(outra, cor))
+        nova_linha = array('d', (self._score_resolvido(cor, outra) for outra in self._cores))
+        nova_linha.append(self._score_resolvido(cor, cor))
+        self._cores.append(cor)
+        self._linhas.append(nova_linha)
+        self._ids[cor] = novo_id
+        self.versao += 1
+        return novo_id
+    
+    def _score_resolvido(self, cor1: str, cor2: str) -> float:
+        valores = [
+            v for v in (self._compat.get((cor1, cor2)), self._compat.get((cor2, cor1)))
+            if v is not None
+        ]
+        if valores:
+            return max(valores) * 25  # Converter para escala 0-25
+        
+        # Heurística para cores não catalogadas
+        if cor1 == cor2:
+            return 20.0  # Monocromático é seguro
+        if cor1 in CORES_NEUTRAS or cor2 in CORES_NEUTRAS:
+            return 18.0  # Neutros combinam com quase tudo
+        return 10.0  # Desconhecido = médio
 
 class StyleAI:
     """
@@ -16,271 +226,328 @@ class StyleAI:
     """
     
     def __init__(self):
-        self.inicializar_sistema_aprendizado()
-        
-    def inicializar_sistema_aprendizado(self):
-        """Cria tabelas para armazenar dados de aprendizado"""
+        self.matriz_cores = MatrizHarmonizacaoCores()
+        self._cache_arrays = None
+    
+    def verificar_indices(self) -> Dict[str, List[str]]:
+        """
+        Confere com EXPLAIN QUERY PLAN que as consultas de histórico usam os
+        índices; levanta PlanoSemIndice se algum plano regrediu
+        """
         conn = get_connection()
-        cursor = conn.cursor()
-        
         try:
-            # Tabela para armazenar feedbacks de sugestões
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sugestao_feedback (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    clima_data TEXT NOT NULL,
-                    sugestao_data TEXT NOT NULL,
-                    feedback_score INTEGER NOT NULL, -- 1-5 (1=péssimo, 5=excelente)
-                    usado BOOLEAN DEFAULT FALSE,
-                    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabela para armazenar combinações usadas
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS combinacoes_usadas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    roupa_ids TEXT NOT NULL, -- JSON array com IDs das roupas
-                    clima_tipo TEXT NOT NULL,
-                    temperatura INTEGER NOT NULL,
-                    ocasiao TEXT DEFAULT 'casual',
-                    satisfacao INTEGER DEFAULT 3, -- 1-5
-                    data_uso TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabela para regras de harmonização de cores
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS harmonizacao_cores (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cor1 TEXT NOT NULL,
-                    cor2 TEXT NOT NULL,
-                    compatibilidade REAL NOT NULL, -- 0.0-1.0
-                    contexto TEXT DEFAULT 'geral', -- casual, formal, esportivo
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabela para preferências do usuário
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS preferencias_usuario (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    categoria TEXT NOT NULL, -- cor, estilo, tipo_roupa
-                    item TEXT NOT NULL,
-                    peso REAL DEFAULT 1.0, -- Importância da preferência
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(categoria, item)
-                )
-            """)
-            
-            conn.commit()
-            self.inicializar_regras_base()
-            
-        except Exception as e:
-            print(f"Erro ao inicializar sistema de aprendizado: {e}")
+            cursor = conn.cursor()
+            return {
+                f"{indice}:{posicao}": verificar_uso_indice(cursor, sql, params, indice)
+                for posicao, (sql, params, indice) in enumerate(CONSULTAS_INDEXADAS)
+            }
         finally:
             conn.close()
     
-    def inicializar_regras_base(self):
-        """Inicializa regras básicas de harmonização de cores e estilo"""
-        conn = get_connection()
-        cursor = conn.cursor()
+    # Pesos para cada componente
+    PESOS = {
+        'clima': 0.35,      # Mais importante - adequação ao clima
+        'cores': 0.25,      # Importante - harmonização visual
+        'estilo': 0.20,     # Coerência do conjunto
+        'historico': 0.15,  # Aprendizado com uso anterior
+        'preferencias': 0.05 # Gostos pessoais
+    }
+    
+    def calcular_score_combinacao(self, roupas: List[Dict], clima_data: Dict, preferencias: Preferencias = None,
+                                  contexto_score: Tuple[GuardaRoupaArrays, Dict[str, Any]] = None) -> float:
+        """
+        Calcula um score de 0-100 para uma combinação de roupas
+        considerando clima, cores, estilo e histórico. `contexto_score` é o
+        par (arrays, contexto) de preparar_contexto_score, montado uma vez
+        por requisição; sem ele o histórico é consultado a cada chamada
+        """
+        if not roupas:
+            return 0.0
+        
+        if contexto_score is None:
+            guarda_roupa = GuardaRoupaArrays(roupas, self)
+            contexto = self.preparar_contexto_lote(guarda_roupa, clima_data, preferencias)
+        else:
+            guarda_roupa, contexto = contexto_score
+        indices = guarda_roupa.matriz_indices([roupas])
+        return float(self.calcular_scores_lote(guarda_roupa, indices, clima_data, contexto)[0])
+    
+    def preparar_contexto_score(self, roupas: List[Dict], clima_data: Dict,
+                                preferencias: Preferencias = None) -> Tuple[GuardaRoupaArrays, Dict[str, Any]]:
+        """
+        Arrays do guarda-roupa (cacheados enquanto a lista não mudar) e o
+        contexto de preparar_contexto_lote, reaproveitáveis entre vários
+        scores de combinações tiradas dessa lista
+        """
+        guarda_roupa = self.obter_arrays_guarda_roupa(roupas)
+        return guarda_roupa, self.preparar_contexto_lote(guarda_roupa, clima_data, preferencias)
+    
+    def obter_arrays_guarda_roupa(self, roupas: List[Dict]) -> GuardaRoupaArrays:
+        """Versão em arrays da lista de roupas, reaproveitada enquanto a lista não mudar"""
+        arrays = self._cache_arrays
+        if arrays is None or arrays.origem is not roupas or len(arrays) != len(roupas):
+            arrays = GuardaRoupaArrays(roupas, self)
+            self._cache_arrays = arrays
+        return arrays
+    
+    def preparar_contexto_lote(self, guarda_roupa: GuardaRoupaArrays, clima_data: Dict,
+                               preferencias: Preferencias = None) -> Dict[str, Any]:
+        """Pré-calcula os vetores por peça e os dados do banco usados por calcular_scores_lote"""
+        contexto = {
+            'clima_data': clima_data,
+            'clima_itens': guarda_roupa.score_clima_itens(clima_data),
+            'preferencias_itens': None,
+            'historico': None,
+            'colunas_historico': {}
+        }
         
         try:
-            # Verificar se já existem regras
-            cursor.execute("SELECT COUNT(*) FROM harmonizacao_cores")
-            if cursor.fetchone()[0] > 0:
-                return  # Já inicializado
-            
-            # Regras básicas de harmonização de cores
-            regras_cores = [
-                # Combinações clássicas
-                ('preto', 'branco', 1.0, 'geral'),
-                ('preto', 'cinza', 0.9, 'geral'),
-                ('branco', 'azul', 0.9, 'geral'),
-                ('branco', 'vermelho', 0.8, 'geral'),
-                ('azul', 'branco', 0.9, 'geral'),
-                ('azul', 'cinza', 0.8, 'geral'),
-                ('azul', 'marrom', 0.7, 'casual'),
-                
-                # Tons neutros
-                ('bege', 'marrom', 0.9, 'geral'),
-                ('cinza', 'azul', 0.8, 'geral'),
-                ('cinza', 'verde', 0.7, 'casual'),
-                
-                # Combinações arriscadas (menor compatibilidade)
-                ('vermelho', 'verde', 0.3, 'geral'),
-                ('laranja', 'rosa', 0.2, 'geral'),
-                ('amarelo', 'roxo', 0.4, 'casual'),
-                
-                # Monocromáticas (sempre funcionam)
-                ('azul', 'azul claro', 1.0, 'geral'),
-                ('cinza', 'cinza claro', 1.0, 'geral'),
-                ('verde', 'verde claro', 0.9, 'casual'),
-            ]
-            
-            for cor1, cor2, compat, contexto in regras_cores:
-                cursor.execute("""
-                    INSERT INTO harmonizacao_cores (cor1, cor2, compatibilidade, contexto)
-                    VALUES (?, ?, ?, ?)
-                """, (cor1, cor2, compat, contexto))
-                
-                # Inserir também na ordem inversa
-                cursor.execute("""
-                    INSERT INTO harmonizacao_cores (cor1, cor2, compatibilidade, contexto)
-                    VALUES (?, ?, ?, ?)
-                """, (cor2, cor1, compat, contexto))
-            
-            conn.commit()
-            
+            if preferencias is None:
+                preferencias = snapshot_preferencias.atual()
+            if preferencias.usar_no_score:
+                por_cor = np.array([preferencias.score_cor(cor) for cor in guarda_roupa.cores_unicas], dtype=np.float64)
+                por_tipo = np.array([preferencias.score_tipo(tipo) for tipo in guarda_roupa.tipos_unicos], dtype=np.float64)
+                contexto['preferencias_itens'] = (
+                    por_cor[guarda_roupa.cor_codigo] + por_tipo[guarda_roupa.tipo_codigo]
+                ) / preferencias.peso_total
         except Exception as e:
-            print(f"Erro ao inicializar regras base: {e}")
+            print(f"Erro ao calcular preferências: {e}")
+        
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            temperatura = clima_data.get('temperatura', 20)
+            cursor.execute(SQL_HISTORICO_CONTEXTO, (self.classificar_clima_simples(clima_data), temperatura, temperatura))
+            posicoes: Dict[int, int] = {}
+            satisfacoes = []
+            combinacoes_por_roupa: Dict[int, List[int]] = {}
+            for combinacao_id, satisfacao, roupa_id in cursor.fetchall():
+                posicao = posicoes.get(combinacao_id)
+                if posicao is None:
+                    posicao = posicoes[combinacao_id] = len(satisfacoes)
+                    satisfacoes.append(satisfacao if satisfacao is not None else np.nan)
+                combinacoes_por_roupa.setdefault(roupa_id, []).append(posicao)
+            contexto['historico'] = (
+                {roupa_id: np.array(lista, dtype=np.int64) for roupa_id, lista in combinacoes_por_roupa.items()},
+                np.array(satisfacoes, dtype=np.float64)
+            )
+        except Exception as e:
+            print(f"Erro ao calcular score de histórico: {e}")
         finally:
             conn.close()
+        
+        return contexto
     
-    def calcular_score_combinacao(self, roupas: List[Dict], clima_data: Dict) -> float:
+    def calcular_scores_lote(self, guarda_roupa: GuardaRoupaArrays, indices: np.ndarray,
+                             clima_data: Dict, contexto: Dict[str, Any] = None) -> np.ndarray:
         """
-        Calcula um score de 0-100 para uma combinação de roupas
-        considerando clima, cores, estilo e histórico
+        Calcula o score de N combinações de uma vez. `indices` é uma matriz
+        N x P de índices em `guarda_roupa` (-1 para posições vazias).
+        Equivalente a aplicar a fórmula de calcular_score_combinacao em cada linha.
         """
-        if not roupas:
-            return 0.0
+        if contexto is None:
+            contexto = self.preparar_contexto_lote(guarda_roupa, clima_data)
+        
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.ndim != 2 or indices.shape[0] == 0:
+            return np.zeros(indices.shape[0] if indices.ndim else 0, dtype=np.float64)
+        
+        validos = indices >= 0
+        seguros = np.where(validos, indices, 0)
+        total_pecas = validos.sum(axis=1)
+        divisor = np.maximum(total_pecas, 1)
         
         scores = {
-            'clima': self.score_adequacao_clima(roupas, clima_data),
-            'cores': self.score_harmonizacao_cores(roupas),
-            'estilo': self.score_coerencia_estilo(roupas),
-            'historico': self.score_historico_uso(roupas, clima_data),
-            'preferencias': self.score_preferencias_usuario(roupas)
+            'clima': (contexto['clima_itens'][seguros] * validos).sum(axis=1) / divisor,
+            'cores': self._cores_lote(guarda_roupa, seguros, validos, total_pecas),
+            'estilo': self._estilo_lote(guarda_roupa, seguros, validos, divisor),
+            'historico': self._historico_lote(guarda_roupa, seguros, validos, contexto),
+            'preferencias': (
+                (contexto['preferencias_itens'][seguros] * validos).sum(axis=1)
+                if contexto['preferencias_itens'] is not None
+                else np.full(len(indices), 2.5)
+            )
         }
         
-        # Pesos para cada componente
-        pesos = {
-            'clima': 0.35,      # Mais importante - adequação ao clima
-            'cores': 0.25,      # Importante - harmonização visual
-            'estilo': 0.20,     # Coerência do conjunto
-            'historico': 0.15,  # Aprendizado com uso anterior
-            'preferencias': 0.05 # Gostos pessoais
-        }
+        score_final = sum(scores[tipo] * peso for tipo, peso in self.PESOS.items())
+        return np.where(total_pecas > 0, np.clip(score_final, 0.0, 100.0), 0.0)
+    
+    def _cores_lote(self, guarda_roupa, seguros, validos, total_pecas):
+        matriz = self.obter_matriz_cores().como_array()
+        cor_ids = np.where(validos, guarda_roupa.cor_id[seguros], -1)
+        coloridas = cor_ids >= 0
+        ids = np.maximum(cor_ids, 0)
+        
+        soma = np.zeros(len(seguros))
+        comparacoes = np.zeros(len(seguros))
+        largura = seguros.shape[1]
+        for i in range(largura):
+            for j in range(i + 1, largura):
+                ambos = coloridas[:, i] & coloridas[:, j]
+                soma += np.where(ambos, matriz[ids[:, i], ids[:, j]], 0.0)
+                comparacoes += ambos
         
-        score_final = sum(scores[tipo] * peso for tipo, peso in pesos.items())
-        return min(100.0, max(0.0, score_final))
+        cores = np.where(comparacoes > 0, soma / np.maximum(comparacoes, 1), 20.0)
+        return np.where(total_pecas < 2, 25.0, cores)
+    
+    def _estilo_lote(self, guarda_roupa, seguros, validos, divisor):
+        estilos = np.where(validos, guarda_roupa.estilo[seguros], 0)
+        formal = (estilos == 1).sum(axis=1)
+        casual = (estilos == 2).sum(axis=1)
+        esportivo = (estilos == 3).sum(axis=1)
+        
+        max_dominancia = np.maximum(np.maximum(formal, casual), esportivo) / divisor
+        max_dominancia = np.where((formal > 0) & (esportivo > 0), max_dominancia * 0.7, max_dominancia)
+        return max_dominancia * 20
+    
+    def _historico_lote(self, guarda_roupa, seguros, validos, contexto):
+        n = len(seguros)
+        if contexto['historico'] is None:
+            return np.full(n, 10.0)
+        
+        combinacoes_por_roupa, satisfacoes = contexto['historico']
+        com_id = validos & guarda_roupa.tem_id[seguros]
+        possui_id = com_id.any(axis=1)
+        largura = seguros.shape[1]
+        primeira = np.argmax(com_id, axis=1)
+        ultima = largura - 1 - np.argmax(com_id[:, ::-1], axis=1)
+        linhas = np.arange(n)
+        idx_primeira = seguros[linhas, primeira]
+        idx_ultima = seguros[linhas, ultima]
+        
+        if not len(satisfacoes):
+            return np.where(possui_id, 8.0, 10.0)
+        
+        # Combinações do contexto que contêm cada peça (via combinacao_itens)
+        colunas = contexto['colunas_historico']
+        for indice in np.unique(np.concatenate([idx_primeira[possui_id], idx_ultima[possui_id]])):
+            if indice not in colunas:
+                coluna = np.zeros(len(satisfacoes), dtype=bool)
+                coluna[combinacoes_por_roupa.get(int(guarda_roupa.ids[indice]), [])] = True
+                colunas[indice] = coluna
+        
+        vazio = np.zeros(len(satisfacoes), dtype=bool)
+        mascara = np.stack([
+            (colunas.get(a, vazio) | colunas.get(b, vazio)) if tem else vazio
+            for a, b, tem in zip(idx_primeira, idx_ultima, possui_id)
+        ])
+        
+        total_usos = mascara.sum(axis=1)
+        com_satisfacao = mascara & ~np.isnan(satisfacoes)
+        contagem = com_satisfacao.sum(axis=1)
+        soma = np.where(com_satisfacao, np.nan_to_num(satisfacoes), 0.0).sum(axis=1)
+        media = soma / np.maximum(contagem, 1)
+        
+        score_base = ((media - 3) / 2) * 15
+        peso_experiencia = np.minimum(1.0, total_usos / 5)
+        historico = np.where(contagem > 0, score_base * peso_experiencia, 8.0)
+        return np.where(possui_id, historico, 10.0)
     
     def score_adequacao_clima(self, roupas: List[Dict], clima_data: Dict) -> float:
         """Score baseado na adequação das roupas ao clima"""
+        total_pecas = len(roupas)
+        score = sum(self.score_clima_peca(roupa, clima_data) for roupa in roupas)
+        return score / total_pecas if total_pecas > 0 else 0.0
+    
+    def score_clima_peca(self, roupa: Dict, clima_data: Dict) -> float:
+        """Score de adequação ao clima de uma única peça"""
         temperatura = clima_data.get('temperatura', 20)
-        umidade = clima_data.get('umidade', 60)
         condicao = clima_data.get('condicao', '').lower()
         
+        clima_min = roupa.get('clima_min', 0)
+        clima_max = roupa.get('clima_max', 50)
+        tags = tags_da_roupa(roupa)
+        
         score = 0.0
-        total_pecas = len(roupas)
         
-        for roupa in roupas:
-            clima_min = roupa.get('clima_min', 0)
-            clima_max = roupa.get('clima_max', 50)
-            tipo = roupa.get('tipo', '').lower()
-            
-            # Score básico por temperatura
-            if clima_min <= temperatura <= clima_max:
-                score += 25  # Dentro da faixa ideal
-            else:
-                diferenca = min(abs(temperatura - clima_min), abs(temperatura - clima_max))
-                score += max(0, 25 - (diferenca * 2))
-            
-            # Bonus/penalty por tipo de peça vs clima
-            if temperatura <= 15:  # Frio
-                if any(t in tipo for t in ['jaqueta', 'casaco', 'moletom']):
-                    score += 10
-                elif any(t in tipo for t in ['shorts', 'regata']):
-                    score -= 15
-            elif temperatura >= 28:  # Quente
-                if any(t in tipo for t in ['shorts', 'regata', 'camiseta']):
-                    score += 10
-                elif any(t in tipo for t in ['jaqueta', 'casaco']):
-                    score -= 15
-            
-            # Considerações especiais para chuva
-            if 'chuva' in condicao:
-                if 'impermeável' in tipo or 'bota' in tipo:
-                    score += 5
-                elif 'sandália' in tipo or 'chinelo' in tipo:
-                    score -= 10
+        # Score básico por temperatura
+        if clima_min <= temperatura <= clima_max:
+            score += 25  # Dentro da faixa ideal
+        else:
+            diferenca = min(abs(temperatura - clima_min), abs(temperatura - clima_max))
+            score += max(0, 25 - (diferenca * 2))
         
-        return score / total_pecas if total_pecas > 0 else 0.0
+        # Bonus/penalty por tipo de peça vs clima (tags derivadas do tipo)
+        if temperatura <= 15:  # Frio
+            if tags['frio'] > 0:
+                score += 10
+            elif tags['frio'] < 0:
+                score -= 15
+        elif temperatura >= 28:  # Quente
+            if tags['calor'] > 0:
+                score += 10
+            elif tags['calor'] < 0:
+                score -= 15
+        
+        # Considerações especiais para chuva
+        if 'chuva' in condicao:
+            if tags['chuva'] > 0:
+                score += 5
+            elif tags['chuva'] < 0:
+                score -= 10
+        
+        return score
     
     def score_harmonizacao_cores(self, roupas: List[Dict]) -> float:
         """Score baseado na harmonização entre as cores das roupas"""
         if len(roupas) < 2:
             return 25.0  # Neutro para uma peça só
         
-        conn = get_connection()
-        cursor = conn.cursor()
-        
         try:
             cores = [roupa.get('cor', '').lower() for roupa in roupas if roupa.get('cor')]
             
             if len(cores) < 2:
                 return 20.0
             
+            matriz = self.obter_matriz_cores()
+            ids = [matriz.id_cor(cor) for cor in cores]
+            
             score_total = 0.0
             comparacoes = 0
             
             # Comparar todas as combinações de cores
-            for i in range(len(cores)):
-                for j in range(i + 1, len(cores)):
-                    cor1, cor2 = cores[i], cores[j]
-                    
-                    # Buscar compatibilidade no banco
-                    cursor.execute("""
-                        SELECT compatibilidade FROM harmonizacao_cores
-                        WHERE (cor1 = ? AND cor2 = ?) OR (cor1 = ? AND cor2 = ?)
-                        ORDER BY compatibilidade DESC LIMIT 1
-                    """, (cor1, cor2, cor2, cor1))
-                    
-                    result = cursor.fetchone()
-                    if result:
-                        score_total += result[0] * 25  # Converter para escala 0-25
-                        comparacoes += 1
-                    else:
-                        # Heurística para cores não catalogadas
-                        if cor1 == cor2:
-                            score_total += 20  # Monocromático é seguro
-                        elif any(cor in ['preto', 'branco', 'cinza'] for cor in [cor1, cor2]):
-                            score_total += 18  # Neutros combinam com quase tudo
-                        else:
-                            score_total += 10  # Desconhecido = médio
-                        comparacoes += 1
+            for i in range(len(ids)):
+                for j in range(i + 1, len(ids)):
+                    score_total += matriz.score_ids(ids[i], ids[j])
+                    comparacoes += 1
             
             return score_total / comparacoes if comparacoes > 0 else 15.0
             
         except Exception as e:
             print(f"Erro ao calcular score de cores: {e}")
             return 15.0
-        finally:
-            conn.close()
+    
+    def obter_matriz_cores(self) -> MatrizHarmonizacaoCores:
+        """Retorna a matriz de harmonização, carregando do banco na primeira chamada"""
+        if not self.matriz_cores.carregada:
+            conn = get_connection()
+            try:
+                self.matriz_cores.carregar(conn.cursor())
+            finally:
+                conn.close()
+        return self.matriz_cores
+    
+    def exportar_matriz_cores(self) -> Dict[str, Any]:
+        """Exporta a matriz de harmonização de cores para inspeção"""
+        return self.obter_matriz_cores().exportar()
     
     def score_coerencia_estilo(self, roupas: List[Dict]) -> float:
         """Score baseado na coerência de estilo entre as peças"""
         if not roupas:
             return 0.0
         
-        # Categorizar estilos por tipo de roupa
-        estilos_formais = ['blazer', 'terno', 'camisa social', 'sapato social']
-        estilos_casuais = ['camiseta', 'jeans', 'tênis', 'moletom']
-        estilos_esportivos = ['shorts', 'regata', 'tênis', 'legging']
-        
         formal_count = 0
         casual_count = 0
         esportivo_count = 0
         
         for roupa in roupas:
-            tipo = roupa.get('tipo', '').lower()
+            estilo = self.classificar_estilo_peca(roupa)
             
-            if any(estilo in tipo for estilo in estilos_formais):
+            if estilo == 'formal':
                 formal_count += 1
-            elif any(estilo in tipo for estilo in estilos_casuais):
+            elif estilo == 'casual':
                 casual_count += 1
-            elif any(estilo in tipo for estilo in estilos_esportivos):
+            elif estilo == 'esportivo':
                 esportivo_count += 1
         
         total_pecas = len(roupas)
@@ -299,30 +566,25 @@ class StyleAI:
         
         return max_dominancia * 20  # Score de 0-20
     
+    def classificar_estilo_peca(self, roupa: Dict) -> str:
+        """Classifica a peça como formal, casual, esportivo ou '' (tag de estilo da peça)"""
+        return tags_da_roupa(roupa)['estilo']
+    
     def score_historico_uso(self, roupas: List[Dict], clima_data: Dict) -> float:
         """Score baseado em combinações anteriores bem avaliadas"""
         conn = get_connection()
         cursor = conn.cursor()
         
         try:
-            roupa_ids = [str(roupa.get('id', 0)) for roupa in roupas if roupa.get('id')]
+            roupa_ids = [int(roupa['id']) for roupa in roupas if roupa.get('id')]
             if not roupa_ids:
                 return 10.0  # Neutro
             
             temperatura = clima_data.get('temperatura', 20)
             clima_tipo = self.classificar_clima_simples(clima_data)
             
-            # Buscar combinações similares no histórico
-            cursor.execute("""
-                SELECT AVG(satisfacao) as media_satisfacao, COUNT(*) as total_usos
-                FROM combinacoes_usadas
-                WHERE clima_tipo = ? 
-                AND ABS(temperatura - ?) <= 5
-                AND (
-                    json_extract(roupa_ids, '$') LIKE '%' || ? || '%'
-                    OR json_extract(roupa_ids, '$') LIKE '%' || ? || '%'
-                )
-            """, (clima_tipo, temperatura, roupa_ids[0], roupa_ids[-1] if len(roupa_ids) > 1 else roupa_ids[0]))
+            # Buscar combinações similares no histórico que usaram a primeira ou a última peça
+            cursor.execute(SQL_HISTORICO_ITENS, (clima_tipo, temperatura, temperatura, roupa_ids[0], roupa_ids[-1]))
             
             result = cursor.fetchone()
             if result and result[0]:
@@ -343,44 +605,126 @@ class StyleAI:
         finally:
             conn.close()
     
-    def score_preferencias_usuario(self, roupas: List[Dict]) -> float:
+    def score_preferencias_usuario(self, roupas: List[Dict], preferencias: Preferencias = None) -> float:
         """Score baseado nas preferências do usuário"""
-        conn = get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("SELECT categoria, item, peso FROM preferencias_usuario")
-            preferencias = cursor.fetchall()
+            if preferencias is None:
+                preferencias = snapshot_preferencias.atual()
             
-            if not preferencias:
+            if not preferencias.usar_no_score:
                 return 2.5  # Neutro
             
-            score = 0.0
-            peso_total = 0.0
+            score = sum(self.score_preferencia_peca(roupa, preferencias) for roupa in roupas)
             
-            for categoria, valor, peso in preferencias:
-                peso_total += peso
-                
-                if categoria == 'cor':
-                    for roupa in roupas:
-                        if roupa.get('cor', '').lower() == valor.lower():
-                            score += peso * 5
-                
-                elif categoria == 'tipo':
-                    for roupa in roupas:
-                        if valor.lower() in roupa.get('tipo', '').lower():
-                            score += peso * 3
-                
-                elif categoria == 'cor_evitada':
-                    for roupa in roupas:
-                        if roupa.get('cor', '').lower() == valor.lower():
-                            score -= peso * 3
-            
-            return score / peso_total if peso_total > 0 else 2.5
+            return score / preferencias.peso_total
             
         except Exception as e:
             print(f"Erro ao calcular preferências: {e}")
             return 2.5
+    
+    def score_preferencia_peca(self, roupa: Dict, preferencias: Preferencias) -> float:
+        """Contribuição de uma peça para o score de preferências (antes da normalização)"""
+        return preferencias.score_peca(roupa)
+    
+    def limites_busca(self, clima_data: Dict, slots: List[List[Dict]],
+                      preferencias: Preferencias = None) -> Tuple[Callable[[Dict], Tuple[float, ...]], Callable[[Tuple[float, ...], List[Dict]], float]]:
+        """
+        Decompõe calcular_score_combinacao para busca com poda. Retorna
+        `valores(roupa)` com a parte separável por peça (clima e preferências)
+        e indicadores de estilo, e `teto(somas, parcial)`, um limite superior
+        do score de qualquer combinação dos slots que comece pelas peças
+        `parcial` e cujos valores somem no máximo `somas`.
+        """
+        num_pecas = len(slots)
+        if preferencias is None:
+            preferencias = snapshot_preferencias.atual()
+        peso_total = preferencias.peso_total
+        usar_preferencias = preferencias.usar_no_score
+        indices_estilo = {'formal': 1, 'casual': 2, 'esportivo': 3}
+        
+        def valores(roupa: Dict) -> Tuple[float, ...]:
+            valor = self.PESOS['clima'] * self.score_clima_peca(roupa, clima_data) / num_pecas
+            if usar_preferencias:
+                valor += self.PESOS['preferencias'] * self.score_preferencia_peca(roupa, preferencias) / peso_total
+            vetor = [valor, 0.0, 0.0, 0.0]
+            indice = indices_estilo.get(self.classificar_estilo_peca(roupa))
+            if indice:
+                vetor[indice] = 1.0
+            return tuple(vetor)
+        
+        sem_id = any(not roupa.get('id') for candidatos in slots for roupa in candidatos)
+        teto_historico = self._teto_historico(clima_data, 10.0 if sem_id else 8.0)
+        constante = self.PESOS['historico'] * teto_historico
+        if not usar_preferencias:
+            constante += self.PESOS['preferencias'] * 2.5
+        
+        teto_cores = self._teto_cores_busca(slots)
+        
+        def teto(somas: Tuple[float, ...], parcial: List[Dict]) -> float:
+            teto_estilo = min(1.0, max(somas[1:4]) / num_pecas) * 20
+            return min(100.0, max(0.0,
+                somas[0] + constante +
+                self.PESOS['estilo'] * teto_estilo +
+                self.PESOS['cores'] * teto_cores(parcial)
+            ))
+        
+        return valores, teto
+    
+    def _teto_cores_busca(self, slots: List[List[Dict]]) -> Callable[[List[Dict]], float]:
+        """Limite superior de score_harmonizacao_cores dado o prefixo já escolhido"""
+        num_pecas = len(slots)
+        if num_pecas < 2:
+            return lambda parcial: 25.0
+        if any(not roupa.get('cor') for candidatos in slots for roupa in candidatos):
+            return lambda parcial: 25.0
+        
+        matriz = self.obter_matriz_cores()
+        ids_slots = [sorted({matriz.id_cor(roupa['cor'].lower()) for roupa in candidatos}) for candidatos in slots]
+        todas = sorted({i for ids in ids_slots for i in ids})
+        
+        # Melhor par possível entre uma cor já escolhida e cada slot futuro
+        melhor_com_slot = [
+            {cor: max(matriz.score_ids(cor, outra) for outra in ids) for cor in todas}
+            for ids in ids_slots
+        ]
+        
+        # Melhor par possível entre cada dois slots futuros, acumulado a partir do nível d
+        pares_restantes = [0.0] * (num_pecas + 1)
+        for d in range(num_pecas - 1, -1, -1):
+            acumulado = pares_restantes[d + 1]
+            for t in range(d + 1, num_pecas):
+                acumulado += max(melhor_com_slot[t][cor] for cor in ids_slots[d])
+            pares_restantes[d] = acumulado
+        
+        total_pares = num_pecas * (num_pecas - 1) / 2
+        id_por_roupa = {
+            id(roupa): matriz.id_cor(roupa['cor'].lower())
+            for candidatos in slots for roupa in candidatos
+        }
+        
+        def teto(parcial: List[Dict]) -> float:
+            ids = [id_por_roupa[id(roupa)] for roupa in parcial]
+            nivel = len(ids)
+            soma = 0.0
+            for i in range(nivel):
+                for j in range(i + 1, nivel):
+                    soma += matriz.score_ids(ids[i], ids[j])
+                for t in range(nivel, num_pecas):
+                    soma += melhor_com_slot[t][ids[i]]
+            soma += pares_restantes[nivel]
+            return soma / total_pares
+        
+        return teto
+    
+    def _teto_historico(self, clima_data: Dict, sem_historico: float) -> float:
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            temperatura = clima_data.get('temperatura', 20)
+            cursor.execute(SQL_HISTORICO_EXISTE, (self.classificar_clima_simples(clima_data), temperatura, temperatura))
+            return 15.0 if cursor.fetchone() else sem_historico
+        except Exception:
+            return 15.0
         finally:
             conn.close()
     
@@ -409,6 +753,11 @@ class StyleAI:
                 INSERT INTO combinacoes_usadas (roupa_ids, clima_tipo, temperatura, satisfacao)
                 VALUES (?, ?, ?, ?)
             """, (json.dumps(roupa_ids), clima_tipo, temperatura, satisfacao))
+            combinacao_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT OR IGNORE INTO combinacao_itens (combinacao_id, roupa_id)
+                VALUES (?, ?)
+            """, [(combinacao_id, int(roupa_id)) for roupa_id in roupa_ids])
             
             conn.commit()
             
@@ -445,9 +794,13 @@ class StyleAI:
                     INSERT INTO harmonizacao_cores (cor1, cor2, compatibilidade)
                     VALUES (?, ?, ?)
                 """, (cor1.lower(), cor2.lower(), compatibilidade))
+                nova_compatibilidade = compatibilidade
             
             conn.commit()
             
+            if self.matriz_cores.carregada:
+                self.matriz_cores.atualizar(cor1.lower(), cor2.lower(), nova_compatibilidade)
+            
         except Exception as e:
             print(f"Erro ao aprender harmonização: {e}")
         finally:
@@ -460,8 +813,11 @@ class StyleAI:
         
         try:
             cursor.execute("""
-                INSERT OR REPLACE INTO preferencias_usuario (categoria, item, peso)
+                INSERT INTO preferencias_usuario (categoria, item, peso)
                 VALUES (?, ?, ?)
+                ON CONFLICT(categoria, item) DO UPDATE SET
+                    peso = excluded.peso,
+                    ultima_atualizacao = CURRENT_TIMESTAMP
             """, (tipo, valor.lower(), peso))
             
             conn.commit()
@@ -471,5 +827,14 @@ class StyleAI:
         finally:
             conn.close()
 
-# Instância global da IA
-style_ai = StyleAI()
+_style_ai: Optional[StyleAI] = None
+_style_ai_lock = threading.Lock()
+
+def obter_style_ai() -> StyleAI:
+    """Retorna a IA global, criando-a na primeira chamada"""
+    global _style_ai
+    if _style_ai is None:
+        with _style_ai_lock:
+            if _style_ai is None:
+                _style_ai = StyleAI()
+    return _style_ai
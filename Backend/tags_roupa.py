@@ -0,0 +1,142 @@
+# =============================================================================
+# TAGS DERIVADAS DAS ROUPAS - CATEGORIA, ESTILO E ADEQUAÇÃO AO CLIMA
+# =============================================================================
+
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+# Tipos que já são o nome da categoria
+CATEGORIAS_EXATAS = ('superior', 'inferior', 'calçado', 'casaco')
+CATEGORIA_PADRAO = 'superior'
+CATEGORIA_ACESSORIOS = 'acessorios'
+
+# Palavras-chave por categoria, na ordem em que são testadas
+PALAVRAS_CATEGORIA = (
+    ('superior', ('camiseta', 'camisa', 'blusa', 'regata', 'top')),
+    ('inferior', ('calça', 'short', 'bermuda', 'saia', 'vestido')),
+    ('calçado', ('sapato', 'tênis', 'sandália', 'chinelo', 'bota')),
+    ('casaco', ('jaqueta', 'moletom', 'blazer', 'cardigã')),
+    (CATEGORIA_ACESSORIOS, ('chapéu', 'boné', 'cinto', 'bolsa', 'óculos')),
+)
+
+# Palavras-chave por estilo, na ordem em que são testadas ('' = sem estilo)
+PALAVRAS_ESTILO = (
+    ('formal', ('blazer', 'terno', 'camisa social', 'sapato social')),
+    ('casual', ('camiseta', 'jeans', 'tênis', 'moletom')),
+    ('esportivo', ('shorts', 'regata', 'tênis', 'legging')),
+)
+
+# Regras de clima por tipo: (bônus, penalidade). A penalidade só vale sem bônus.
+REGRAS_CLIMA = (
+    ('frio', ('jaqueta', 'casaco', 'moletom'), ('shorts', 'regata')),
+    ('calor', ('shorts', 'regata', 'camiseta'), ('jaqueta', 'casaco')),
+    ('chuva', ('impermeável', 'bota'), ('sandália', 'chinelo')),
+)
+
+# Peças mantidas no filtro de clima quando chove, mesmo fora da faixa de temperatura
+PALAVRAS_ABRIGO_CHUVA = ('impermeável', 'bota', 'jaqueta')
+
+# Colunas da tabela roupas que guardam as tags (frio/calor/chuva: 1 bônus, -1 penalidade, 0 neutro)
+COLUNAS_TAGS = (
+    ('tag_categoria', 'TEXT'),
+    ('tag_estilo', 'TEXT'),
+    ('tag_frio', 'INTEGER'),
+    ('tag_calor', 'INTEGER'),
+    ('tag_chuva', 'INTEGER'),
+    ('tag_abrigo_chuva', 'INTEGER'),
+)
+NOMES_COLUNAS_TAGS = tuple(coluna for coluna, _ in COLUNAS_TAGS)
+CAMPOS_TAGS = tuple(coluna[len('tag_'):] for coluna in NOMES_COLUNAS_TAGS)
+
+SQL_GRAVAR_TAGS = f"UPDATE roupas SET {', '.join(f'{c} = ?' for c in NOMES_COLUNAS_TAGS)} WHERE id = ?"
+
+
+def _contem(tipo: str, palavras: Tuple[str, ...]) -> bool:
+    return any(palavra in tipo for palavra in palavras)
+
+
+@lru_cache(maxsize=4096)
+def valores_tags(tipo: str) -> Tuple[Any, ...]:
+    """Valores das tags de um tipo, na ordem de COLUNAS_TAGS"""
+    tipo = (tipo or '').lower()
+
+    if tipo in CATEGORIAS_EXATAS:
+        categoria = tipo
+    else:
+        categoria = next((nome for nome, palavras in PALAVRAS_CATEGORIA if _contem(tipo, palavras)), CATEGORIA_PADRAO)
+
+    estilo = next((nome for nome, palavras in PALAVRAS_ESTILO if _contem(tipo, palavras)), '')
+
+    clima = []
+    for _, bonus, penalidade in REGRAS_CLIMA:
+        if _contem(tipo, bonus):
+            clima.append(1)
+        elif _contem(tipo, penalidade):
+            clima.append(-1)
+        else:
+            clima.append(0)
+
+    return (categoria, estilo, *clima, int(_contem(tipo, PALAVRAS_ABRIGO_CHUVA)))
+
+
+def derivar_tags(tipo: str) -> Dict[str, Any]:
+    """Tags de uma peça calculadas a partir do tipo"""
+    return dict(zip(CAMPOS_TAGS, valores_tags(tipo)))
+
+
+def tags_da_linha(tipo: str, valores: Tuple[Any, ...]) -> Dict[str, Any]:
+    """Tags gravadas numa linha; linhas ainda sem backfill são derivadas do tipo"""
+    if valores[0] is None:
+        return derivar_tags(tipo)
+    return dict(zip(CAMPOS_TAGS, valores))
+
+
+def tags_da_roupa(roupa: Dict[str, Any]) -> Dict[str, Any]:
+    """Tags de uma roupa: as do snapshot ou, para dicionários avulsos, derivadas do tipo"""
+    tags = roupa.get('tags')
+    if tags is None:
+        tags = derivar_tags(roupa.get('tipo', ''))
+    return tags
+
+
+def garantir_colunas_tags(cursor) -> List[str]:
+    """Adiciona as colunas de tags à tabela roupas, se faltarem (sem commit)"""
+    colunas = {linha[1] for linha in cursor.execute("PRAGMA table_info(roupas)")}
+    faltando = [(coluna, tipo) for coluna, tipo in COLUNAS_TAGS if coluna not in colunas]
+    for coluna, tipo in faltando:
+        cursor.execute(f"ALTER TABLE roupas ADD COLUMN {coluna} {tipo}")
+    return [coluna for coluna, _ in faltando]
+
+
+def gravar_tags(cursor, roupa_id: int, tipo: str):
+    """Grava as tags derivadas de uma roupa (chamado nas rotas de escrita, antes do commit)"""
+    cursor.execute(SQL_GRAVAR_TAGS, (*valores_tags(tipo), roupa_id))
+
+
+def backfill_tags(cursor, apenas_pendentes: bool = False) -> int:
+    """
+    Recalcula as tags das roupas (todas, ou só as que ainda não têm tags)
+    e retorna quantas linhas foram gravadas (sem commit)
+    """
+    sql = "SELECT id, tipo FROM roupas"
+    if apenas_pendentes:
+        sql += " WHERE tag_categoria IS NULL"
+    linhas: List[Tuple[int, str]] = cursor.execute(sql).fetchall()
+    cursor.executemany(SQL_GRAVAR_TAGS, [(*valores_tags(tipo), roupa_id) for roupa_id, tipo in linhas])
+    return len(linhas)
+
+
+if __name__ == "__main__":
+    # Recalcula as tags de todo o guarda-roupa (após mudar as palavras-chave acima)
+    from database import get_connection
+    from models import create_indexes
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        total = backfill_tags(cursor)
+        create_indexes(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"🏷️ Tags recalculadas para {total} roupas")
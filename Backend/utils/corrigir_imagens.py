@@ -20,7 +20,7 @@ def corrigir_caminhos_imagens():
         cursor = conn.cursor()
         
         # Buscar todas as roupas
-        cursor.execute("SELECT id, nome, imagem_path FROM roupas")
+        cursor.execute("SELECT id, nome, imagem FROM roupas")
         roupas = cursor.fetchall()
         
         # Mapear nomes para imagens corretas
@@ -67,7 +67,7 @@ def corrigir_caminhos_imagens():
             if nome in nome_para_imagem:
                 novo_caminho = nome_para_imagem[nome]
                 cursor.execute(
-                    "UPDATE roupas SET imagem_path = ? WHERE id = ?",
+                    "UPDATE roupas SET imagem = ? WHERE id = ?",
                     (novo_caminho, id_roupa)
                 )
                 atualizadas += 1
@@ -1,4 +1,5 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+const TAMANHO_PAGINA = 100;
 const RoupasList = () => {
   const [roupas, setRoupas] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -18,25 +19,48 @@ const RoupasList = () => {
     imagem_file: null,
     imagem_preview: null
   });
+  const [filtros, setFiltros] = useState({ tipo: '', cor: '', temp: '' });
+  const [totais, setTotais] = useState({ total: 0, total_filtrado: 0 });
+  const [proximoAfterId, setProximoAfterId] = useState(null);
+  const [carregandoMais, setCarregandoMais] = useState(false);
+  const [inicializado, setInicializado] = useState(false);
+  // Cada recarga da primeira página invalida as respostas das cargas anteriores
+  const cargaAtual = useRef(0);
   useEffect(() => {
     carregarRoupas();
-  }, []);
-  const carregarRoupas = async () => {
+  }, [filtros]);
+  const carregarRoupas = async (afterId = null) => {
+    const primeiraPagina = afterId === null;
+    const carga = primeiraPagina ? ++cargaAtual.current : cargaAtual.current;
     try {
-      setLoading(true);
-      const response = await fetch('http://localhost:5000/roupas');
-      if (response.ok) {
-        const data = await response.json();
-        setRoupas(data);
-      } else {
+      if (primeiraPagina) setLoading(true); else setCarregandoMais(true);
+      const params = new URLSearchParams({ limit: TAMANHO_PAGINA });
+      if (afterId !== null) params.set('after_id', afterId);
+      Object.entries(filtros).forEach(([chave, valor]) => {
+        if (valor.trim() !== '') params.set(chave, valor.trim());
+      });
+      const response = await fetch(`http://localhost:5000/roupas?${params}`);
+      if (carga !== cargaAtual.current) return;
+      if (!response.ok) {
         setErro('Erro ao carregar roupas');
+        return;
       }
+      const data = await response.json();
+      if (carga !== cargaAtual.current) return;
+      setRoupas(anteriores => primeiraPagina ? data.roupas : anteriores.concat(data.roupas));
+      setTotais({ total: data.total, total_filtrado: data.total_filtrado });
+      setProximoAfterId(data.proximo_after_id);
     } catch (error) {
-      setErro('Erro de conexão');
+      if (carga === cargaAtual.current) setErro('Erro de conexão');
     } finally {
-      setLoading(false);
+      if (carga === cargaAtual.current) {
+        setLoading(false);
+        setCarregandoMais(false);
+        setInicializado(true);
+      }
     }
   };
+  const filtrosAtivos = Object.values(filtros).some(valor => valor.trim() !== '');
   const deletarRoupa = async (id) => {
     try {
       const response = await fetch(`http://localhost:5000/roupas/${id}`, {
@@ -195,7 +219,8 @@ const RoupasList = () => {
     casaco: '🧥',
     acessorio: '👜'
   };
-  if (loading) {
+  // Spinner de tela cheia só na primeira carga; recargas por filtro mantêm os campos montados
+  if (loading && !inicializado) {
     return (
       <div className="loading">
         <div className="spinner"></div>
@@ -220,7 +245,9 @@ const RoupasList = () => {
               Meu Guarda-roupa
             </h1>
             <p style={{ margin: 0 }}>
-              {roupas.length} {roupas.length === 1 ? 'peça cadastrada' : 'peças cadastradas'}
+              {filtrosAtivos
+                ? `${totais.total_filtrado} de ${totais.total} ${totais.total === 1 ? 'peça' : 'peças'}`
+                : `${totais.total} ${totais.total === 1 ? 'peça cadastrada' : 'peças cadastradas'}`}
             </p>
           </div>
           <button
@@ -374,8 +401,57 @@ const RoupasList = () => {
             </form>
           </div>
         )}
+        {/* Filtros (aplicados pela API) */}
+        <div className="card" style={{ padding: 'var(--space-md)' }}>
+          <div className="grid grid-4" style={{ alignItems: 'end' }}>
+            <div>
+              <label>Tipo</label>
+              <select
+                value={filtros.tipo}
+                onChange={(e) => setFiltros({...filtros, tipo: e.target.value})}
+              >
+                <option value="">Todos</option>
+                <option value="superior">Superior</option>
+                <option value="inferior">Inferior</option>
+                <option value="calcado">Calçado</option>
+                <option value="casaco">Casaco</option>
+                <option value="acessorio">Acessório</option>
+              </select>
+            </div>
+            <div>
+              <label>Cor</label>
+              <input
+                type="text"
+                value={filtros.cor}
+                onChange={(e) => setFiltros({...filtros, cor: e.target.value})}
+                placeholder="Ex: azul"
+              />
+            </div>
+            <div>
+              <label>Temperatura (°C)</label>
+              <input
+                type="number"
+                value={filtros.temp}
+                onChange={(e) => setFiltros({...filtros, temp: e.target.value})}
+                placeholder="Ex: 22"
+              />
+            </div>
+            <button
+              type="button"
+              onClick={() => setFiltros({ tipo: '', cor: '', temp: '' })}
+              disabled={!filtrosAtivos}
+            >
+              🧹 Limpar filtros
+            </button>
+          </div>
+        </div>
         {/* Grid de Roupas */}
-        {roupas.length === 0 ? (
+        {roupas.length === 0 && filtrosAtivos && !loading ? (
+          <div className="card" style={{ textAlign: 'center', padding: 'var(--space-2xl)' }}>
+            <div style={{ fontSize: '3rem', marginBottom: 'var(--space-md)' }}>🔍</div>
+            <h3 style={{ marginBottom: 'var(--space-md)' }}>Nenhuma roupa com esses filtros</h3>
+          </div>
+        ) : roupas.length === 0 ? (
           <div className="card" style={{ textAlign: 'center', padding: 'var(--space-2xl)' }}>
             <div style={{ fontSize: '3rem', marginBottom: 'var(--space-md)' }}>👕</div>
             <h3 style={{ marginBottom: 'var(--space-md)' }}>Nenhuma roupa cadastrada</h3>
@@ -413,12 +489,12 @@ const RoupasList = () => {
                 <div style={{ marginBottom: 'var(--space-md)' }}>
                   {roupa.imagem ? (
                     <img
-                      src={`http://localhost:5000/api/image/${roupa.id}`}
+                      src={`http://localhost:5000/api/image/${roupa.id}?size=medium`}
                       alt={roupa.nome}
                       className="roupa-image"
                       onError={(e) => {
                         console.log('Erro ao carregar imagem, tentando rota alternativa...');
-                        e.target.src = `http://localhost:5000/imagens/${roupa.imagem}`;
+                        e.target.src = `http://localhost:5000/imagens/${roupa.imagem}?size=medium`;
                         e.target.onerror = () => {
                           e.target.style.display = 'none';
                           e.target.nextSibling.style.display = 'flex';
@@ -520,6 +596,17 @@ const RoupasList = () => {
             ))}
           </div>
         )}
+        {proximoAfterId !== null && (
+          <div style={{ textAlign: 'center', marginTop: 'var(--space-lg)' }}>
+            <button
+              type="button"
+              onClick={() => carregarRoupas(proximoAfterId)}
+              disabled={carregandoMais}
+            >
+              {carregandoMais ? 'Carregando...' : `Carregar mais (${roupas.length} de ${totais.total_filtrado})`}
+            </button>
+          </div>
+        )}
       </div>
       {/* Popup de opções */}
       {showPopup && selectedRoupa && (
@@ -210,7 +210,7 @@ const SugestaoRoupa = () => {
                             <div className="outfit-type">{tipoOrdem}</div>
                             {item.id ? (
                               <img
-                                src={`http://localhost:5000/api/image/${item.id}`}
+                                src={`http://localhost:5000/api/image/${item.id}?size=medium`}
                                 alt={item.nome}
                                 className="roupa-image"
                                 onError={(e) => {
@@ -220,7 +220,7 @@ const SugestaoRoupa = () => {
                               />
                             ) : item.imagem ? (
                               <img
-                                src={`http://localhost:5000/imagens/${item.imagem}`}
+                                src={`http://localhost:5000/imagens/${item.imagem}?size=medium`}
                                 alt={item.nome}
                                 className="roupa-image"
                                 onError={(e) => {